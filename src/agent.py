@@ -1,6 +1,6 @@
 from __future__ import annotations
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pydantic import BaseModel, Field, ConfigDict
 from dotenv import load_dotenv
 from rich.markdown import Markdown
@@ -15,6 +15,11 @@ from pydantic_ai.providers.openai import OpenAIProvider
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai import Agent, RunContext
 from minerva import MINERVA
+from food_disease_table import get_food_disease_table
+from graph_loader import GraphBatchLoader
+from cypher_guard import CypherGuard, CypherGuardError
+from graph_backend import close_async_graph_backend
+from entity_resolver import get_entity_resolver
 
 load_dotenv()
 
@@ -23,6 +28,10 @@ load_dotenv()
 class MINERVADependencies:
     """Dependencies for the MINERVA agent."""
     minerva_client: MINERVA
+    # One per turn: entity lookups made during the turn are batched and cached together
+    graph_loader: GraphBatchLoader = field(default_factory=GraphBatchLoader)
+    # One per turn: checks the Cypher the model writes and budgets its rows and graph time
+    cypher_guard: CypherGuard = field(default_factory=CypherGuard)
 
 # ========== Helper function to get model configuration ==========
 def get_model():
@@ -77,8 +86,12 @@ class ResearchPaperResult(BaseModel):
 
 # ========== Neo4j query tool ==========
 @minerva_agent.tool
-async def query_neo4j(ctx: RunContext[MINERVADependencies], query: str, parameters: Dict = None) -> List[Neo4jResult]:
-    """Query the Neo4j knowledge graph with the given Cypher query.
+async def query_neo4j(ctx: RunContext[MINERVADependencies], query: str, parameters: Dict = None) -> List[Neo4jResult] | Dict:
+    """Query the Neo4j knowledge graph with the given read-only Cypher query.
+    
+    Queries must not write, variable-length patterns need a small upper bound
+    (e.g. [*1..2]), and results are capped (a LIMIT is added when missing).
+    A refused query returns {"error", "message", "hint"}; rewrite it accordingly.
     
     Args:
         ctx: The run context containing dependencies
@@ -86,11 +99,11 @@ async def query_neo4j(ctx: RunContext[MINERVADependencies], query: str, paramete
         parameters: Optional parameters for the query
         
     Returns:
-        A list of formatted Neo4j results
+        A list of formatted Neo4j results, or an error describing why the query was refused
     """
     try:
-        # Execute the query
-        results = ctx.deps.minerva_client.query_neo4j(query, parameters)
+        # Execute the query within this turn's guardrails
+        results = await ctx.deps.cypher_guard.run(ctx.deps.minerva_client, query, parameters)
         
         # Format results
         formatted_results = []
@@ -103,6 +116,9 @@ async def query_neo4j(ctx: RunContext[MINERVADependencies], query: str, paramete
             formatted_results.append(result)
         
         return formatted_results
+    except CypherGuardError as e:
+        print(f"Refused Cypher query: {e}")
+        return e.to_dict()
     except Exception as e:
         print(f"Error querying Neo4j: {str(e)}")
         raise
@@ -131,6 +147,63 @@ async def query_research_papers(ctx: RunContext[MINERVADependencies], question:
         print(f"Error querying research papers: {str(e)}")
         raise
 
+# ========== Entity passage lookup tool ==========
+@minerva_agent.tool
+async def find_entity_passages(ctx: RunContext[MINERVADependencies], entity: str, limit: int = 5) -> List[Dict]:
+    """Find research paper passages that mention a known graph entity.
+    
+    Use this instead of query_research_papers when you already know the
+    microbe, food or disease (its CUI or name) from the knowledge graph.
+    
+    Args:
+        ctx: The run context containing dependencies
+        entity: CUI, name or synonym of a Microbe, Food or Disease
+        limit: Maximum number of passages to return
+        
+    Returns:
+        A list of passages with their source paper
+    """
+    try:
+        return ctx.deps.minerva_client.passages_about(entity, limit=limit)
+    except Exception as e:
+        print(f"Error looking up entity passages: {str(e)}")
+        raise
+
+# ========== Batched entity lookup tool ==========
+@minerva_agent.tool
+async def lookup_entities(ctx: RunContext[MINERVADependencies], microbes: List[str] = None,
+                          diseases: List[str] = None, foods: List[str] = None, key: str = "name") -> Dict:
+    """Look up several knowledge graph entities at once.
+    
+    Prefer one call with every entity you need over several calls with one each.
+    
+    Args:
+        ctx: The run context containing dependencies
+        microbes: Microbe values to look up
+        diseases: Disease values to look up
+        foods: Food values to look up
+        key: Property the values refer to: "name", "cui" or "official_name"
+        
+    Returns:
+        A dictionary of {microbes|diseases|foods: {value: matching nodes}}
+    """
+    try:
+        loader = ctx.deps.graph_loader
+        requested = {'microbes': ('microbe', microbes), 'diseases': ('disease', diseases), 'foods': ('food', foods)}
+
+        def load_all():
+            pending = {
+                group: [(value, loader.load(kind, key, value)) for value in values or []]
+                for group, (kind, values) in requested.items()
+            }
+            return {group: {value: p.result() for value, p in items} for group, items in pending.items() if items}
+
+        # The batched lookups are blocking graph round trips; keep them off the event loop
+        return await asyncio.to_thread(load_all)
+    except Exception as e:
+        print(f"Error looking up entities: {str(e)}")
+        raise
+
 # ========== Food-disease relationship query tool ==========
 @minerva_agent.tool
 async def query_food_relationships(ctx: RunContext[MINERVADependencies], disease_name: str = "Parkinson's Disease") -> Dict:
@@ -144,25 +217,28 @@ async def query_food_relationships(ctx: RunContext[MINERVADependencies], disease
         A dictionary containing food-disease relationships and insights
     """
     try:
-        # First, get the disease CUI
-        disease_query = """
-        MATCH (d:Disease)
-        WHERE toLower(d.name) CONTAINS toLower($disease_name)
-        RETURN d.cui as cui, d.name as name
-        LIMIT 1
-        """
-        disease_result = ctx.deps.minerva_client.query_neo4j(disease_query, {"disease_name": disease_name})
-        
-        if disease_result.empty:
-            return {"error": f"No disease found matching '{disease_name}'"}
-            
-        disease_cui = disease_result.iloc[0]['cui']
-        disease_name = disease_result.iloc[0]['name']
+        # First, get the disease CUI: resolved in memory (exact, prefix or close spelling)
+        # when the entity resolver is enabled, else by a name scan in the graph
+        resolver = await asyncio.to_thread(get_entity_resolver)
+        if resolver is not None and resolver.ready:
+            match = resolver.resolve(disease_name, 'Disease')
+            if match is None:
+                return {"error": f"No disease found matching '{disease_name}'"}
+            disease_cui, disease_name = match.cui, match.name
+        else:
+            disease_result = await ctx.deps.minerva_client.aquery_named('disease_by_name_contains', disease_name=disease_name)
+
+            if disease_result.empty:
+                return {"error": f"No disease found matching '{disease_name}'"}
+
+            disease_cui = disease_result.iloc[0]['cui']
+            disease_name = disease_result.iloc[0]['name']
         
-        # Get food-disease relationships
-        food_relations = ctx.deps.minerva_client.get_disease_food_relations(disease_cui)
+        # Get food-disease relationships from the materialized food-disease table
+        table = await asyncio.to_thread(get_food_disease_table)
+        food_relations = await asyncio.to_thread(table.food_paths, disease_cui)
         
-        if not food_relations:  # Check if list is empty
+        if food_relations.empty:
             return {
                 "disease": disease_name,
                 "message": f"No food relationships found for {disease_name}.",
@@ -180,10 +256,21 @@ async def query_food_relationships(ctx: RunContext[MINERVADependencies], disease
                 "derived_relation": row['derived_relation']
             })
         
+        top_foods = {}
+        for kind in ('protective', 'risk'):
+            top = await asyncio.to_thread(table.top_foods, disease_cui, kind, 5)
+            top_foods[kind] = [
+                {"food": row['food_name'], "food_disease_strength": float(row['food_disease_strength']),
+                 "paths": int(row['path_count'])}
+                for _, row in top.iterrows()
+            ]
+        
         return {
             "disease": disease_name,
             "message": f"Found {len(relationships)} food relationships for {disease_name}.",
-            "relationships": relationships
+            "relationships": relationships,
+            "protective_foods": top_foods['protective'],
+            "risk_foods": top_foods['risk']
         }
         
     except Exception as e:
@@ -270,6 +357,7 @@ async def main():
                     "error": str(e),
                 })
     finally:
+        await close_async_graph_backend()
         print("\nMINERVA agent closed.")
 
 if __name__ == "__main__":
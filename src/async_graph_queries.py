@@ -0,0 +1,388 @@
+"""Awaitable counterpart of components.graph_queries.GraphQueries.
+
+The Streamlit pages and agent tools are coroutines, but every graph lookup
+used to be a blocking call. A page needing five lookups waited for five round
+trips one after the other, and held up the event loop while doing it.
+AsyncGraphQueries runs the same registered queries (query_registry) through
+the event loop's neo4j AsyncDriver, so independent lookups can be awaited
+together:
+
+    queries = await AsyncGraphQueries.create()
+    microbes, diseases, top = await asyncio.gather(
+        queries.get_all_microbes(), queries.get_all_diseases(),
+        queries.rank_by_positive_strength())
+
+Methods and results match GraphQueries one for one. The overview and
+publication statistics (graph_stats), the GRAPH_SNAPSHOT=1 traversals and the PATH_SERVICE=1 shortest
+paths are answered in memory and are shared with the synchronous layer.
+create() loads those services in a worker thread, and the STRENGTH rankings
+are checked for graph changes in one before each ranking call, so neither
+blocks the event loop.
+
+Usage (from ``src/``):
+    python async_graph_queries.py
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from graph_backend import get_async_graph_backend
+from graph_loader import BATCHES, relationship_frame
+from graph_snapshot import get_graph_snapshot
+from path_service import get_path_service
+from entity_resolver import get_entity_resolver
+from strength_rankings import get_strength_rankings
+from graph_stats import get_graph_stats
+from metrics import log_csv, now_iso
+from query_registry import (PAGE_KEYS, PUBLICATION_PAGE_MAX, PUBLICATION_PAGE_SIZE, decode_cursor, encode_cursor,
+                            get_query)
+from strength_scoring import score_records
+
+
+class AsyncGraphQueries:
+    """Graph queries as coroutines, on the running event loop's graph backend.
+
+    Create it with ``await AsyncGraphQueries.create()`` inside the coroutine that
+    uses it (each asyncio.run() has its own driver, see
+    neo4j_pool.get_async_connection_manager). Constructed directly, it has no
+    in-memory services and sends every lookup to the graph backend.
+
+    Args:
+        db: Async graph backend (get_async_graph_backend() by default)
+    """
+
+    def __init__(self, db=None):
+        self.db = db or get_async_graph_backend()
+        self.stats = get_graph_stats()
+        self.snapshot = None
+        self.paths = None
+        self.resolver = None
+        self.rankings = None
+
+    @classmethod
+    async def create(cls, db=None) -> "AsyncGraphQueries":
+        """Queries with the in-memory services, loaded in a worker thread rather than on the event loop."""
+        queries = cls(db)
+        await asyncio.to_thread(queries._load_services)
+        return queries
+
+    def _load_services(self):
+        if os.getenv('GRAPH_SNAPSHOT', '0') == '1':
+            try:
+                self.snapshot = get_graph_snapshot()
+            except Exception as e:
+                print(f"Graph snapshot unavailable, querying Neo4j directly: {e}")
+        if os.getenv('PATH_SERVICE', '0') == '1':
+            try:
+                self.paths = get_path_service()
+            except Exception as e:
+                print(f"Path service unavailable, querying Neo4j directly: {e}")
+        try:
+            self.resolver = get_entity_resolver()
+        except Exception as e:
+            print(f"Entity resolver unavailable, matching names in Neo4j: {e}")
+        try:
+            self.rankings = get_strength_rankings()
+        except Exception as e:
+            print(f"Strength rankings unavailable, sorting in Neo4j: {e}")
+
+    async def is_available(self) -> bool:
+        return await self.db.is_available()
+
+    async def _run_timed(self, query: str, params: Optional[Dict] = None, label: str = "") -> List[Dict]:
+        t0 = time.perf_counter()
+        data = await self.db.run(query, params)
+        dt_ms = (time.perf_counter() - t0) * 1000
+        print(f"[METRIC] neo4j_query_ms={dt_ms:.2f} label={label} rows={len(data)} async=1")
+        log_csv({
+            "ts": now_iso(),
+            "metric": "neo4j_query",
+            "label": label,
+            "ms": round(dt_ms, 2),
+            "rows": len(data)
+        })
+        return data
+
+    async def run_named(self, name: str, *variant: str, label: str = "", **params) -> List[Dict]:
+        """Run a registered query (see query_registry) with type-checked parameters."""
+        query = get_query(name, *variant)
+        return await self._run_timed(query.cypher, query.bind(**params), label=label or query.name)
+
+    def _snapshot(self, method, *args):
+        # In-memory CSR traversals take microseconds; no point leaving the loop
+        return method(*args)
+
+    async def _current_rankings(self):
+        """The in-memory rankings after their change check (a graph round trip, so in a worker thread)."""
+        if self.rankings is not None:
+            await asyncio.to_thread(self.rankings.refresh_if_stale)
+        return self.rankings
+
+    # --- overview statistics -----------------------------------------------------
+
+    async def count_nodes(self, label='Microbe'):
+        return await asyncio.to_thread(self.stats.count_nodes, label)
+
+    async def count_papers(self):
+        return await asyncio.to_thread(self.stats.count_papers)
+
+    async def count_relationships(self):
+        return await asyncio.to_thread(self.stats.count_relationships)
+
+    async def get_relationships_by_year(self):
+        return await asyncio.to_thread(self.stats.relationships_by_year)
+
+    async def get_publications_by_year(self):
+        return await asyncio.to_thread(self.stats.publications_by_year)
+
+    async def get_more_relevant_papers(self, n=10):
+        return await asyncio.to_thread(self.stats.more_relevant_papers, n)
+
+    async def get_publications_by_journal(self, n=10):
+        return await asyncio.to_thread(self.stats.publications_by_journal, n)
+
+    # --- entity lookups ----------------------------------------------------------
+
+    async def _lookup(self, kind: str, variant: tuple, keys: List) -> Dict:
+        """One batched query for keys of one kind; returns {key: rows}."""
+        spec = BATCHES[kind]
+        keys = list(OrderedDict.fromkeys(keys))
+        rows = await self.run_named(spec.template, *variant, label=f"{spec.template}_async",
+                                    **{spec.param: [spec.to_param(k) for k in keys]})
+        fanned = {key: [] for key in keys}
+        for row in rows:
+            row = dict(row)
+            fanned.setdefault(spec.row_key(row), []).append(row)
+        return fanned
+
+    async def get_entities_by_property(self, label, dictos):
+        """
+        Look up several Microbe/Disease/Food nodes at once ({property: value} each); the
+        queries of different property keys run concurrently. Returns the first match or None per dicto.
+        """
+        kind = label.lower()
+        items = [list(dicto.items())[0] for dicto in dictos]
+        by_key: Dict[str, List[str]] = OrderedDict()
+        for key, value in items:
+            by_key.setdefault(key, []).append(value)
+        found = await asyncio.gather(*(self._lookup(kind, (key,), values) for key, values in by_key.items()))
+        found = dict(zip(by_key, found))
+        return [next(iter(found[key].get(value, [])), None) for key, value in items]
+
+    async def get_microbe_by_property(self, dicto):
+        return (await self.get_entities_by_property('Microbe', [dicto]))[0]
+
+    async def get_disease_by_property(self, dicto):
+        return (await self.get_entities_by_property('Disease', [dicto]))[0]
+
+    async def get_food_by_property(self, dicto):
+        return (await self.get_entities_by_property('Food', [dicto]))[0]
+
+    async def _pair_lookup(self, kind, m_dicto, d_dicto):
+        (d_key, d_value), (m_key, m_value) = list(d_dicto.items())[0], list(m_dicto.items())[0]
+        found = await self._lookup(kind, (d_key, m_key), [(d_value, m_value)])
+        return found[(d_value, m_value)]
+
+    async def get_relationship_by_microbe_disease(self, m_dicto, d_dicto):
+        return relationship_frame(await self._pair_lookup('relationship', m_dicto, d_dicto))
+
+    async def get_strength_by_microbe_disease(self, m_dicto, d_dicto):
+        return await self._pair_lookup('strength', m_dicto, d_dicto)
+
+    async def get_shortest_path_by_microbe_disease(self, m_dicto, d_dicto):
+        (d_key, d_value), (m_key, m_value) = list(d_dicto.items())[0], list(m_dicto.items())[0]
+        if self.paths is not None:
+            # A BFS over large frontiers can take a few ms; keep it off the loop
+            return await asyncio.to_thread(self.paths.shortest_path_by_microbe_disease, m_key, m_value, d_key, d_value)
+        return await self.run_named('shortest_path_by_microbe_disease', m_key, d_key,
+                                    microbe=m_value, disease=d_value, label="get_shortest_path_by_microbe_disease")
+
+    # --- traversals --------------------------------------------------------------
+
+    async def get_disease_food_relations(self, cui):
+        if self.snapshot is not None:
+            result = self._snapshot(self.snapshot.disease_food_relations, cui)
+        else:
+            result = await self.run_named('disease_food_relations', cui=cui, label="get_disease_food_relations")
+        return score_records(result)
+
+    async def get_food_disease_relations(self, cui):
+        if self.snapshot is not None:
+            result = self._snapshot(self.snapshot.food_disease_relations, cui)
+        else:
+            result = await self.run_named('food_disease_relations', cui=cui, label="get_food_disease_relations")
+        return pd.DataFrame(score_records(result))
+
+    async def find_one_hop_disease_food(self, cui):
+        if self.snapshot is not None:
+            return self._snapshot(self.snapshot.neighbourhood, 'Disease', cui, 2)
+        return await self.run_named('two_hop_neighbourhood', 'Disease', cui=cui, label="find_one_hop_disease_food")
+
+    async def find_one_hop_food(self, cui):
+        if self.snapshot is not None:
+            return self._snapshot(self.snapshot.neighbourhood, 'Food', cui, 2)
+        return await self.run_named('two_hop_neighbourhood', 'Food', cui=cui, label="find_one_hop_food")
+
+    async def find_one_hop_microbe(self, cui):
+        if self.snapshot is not None:
+            return pd.DataFrame(self._snapshot(self.snapshot.neighbourhood, 'Microbe', cui, 1))
+        return pd.DataFrame(await self.run_named('one_hop_neighbourhood', 'Microbe', cui=cui,
+                                                 label="find_one_hop_microbe"))
+
+    async def find_one_hop_disease(self, cui):
+        if self.snapshot is not None:
+            return pd.DataFrame(self._snapshot(self.snapshot.neighbourhood, 'Disease', cui, 1))
+        return pd.DataFrame(await self.run_named('one_hop_neighbourhood', 'Disease', cui=cui,
+                                                 label="find_one_hop_disease"))
+
+    async def get_food_relations(self, cui, rel_type='POSITIVE'):
+        sign = 'positive' if rel_type.upper() == 'POSITIVE' else 'negative'
+        if self.snapshot is not None:
+            return self._snapshot(self.snapshot.food_relations, cui, sign)
+        return await self.run_named('food_relations', sign, cui=cui, label="get_food_relations")
+
+    async def get_microbe_relations(self, cui, rel_type='POSITIVE'):
+        sign = 'positive' if rel_type == 'POSITIVE' else 'negative'
+        if self.snapshot is not None:
+            return pd.DataFrame(self._snapshot(self.snapshot.microbe_relations, cui, sign))
+        return pd.DataFrame(await self.run_named('microbe_relations', sign, cui=cui,
+                                                 label=f"get_microbe_relations_{rel_type.lower()}"))
+
+    async def get_disease_relations(self, cui, rel_type='POSITIVE'):
+        sign = 'positive' if rel_type == 'POSITIVE' else 'negative'
+        if self.snapshot is not None:
+            return pd.DataFrame(self._snapshot(self.snapshot.disease_relations, cui, sign))
+        return pd.DataFrame(await self.run_named('disease_relations', sign, cui=cui,
+                                                 label=f"get_disease_relations_{rel_type.lower()}"))
+
+    async def get_food_microbiomes(self, food_name):
+        if self.resolver is not None and self.resolver.ready:
+            cuis = self.resolver.cuis(food_name, 'Food', fields=('name', 'official_name'))
+            if not cuis:
+                return []
+            return await self.run_named('food_microbiomes_by_cui', cuis=cuis, label="get_food_microbiomes")
+        return await self.run_named('food_microbiomes', food_name=food_name, label="get_food_microbiomes")
+
+    # --- listings and rankings ---------------------------------------------------
+
+    async def get_all_food(self):
+        return await self.run_named('all_food', label="get_all_food")
+
+    async def get_all_microbes(self):
+        result = await self.run_named('all_microbes', label="get_all_microbes")
+        return pd.DataFrame(result).sort_values('name', ascending=True)
+
+    async def get_all_diseases(self):
+        result = await self.run_named('all_diseases', label="get_all_diseases")
+        return pd.DataFrame(result).sort_values('name', ascending=True)
+
+    async def get_microbes_with_more_connections_pos_neg(self, n=10):
+        rankings = await self._current_rankings()
+        if rankings is not None:
+            return self._snapshot(rankings.connections, 'Microbe', n)
+        return await self.run_named('microbes_with_more_connections', n=n,
+                                    label="get_microbes_with_more_connections_pos_neg")
+
+    async def get_microbes_with_more_references_pos_neg(self, n=10):
+        return await self.run_named('microbes_with_more_references', n=n,
+                                    label="get_microbes_with_more_references_pos_neg")
+
+    async def get_diseases_with_more_connections_pos_neg(self, n=10):
+        rankings = await self._current_rankings()
+        if rankings is not None:
+            return self._snapshot(rankings.connections, 'Disease', n)
+        return await self.run_named('diseases_with_more_connections', n=n,
+                                    label="get_diseases_with_more_connections_pos_neg")
+
+    async def get_diseases_with_more_references_pos_neg(self, n=10):
+        return await self.run_named('diseases_with_more_references', n=n,
+                                    label="get_diseases_with_more_references_pos_neg")
+
+    async def _rank_by_strength(self, strength_type, order, n, microbe_cui, disease_cui, label):
+        rankings = await self._current_rankings()
+        if rankings is not None:
+            return self._snapshot(rankings.top, strength_type, n, order, microbe_cui, disease_cui)
+        if microbe_cui is not None and disease_cui is not None:
+            raise ValueError("Filter by microbe_cui or by disease_cui, not both")
+        if microbe_cui is not None:
+            return await self.run_named('rank_by_strength_for', strength_type, order, 'Microbe', cui=microbe_cui, n=n,
+                                        label=label)
+        if disease_cui is not None:
+            return await self.run_named('rank_by_strength_for', strength_type, order, 'Disease', cui=disease_cui, n=n,
+                                        label=label)
+        return await self.run_named('rank_by_strength', strength_type, order, n=n, label=label)
+
+    async def rank_by_positive_strength(self, strength_type='strength_raw', n=10, microbe_cui=None, disease_cui=None):
+        return pd.DataFrame(await self._rank_by_strength(strength_type, 'DESC', n, microbe_cui, disease_cui,
+                                                         "rank_by_positive_strength"))
+
+    async def rank_by_negative_strength(self, strength_type='strength_raw', n=10, microbe_cui=None, disease_cui=None):
+        return pd.DataFrame(await self._rank_by_strength(strength_type, 'ASC', n, microbe_cui, disease_cui,
+                                                         "rank_by_negative_strength"))
+
+    async def popularity_in_time(self, label='Microbe', cui=''):
+        return pd.DataFrame(await asyncio.to_thread(self.stats.popularity_in_time, label, cui))
+
+    # --- publications ------------------------------------------------------------
+
+    async def get_related_publications_food(self, cui=''):
+        return await self.run_named('related_publications', 'Food', cui=cui, label="get_related_publications_food")
+
+    async def get_related_publications_microbe(self, cui=''):
+        return pd.DataFrame(await self.run_named('related_publications', 'Microbe', cui=cui,
+                                                 label="get_related_publications_microbe"))
+
+    async def get_related_publications_disease(self, cui=''):
+        return pd.DataFrame(await self.run_named('related_publications', 'Disease', cui=cui,
+                                                 label="get_related_publications_disease"))
+
+    async def _related_publications_rows(self, label, cui, cursor, page_size):
+        page_size = max(1, min(int(page_size), PUBLICATION_PAGE_MAX))
+        if cursor is None:
+            rows = await self.run_named('related_publications_page', label, 'first', cui=cui, limit=page_size,
+                                        label=f"related_publications_page_{label.lower()}")
+        else:
+            rows = await self.run_named('related_publications_page', label, 'after', cui=cui, limit=page_size,
+                                        label=f"related_publications_page_{label.lower()}", **decode_cursor(cursor))
+        next_cursor = encode_cursor(rows[-1]) if len(rows) == page_size else None
+        return [{k: v for k, v in row.items() if k not in PAGE_KEYS} for row in rows], next_cursor
+
+    async def get_related_publications_page(self, label='Microbe', cui='', cursor=None,
+                                            page_size=PUBLICATION_PAGE_SIZE):
+        """One page of related publications and the cursor of the next (see GraphQueries)."""
+        rows, next_cursor = await self._related_publications_rows(label, cui, cursor, page_size)
+        return pd.DataFrame(rows), next_cursor
+
+    async def iter_related_publications(self, label='Microbe', cui='', page_size=PUBLICATION_PAGE_MAX):
+        """Async-iterate every related publication row (dicts) page by page."""
+        cursor = None
+        while True:
+            rows, cursor = await self._related_publications_rows(label, cui, cursor, page_size)
+            for row in rows:
+                yield row
+            if cursor is None:
+                return
+
+
+async def _main():
+    queries = await AsyncGraphQueries.create()
+    t0 = time.perf_counter()
+    results = await asyncio.gather(
+        queries.get_all_microbes(),
+        queries.get_all_diseases(),
+        queries.rank_by_positive_strength(),
+        queries.rank_by_negative_strength(),
+        queries.get_microbes_with_more_connections_pos_neg(),
+        queries.get_diseases_with_more_connections_pos_neg(),
+    )
+    print(f"6 queries awaited together: {(time.perf_counter() - t0) * 1000:.1f} ms, "
+          f"rows={[len(r) for r in results]}")
+    await queries.db.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(_main())
@@ -0,0 +1,128 @@
+"""Plan-cache hit rate of GraphQueries before and after query parameterization.
+
+Replays a repeated-entity workload (the entity pages opened over and over
+for a skewed set of CUIs) in two forms:
+
+  inline       entity values spliced into the query text, as the str.format
+               queries did before the named-query registry
+  registry     the registered templates with values passed as parameters
+
+Neo4j caches plans by query text, so the hit rate is computed by replaying
+the texts through an LRU cache of the server's default size
+(server.db.query_cache_size = 1000). With --live, both forms are also run
+against the configured Neo4j (after db.clearQueryCaches()) and the mean
+server-side time to first record, which includes planning, is reported.
+
+Usage (from ``src/``):
+    python bench_plan_cache.py [--calls 2000] [--entities 200] [--live]
+"""
+import argparse
+import json
+import random
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from query_registry import get_query
+
+# (template, variants, parameter) for the per-entity queries the pages issue
+WORKLOAD = [
+    ('food_relations', ('positive',), 'cui'),
+    ('food_relations', ('negative',), 'cui'),
+    ('two_hop_neighbourhood', ('Food',), 'cui'),
+    ('related_publications', ('Food',), 'cui'),
+    ('food_disease_relations', (), 'cui'),
+    ('disease_food_relations', (), 'cui'),
+    ('two_hop_neighbourhood', ('Disease',), 'cui'),
+    ('microbe_relations', ('positive',), 'cui'),
+    ('microbe_relations', ('negative',), 'cui'),
+    ('one_hop_neighbourhood', ('Microbe',), 'cui'),
+    ('popularity_in_time', ('Microbe',), 'cui'),
+    ('related_publications', ('Microbe',), 'cui'),
+    ('disease_by_property', ('cui',), 'value'),
+    ('food_by_property', ('cui',), 'value'),
+]
+
+
+def _literal(value) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+    return str(value)
+
+
+def inline_parameters(cypher: str, params: Dict) -> str:
+    """Splice parameter values into the query text (longest names first)."""
+    for key in sorted(params, key=len, reverse=True):
+        cypher = cypher.replace(f"${key}", _literal(params[key]))
+    return cypher
+
+
+def build_workload(calls: int, entities: int, seed: int = 0) -> List[Tuple[str, Dict]]:
+    """Sample calls with a Zipf-like skew over entity CUIs."""
+    rng = random.Random(seed)
+    cuis = [f"C{i:07d}" for i in range(entities)]
+    weights = [1.0 / (rank + 1) for rank in range(entities)]
+    workload = []
+    for _ in range(calls):
+        name, variant, param = rng.choice(WORKLOAD)
+        query = get_query(name, *variant)
+        cui = rng.choices(cuis, weights)[0]
+        workload.append((query.cypher, query.bind(**{param: cui})))
+    return workload
+
+
+def replay_plan_cache(texts: List[str], cache_size: int = 1000) -> Dict:
+    """Hits/misses of an LRU plan cache keyed on query text."""
+    cache: "OrderedDict[str, None]" = OrderedDict()
+    hits = 0
+    for text in texts:
+        if text in cache:
+            hits += 1
+            cache.move_to_end(text)
+        else:
+            cache[text] = None
+            if len(cache) > cache_size:
+                cache.popitem(last=False)
+    return {
+        'queries': len(texts),
+        'distinct_texts': len(set(texts)),
+        'hits': hits,
+        'misses': len(texts) - hits,
+        'hit_rate': round(hits / len(texts), 4) if texts else 0.0,
+    }
+
+
+def run_live(workload: List[Tuple[str, Dict]], inline: bool) -> Dict:
+    """Run the workload against Neo4j and report the mean time to first record."""
+    from neo4j_pool import get_connection_manager
+    driver = get_connection_manager().driver
+    with driver.session(database=get_connection_manager().database) as session:
+        session.run("CALL db.clearQueryCaches()").consume()
+        available_after = []
+        for cypher, params in workload:
+            result = session.run(inline_parameters(cypher, params), {} if inline else params)
+            summary = result.consume()
+            available_after.append(summary.result_available_after or 0)
+    return {
+        'mean_available_after_ms': round(sum(available_after) / len(available_after), 3),
+        'first_100_mean_ms': round(sum(available_after[:100]) / min(100, len(available_after)), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan-cache hit rate before/after query parameterization")
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--entities', type=int, default=200)
+    parser.add_argument('--cache-size', type=int, default=1000, help="Neo4j server.db.query_cache_size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--live', action='store_true', help="Also run both workloads against Neo4j")
+    args = parser.parse_args()
+
+    workload = build_workload(args.calls, args.entities, args.seed)
+    report = {
+        'inline': replay_plan_cache([inline_parameters(c, p) for c, p in workload], args.cache_size),
+        'registry': replay_plan_cache([c for c, _ in workload], args.cache_size),
+    }
+    if args.live:
+        report['inline'].update(run_live(workload, inline=True))
+        report['registry'].update(run_live(workload, inline=False))
+    print(json.dumps(report, indent=2))
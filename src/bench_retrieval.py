@@ -0,0 +1,295 @@
+"""Offline retrieval benchmark over the bundled papers.
+
+Loads the cached paper texts and embeddings from ``cache/*.pdf.json`` and the
+labelled questions in ``benchmarks/retrieval_qrels.json``, then measures
+recall@k, MRR and per-query search latency for a matrix of index, chunking and
+compression configurations. Results are written as JSON tagged with the git
+commit so runs can be compared across commits.
+
+Usage (from ``src/``):
+    python bench_retrieval.py
+    python bench_retrieval.py --configs cached:flat_l2 cached:hnsw hashing-500-100:flat_l2
+    python bench_retrieval.py --embed-queries   # fill the query embedding cache (needs OpenAI)
+
+Configurations are ``<corpus>:<index>``. ``cached`` uses the stored OpenAI
+vectors (1000/200 chunking, as built by MINERVA); ``hashing-<size>-<overlap>``
+re-chunks the cached text and embeds it with the local hashing backend.
+Question vectors for the ``cached`` corpus come from
+``benchmarks/query_embeddings.json``; without them those configurations only
+report index fidelity (overlap with exact search), which needs no queries.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import re
+import subprocess
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from embeddings import HashingEmbeddingBackend, OpenAIEmbeddingBackend
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(ROOT_DIR, "cache")
+QRELS_FILE = os.path.join(ROOT_DIR, "benchmarks", "retrieval_qrels.json")
+QUERY_EMBEDDINGS_FILE = os.path.join(ROOT_DIR, "benchmarks", "query_embeddings.json")
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+CACHED_CHUNK_SIZE = 1000
+CACHED_CHUNK_OVERLAP = 200
+INDEX_TYPES = ["flat_l2", "hnsw", "ivf", "sq8", "fp16", "pq"]
+DEFAULT_CONFIGS = [f"cached:{index}" for index in INDEX_TYPES] + [
+    "hashing-1000-200:flat_l2",
+    "hashing-500-100:flat_l2",
+    "hashing-2000-400:flat_l2",
+    "hashing-1000-200:hnsw",
+]
+KS = (1, 3, 5, 10)
+
+
+def _normalize(text: str) -> str:
+    # PDF extraction drops or inserts spaces unpredictably, so compare without any
+    return re.sub(r"\s+", "", text).lower()
+
+
+def load_cached_papers(cache_dir: str = CACHE_DIR) -> List[Dict]:
+    papers = []
+    for path in sorted(glob.glob(os.path.join(cache_dir, "*.pdf.json"))):
+        with open(path) as f:
+            papers.append(json.load(f))
+    if not papers:
+        raise ValueError(f"No cached papers found in {cache_dir}")
+    return papers
+
+
+def build_corpus(papers: List[Dict], chunk_size: int, chunk_overlap: int) -> List[Dict]:
+    """Split every paper the same way MINERVA.load_research_papers does."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    corpus = []
+    for paper in papers:
+        for text in splitter.split_text(paper["text"]):
+            corpus.append({"paper": paper["title"], "text": text})
+    return corpus
+
+
+def cached_vectors(papers: List[Dict], corpus: List[Dict]) -> np.ndarray:
+    vectors = []
+    for paper in papers:
+        vectors.extend(paper["embedding"])
+    if len(vectors) != len(corpus):
+        raise ValueError(
+            f"Cached embeddings ({len(vectors)}) do not line up with "
+            f"{CACHED_CHUNK_SIZE}/{CACHED_CHUNK_OVERLAP} chunks ({len(corpus)})"
+        )
+    return np.asarray(vectors, dtype="float32")
+
+
+def relevant_ids(corpus: List[Dict], question: Dict) -> set:
+    snippets = [_normalize(s) for s in question["snippets"]]
+    return {
+        i for i, chunk in enumerate(corpus)
+        if chunk["paper"] == question["paper"] and any(s in _normalize(chunk["text"]) for s in snippets)
+    }
+
+
+def build_index(kind: str, vectors: np.ndarray):
+    """Build one FAISS index variant; flat_l2 is what the LangChain FAISS store uses."""
+    n, dim = vectors.shape
+    if kind == "flat_l2":
+        index = faiss.IndexFlatL2(dim)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, 32)
+        index.hnsw.efSearch = 64
+    elif kind == "ivf":
+        nlist = max(1, int(np.sqrt(n)))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, nlist)
+        index.train(vectors)
+        index.nprobe = max(1, nlist // 5)
+    elif kind == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit)
+        index.train(vectors)
+    elif kind == "fp16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16)
+        index.train(vectors)
+    elif kind == "pq":
+        nbits = min(8, int(np.log2(n)))
+        index = faiss.IndexPQ(dim, dim // 32, nbits)
+        index.train(vectors)
+    else:
+        raise ValueError(f"Unknown index type '{kind}'. Choose one of: {', '.join(INDEX_TYPES)}")
+    index.add(vectors)
+    return index
+
+
+def load_query_embeddings() -> Dict[str, List[float]]:
+    if not os.path.exists(QUERY_EMBEDDINGS_FILE):
+        return {}
+    with open(QUERY_EMBEDDINGS_FILE) as f:
+        return json.load(f)
+
+
+def embed_missing_queries(questions: List[Dict]) -> Dict[str, List[float]]:
+    """Embed questions with OpenAI once and cache them so later runs are offline."""
+    cache = load_query_embeddings()
+    missing = [q["question"] for q in questions if q["question"] not in cache]
+    if missing:
+        backend = OpenAIEmbeddingBackend()
+        for question, vector in zip(missing, backend.embed_documents(missing)):
+            cache[question] = vector
+        os.makedirs(os.path.dirname(QUERY_EMBEDDINGS_FILE), exist_ok=True)
+        with open(QUERY_EMBEDDINGS_FILE, "w") as f:
+            json.dump(cache, f)
+        print(f"Cached {len(missing)} query embeddings in {QUERY_EMBEDDINGS_FILE}")
+    return cache
+
+
+def evaluate(index, query_vectors: np.ndarray, relevant: List[set]) -> Dict:
+    """recall@k counts a question as answered when any relevant chunk is in the top k."""
+    max_k = max(KS)
+    hits = {k: 0 for k in KS}
+    reciprocal_ranks = []
+    latencies = []
+    for vector, rel in zip(query_vectors, relevant):
+        t0 = time.perf_counter()
+        _, ids = index.search(vector.reshape(1, -1), max_k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        ranked = [int(i) for i in ids[0] if i >= 0]
+        rank = next((r for r, i in enumerate(ranked, start=1) if i in rel), None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        for k in KS:
+            hits[k] += int(rank is not None and rank <= k)
+    n = len(relevant)
+    return {
+        **{f"recall@{k}": round(hits[k] / n, 4) for k in KS},
+        f"mrr@{max_k}": round(float(np.mean(reciprocal_ranks)), 4),
+        "latency_ms": _latency_summary(latencies),
+    }
+
+
+def fidelity(index, exact, vectors: np.ndarray, k: int = 10, sample: int = 200) -> float:
+    """Mean overlap between this index's top k and exact search, using chunks as queries."""
+    if index is exact:
+        return 1.0
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(vectors), size=min(sample, len(vectors)), replace=False)
+    _, approx_ids = index.search(vectors[rows], k)
+    _, exact_ids = exact.search(vectors[rows], k)
+    overlaps = [len(set(a) & set(e)) / k for a, e in zip(approx_ids, exact_ids)]
+    return round(float(np.mean(overlaps)), 4)
+
+
+def _latency_summary(latencies: List[float]) -> Dict:
+    values = np.asarray(latencies)
+    return {
+        "mean": round(float(values.mean()), 4),
+        "p50": round(float(np.percentile(values, 50)), 4),
+        "p95": round(float(np.percentile(values, 95)), 4),
+    }
+
+
+def _index_bytes(index) -> int:
+    return int(faiss.serialize_index(index).size)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def run_benchmark(configs: List[str], embed_queries: bool = False) -> Dict:
+    papers = load_cached_papers()
+    with open(QRELS_FILE) as f:
+        questions = json.load(f)["questions"]
+    query_cache = embed_missing_queries(questions) if embed_queries else load_query_embeddings()
+    hashing = HashingEmbeddingBackend()
+
+    corpora = {}
+    results = []
+    for config in configs:
+        corpus_name, index_kind = config.split(":")
+        if corpus_name not in corpora:
+            t0 = time.perf_counter()
+            if corpus_name == "cached":
+                corpus = build_corpus(papers, CACHED_CHUNK_SIZE, CACHED_CHUNK_OVERLAP)
+                vectors = cached_vectors(papers, corpus)
+                missing = [q for q in questions if q["question"] not in query_cache]
+                queries = None if missing else np.asarray(
+                    [query_cache[q["question"]] for q in questions], dtype="float32"
+                )
+            elif corpus_name.startswith("hashing-"):
+                _, size, overlap = corpus_name.split("-")
+                corpus = build_corpus(papers, int(size), int(overlap))
+                vectors = np.asarray(hashing.embed_documents([c["text"] for c in corpus]), dtype="float32")
+                queries = np.asarray(hashing.embed_documents([q["question"] for q in questions]), dtype="float32")
+            else:
+                raise ValueError(f"Unknown corpus '{corpus_name}'")
+            embed_ms = (time.perf_counter() - t0) * 1000
+            exact = build_index("flat_l2", vectors)
+            corpora[corpus_name] = (corpus, vectors, queries, exact, embed_ms)
+
+        corpus, vectors, queries, exact, embed_ms = corpora[corpus_name]
+        t0 = time.perf_counter()
+        index = exact if index_kind == "flat_l2" else build_index(index_kind, vectors)
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        row = {
+            "config": config,
+            "corpus": corpus_name,
+            "index": index_kind,
+            "chunks": len(corpus),
+            "dim": int(vectors.shape[1]),
+            "corpus_embed_ms": round(embed_ms, 2),
+            "build_ms": round(build_ms, 2),
+            "index_bytes": _index_bytes(index),
+            "overlap_with_flat@10": fidelity(index, exact, vectors),
+        }
+        if queries is None:
+            row["skipped"] = "no cached query embeddings; run with --embed-queries once with OpenAI access"
+        else:
+            relevant = [relevant_ids(corpus, q) for q in questions]
+            row.update(evaluate(index, queries, relevant))
+        print(f"[BENCH] {json.dumps(row)}")
+        results.append(row)
+
+    return {
+        "benchmark": "retrieval",
+        "commit": _git_commit(),
+        "ts": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "faiss": faiss.__version__,
+        "questions": len(questions),
+        "papers": len(papers),
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark over the cached paper embeddings")
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS,
+                        help="Configurations as <corpus>:<index>, e.g. cached:hnsw hashing-500-100:flat_l2")
+    parser.add_argument("--output", help="Output JSON path (default: benchmarks/results/retrieval_<commit>.json)")
+    parser.add_argument("--embed-queries", action="store_true",
+                        help="Embed uncached questions with OpenAI and store them for offline runs")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.configs, embed_queries=args.embed_queries)
+    output = args.output or os.path.join(RESULTS_DIR, f"retrieval_{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Microbe-disease shortest paths: the registered Cypher vs the in-memory path service.
+
+Builds a synthetic graph of --nodes Microbe/Disease/Food nodes and --edges
+relationships. Edge endpoints are drawn from a power law, so a few hubs
+touch a large share of the graph, as "Bacteria" does. A small share of the
+nodes forms a separate component, so some pairs have no path. For --pairs
+random (microbe, disease) pairs it times:
+
+  cypher         the shortest_path_by_microbe_disease query, run by the embedded
+                 backend (a BFS from the microbe, as the query describes)
+  bidirectional  PathService without landmarks
+  landmarks      PathService with --landmarks landmark nodes
+
+Path lengths are checked to agree for every pair before timings are
+reported. With --live, the same comparison runs against the configured Neo4j
+on its own microbes and diseases, using the server's shortestPath.
+
+Usage (from ``src/``):
+    python bench_shortest_path.py [--nodes 100000] [--edges 500000] [--pairs 100] [--landmarks 8] [--live]
+"""
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from graph_backend import DATASET_FORMAT, EmbeddedGraphBackend
+from path_service import PathService
+from query_registry import get_query
+
+LABELS = ('Microbe', 'Disease', 'Food')
+TYPES = ('STRENGTH', 'POSITIVE', 'NEGATIVE', 'PARENT')
+
+
+def make_graph(n_nodes: int, n_edges: int, detached: float = 0.02, seed: int = 0):
+    """Nodes and relationships in the dataset format, with power-law degrees and a detached component."""
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(len(LABELS), n_nodes, p=[0.5, 0.2, 0.3])
+    nodes = [{'id': f"n{i}", 'labels': [LABELS[labels[i]]],
+              'properties': {'cui': f"C{i:07d}", 'name': f"{LABELS[labels[i]]} {i}"}} for i in range(n_nodes)]
+
+    n_detached = max(2, int(n_nodes * detached))
+    main = n_nodes - n_detached
+    # Power-law endpoint popularity: the first nodes of each component are the hubs
+    weights = 1.0 / np.arange(1, main + 1) ** 0.9
+    main_edges = int(n_edges * (1 - detached))
+    sources = rng.integers(0, main, main_edges)
+    targets = rng.choice(main, main_edges, p=weights / weights.sum())
+    detached_sources = rng.integers(main, n_nodes, n_edges - main_edges)
+    detached_targets = rng.integers(main, n_nodes, n_edges - main_edges)
+    sources = np.concatenate([sources, detached_sources])
+    targets = np.concatenate([targets, detached_targets])
+    types = rng.integers(0, len(TYPES), len(sources))
+    relationships = [{'id': f"r{i}", 'type': TYPES[t], 'start': f"n{s}", 'end': f"n{e}", 'properties': {}}
+                     for i, (s, e, t) in enumerate(zip(sources.tolist(), targets.tolist(), types.tolist())) if s != e]
+    return nodes, relationships
+
+
+def sample_pairs(nodes, pairs: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    microbes = [n['properties']['cui'] for n in nodes if n['labels'][0] == 'Microbe']
+    diseases = [n['properties']['cui'] for n in nodes if n['labels'][0] == 'Disease']
+    return list(zip(rng.choice(microbes, pairs).tolist(), rng.choice(diseases, pairs).tolist()))
+
+
+def run_all(fn, pairs):
+    """Path length per pair (None without a path) and per-pair seconds."""
+    lengths, times = [], []
+    for microbe, disease in pairs:
+        t0 = time.perf_counter()
+        rows = fn(microbe, disease)
+        times.append(time.perf_counter() - t0)
+        lengths.append((len(rows[0]['p']) - 1) // 2 if rows else None)
+    return lengths, np.array(times)
+
+
+def summary(times: np.ndarray) -> dict:
+    return {'mean_ms': round(times.mean() * 1000, 3), 'p50_ms': round(np.percentile(times, 50) * 1000, 3),
+            'p95_ms': round(np.percentile(times, 95) * 1000, 3), 'max_ms': round(times.max() * 1000, 3)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cypher shortestPath vs the in-memory path service")
+    parser.add_argument('--nodes', type=int, default=100_000)
+    parser.add_argument('--edges', type=int, default=500_000)
+    parser.add_argument('--pairs', type=int, default=100)
+    parser.add_argument('--landmarks', type=int, default=8)
+    parser.add_argument('--live', action='store_true', help="Compare against the configured Neo4j instead")
+    args = parser.parse_args()
+
+    query = get_query('shortest_path_by_microbe_disease', 'cui', 'cui')
+    if args.live:
+        from neo4j_pool import get_connection_manager
+        db = get_connection_manager()
+        nodes = db.run(get_query('path_nodes').cypher)
+        edges = db.run(get_query('path_edges').cypher)
+        pairs = sample_pairs([n for n in nodes if n['labels'] and n['labels'][0] in LABELS
+                              and (n.get('properties') or {}).get('cui')], args.pairs)
+    else:
+        nodes, relationships = make_graph(args.nodes, args.edges)
+        pairs = sample_pairs(nodes, args.pairs)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'graph.json.gz')
+            with gzip.open(path, 'wt', encoding='utf-8') as f:
+                json.dump({'format': DATASET_FORMAT, 'nodes': nodes, 'relationships': relationships}, f)
+            db = EmbeddedGraphBackend(path)
+        edges = [{'source': r['start'], 'target': r['end'], 'type': r['type']} for r in relationships]
+
+    def cypher(microbe, disease):
+        return db.run(query.cypher, query.bind(microbe=microbe, disease=disease))
+
+    t0 = time.perf_counter()
+    plain = PathService.from_records(nodes, edges, landmarks=0)
+    build_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    with_landmarks = PathService.from_records(nodes, edges, landmarks=args.landmarks)
+    landmark_s = time.perf_counter() - t0
+
+    results = {}
+    for name, fn in (('cypher', cypher),
+                     ('bidirectional', lambda m, d: plain.shortest_path_by_microbe_disease('cui', m, 'cui', d)),
+                     ('landmarks', lambda m, d: with_landmarks.shortest_path_by_microbe_disease('cui', m, 'cui', d))):
+        results[name] = run_all(fn, pairs)
+    expected = results['cypher'][0]
+    for name, (lengths, _) in results.items():
+        assert lengths == expected, f"{name} path lengths differ from the Cypher results"
+
+    print(json.dumps({
+        'graph': 'live' if args.live else 'synthetic',
+        'nodes': len(nodes),
+        'edges': len(edges),
+        'pairs': len(pairs),
+        'pairs_without_path': sum(length is None for length in expected),
+        'mean_path_length': round(float(np.mean([l for l in expected if l is not None] or [0])), 2),
+        'build_s': round(build_s, 2),
+        'build_with_landmarks_s': round(landmark_s, 2),
+        'pruned_by_landmarks': with_landmarks.pruned,
+        **{name: summary(times) for name, (_, times) in results.items()},
+        'speedup_bidirectional': round(results['cypher'][1].mean() / results['bidirectional'][1].mean(), 1),
+        'speedup_landmarks': round(results['cypher'][1].mean() / results['landmarks'][1].mean(), 1),
+    }, indent=2))
@@ -0,0 +1,81 @@
+"""Throughput of Food-Microbe-Disease path scoring, row-wise vs vectorized.
+
+Scores --paths synthetic paths (strengths in [-1, 1] with a few missing
+values, foods drawn from --foods names) and aggregates them per food:
+
+  rowwise      the previous gut navigator code: .apply(lambda) for the sign,
+               then a pandas groupby-sum
+  vectorized   strength_scoring.aggregate (one NumPy pass plus bincount)
+
+Both results are checked to agree before timings are reported.
+
+Usage (from ``src/``):
+    python bench_strength_scoring.py [--paths 1000000] [--foods 5000] [--repeat 3]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from strength_scoring import aggregate
+
+
+def make_paths(n: int, foods: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    s1 = rng.uniform(-1, 1, n).round(3)
+    s2 = rng.uniform(-1, 1, n).round(3)
+    s1[rng.random(n) < 0.001] = np.nan
+    return pd.DataFrame({
+        'food_name': pd.Series(rng.integers(0, foods, n)).map(lambda i: f"Food {i}"),
+        'food_microbe_strength': s1,
+        'microbe_disease_strength': s2,
+    })
+
+
+def rowwise(paths: pd.DataFrame) -> pd.DataFrame:
+    df = paths.copy()
+    df['derived_relation'] = [
+        "positive" if (a >= 0 and b >= 0) or (a < 0 and b < 0) else "negative"
+        for a, b in zip(df['food_microbe_strength'], df['microbe_disease_strength'])
+    ]
+    df['food_disease_strength'] = (
+        df['food_microbe_strength'].abs() + df['microbe_disease_strength'].abs()
+    ) * df['derived_relation'].apply(lambda x: 1 if x == "positive" else -1)
+    return df.groupby('food_name').agg({'food_disease_strength': 'sum'}).reset_index()
+
+
+def best_of(fn, paths: pd.DataFrame, repeat: int):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(paths)
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Row-wise vs vectorized path scoring throughput")
+    parser.add_argument('--paths', type=int, default=1_000_000)
+    parser.add_argument('--foods', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    paths = make_paths(args.paths, args.foods)
+    t_row, expected = best_of(rowwise, paths, args.repeat)
+    t_vec, actual = best_of(aggregate, paths, args.repeat)
+
+    merged = expected.merge(actual, on='food_name', suffixes=('_rowwise', '_vectorized'))
+    assert len(merged) == len(expected) == len(actual)
+    assert np.allclose(merged['food_disease_strength_rowwise'], merged['food_disease_strength_vectorized'])
+
+    print(json.dumps({
+        'paths': args.paths,
+        'foods': len(actual),
+        'rowwise_s': round(t_row, 3),
+        'vectorized_s': round(t_vec, 3),
+        'rowwise_paths_per_s': int(args.paths / t_row),
+        'vectorized_paths_per_s': int(args.paths / t_vec),
+        'speedup': round(t_row / t_vec, 1),
+    }, indent=2))
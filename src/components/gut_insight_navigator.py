@@ -2,8 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from minerva import MINERVA
 from components.graph_queries import GraphQueries
+from components.paper_upload import get_live_minerva, create_paper_upload
+from food_disease_table import get_food_disease_table
 import plotly.graph_objects as go
 from streamlit_agraph import agraph, Node, Edge, Config
 
@@ -29,12 +30,10 @@ def create_gut_insight_navigator():
     
     # Initialize GraphQueries and MINERVA
     querier = GraphQueries()
-    minerva = MINERVA()
     
-    # Load papers if not already loaded
-    if not hasattr(minerva, 'research_embeddings'):
-        with st.spinner('Loading research papers...'):
-            minerva.load_research_papers("research_papers")
+    # Shared client; research papers are loaded once per server process
+    with st.spinner('Loading research papers...'):
+        minerva = get_live_minerva()
     
     # Introductory context 
     st.markdown("""Your gut is home to a vast community of tiny living things, the gut microbiome, which constantly communicates with your brain through a vital "gut microbiota-gut-brain axis". In Parkinson's Disease (PD), an imbalance in these gut microbes, called "gut dysbiosis," is strongly linked to how the disease starts and progresses, affecting symptoms, duration, and severity. This imbalance can contribute to PD by causing a "leaky gut" (increased intestinal permeability), leading to widespread inflammation (including in the brain), encouraging the clumping of alpha-synuclein (α-syn) protein, increasing oxidative stress, and reducing the production of important brain chemicals (neurotransmitters) like dopamine and serotonin. Because of these strong connections, targeting the gut microbiome through approaches like Fecal Microbiota Transplantation (FMT), which aims to restore a healthy balance, is being explored as a promising new therapy for PD.""")
@@ -170,11 +169,7 @@ def create_gut_insight_navigator():
         connection_error = False
         
         # Test database connection
-        try:
-            # Test the connection first
-            test_query = "MATCH (n) RETURN count(n) AS count LIMIT 1"
-            querier.graph.run(test_query).to_data_frame()
-        except Exception as e:
+        if not querier.is_available():
             st.error("⚠️ Could not connect to the knowledge graph database.")
             st.warning("Please ensure the Neo4j database is running and properly configured.")
             return disease_food_relations, connection_error
@@ -185,31 +180,14 @@ def create_gut_insight_navigator():
                 # Use Parkinson's disease CUI
                 parkinsons_cui = "C0030567"
                 
-                # Get disease-food relations for Parkinson's disease
-                disease_food_relations = querier.get_disease_food_relations(parkinsons_cui)
-                
-                if disease_food_relations:  # Check if list is not empty
-                    # Convert list of dicts to DataFrame
-                    disease_food_relations = pd.DataFrame(disease_food_relations)
-                    
-                    # Calculate food-disease strength
-                    disease_food_relations["food_disease_strength"] = (
-                        disease_food_relations["food_microbe_strength"].abs() +
-                        disease_food_relations["microbe_disease_strength"].abs()
-                    ) * disease_food_relations["derived_relation"].apply(lambda x: 1 if x=="positive" else -1)
-                    
-                    # Group by food name and calculate total strength
-                    food_strengths = disease_food_relations.groupby("food_name").agg({
-                        "food_disease_strength": "sum"
-                    }).reset_index()
+                # Per-path rows and per-food totals come from the materialized food-disease table
+                table = get_food_disease_table()
+                disease_food_relations = table.food_paths(parkinsons_cui)
                 
+                if not disease_food_relations.empty:
                     # Get top protective and risk foods (top 5 each)
-                    protective_foods = food_strengths[food_strengths["food_disease_strength"] < 0]\
-                        .sort_values("food_disease_strength", ascending=True)\
-                        .head(5)
-                    risk_foods = food_strengths[food_strengths["food_disease_strength"] > 0]\
-                        .sort_values("food_disease_strength", ascending=False)\
-                        .head(5)
+                    protective_foods = table.top_foods(parkinsons_cui, 'protective', limit=5)
+                    risk_foods = table.top_foods(parkinsons_cui, 'risk', limit=5)
                     
                     # Display foods in two columns
                     col1, col2 = st.columns(2)
@@ -351,34 +329,10 @@ def create_gut_insight_navigator():
                             # Hardcoded CUI for Parkinson's Disease from UMLS
                             PARKINSONS_CUI = "C0030567"
                             
-                            # Query to find the selected food and its directly connected microbiomes
-                            query = """
-                            // Find the food by name (case insensitive partial match)
-                            MATCH (f:Food)
-                            WHERE toLower(f.official_name) CONTAINS toLower($food_name) 
-                               OR toLower(f.name) CONTAINS toLower($food_name)
-                            
-                            // Find all directly connected microbiomes (1 hop)
-                            MATCH (f)-[r]-(m:Microbe)
-                            RETURN 
-                                f.name as food_name,
-                                f.official_name as food_official_name,
-                                collect(DISTINCT {
-                                    microbe: m.name,
-                                    microbe_id: m.id,
-                                    relationship: type(r),
-                                    strength: r.strength_raw
-                                }) as microbiomes
-                            """
-                            
                             try:
-                                # Execute the query
-                                graph_queries = GraphQueries()
-                                
                                 # Run the query to get food and its microbiomes
                                 with st.spinner('Loading food-microbiome relationships...'):
-                                    result = graph_queries.graph.run(query, 
-                                                                   food_name=selected_food).data()
+                                    result = querier.get_food_microbiomes(selected_food)
                                     
                                     if not result or not result[0].get('microbiomes'):
                                         st.warning(f"No microbiome data found for {selected_food}")
@@ -514,4 +468,7 @@ def create_gut_insight_navigator():
             if user_query:
                 with st.spinner('Getting answer...'):
                     answer = minerva.query_papers(user_query)
-                st.markdown(answer)
\ No newline at end of file
+                st.markdown(answer)
+        # Let users add papers to the shared library without blocking queries
+        st.markdown("---")
+        create_paper_upload()
@@ -1,10 +1,11 @@
 import streamlit as st
-from minerva import MINERVA
 from agent import minerva_agent, MINERVADependencies
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from .survey import SurveyManager, SurveyType
+from .paper_upload import get_live_minerva
+from graph_backend import close_async_graph_backend
 import time, asyncio
 from metrics import span, log_csv, now_iso 
 
@@ -16,15 +17,19 @@ MICROBIOME_DESCRIPTIONS = {
 
 async def create_impulse_control_spotlight():
     """Create the Impulse Control Spotlight dashboard"""
+    try:
+        await _create_impulse_control_spotlight()
+    finally:
+        # app.py renders this page with asyncio.run(), a new loop per render
+        await close_async_graph_backend()
+
+
+async def _create_impulse_control_spotlight():
     st.title("Impulse Control Spotlight")
     
-    # Initialize MINERVA client
-    minerva = MINERVA()
-    
-    # Load papers if not already loaded
-    if not hasattr(minerva, 'research_embeddings'):
-        with st.spinner('Loading research papers...'):
-            minerva.load_research_papers("research_papers")
+    # Shared client; research papers are loaded once per server process
+    with st.spinner('Loading research papers...'):
+        minerva = get_live_minerva()
     
     # Introductory context
     st.markdown("""Impulse Control Disorders (ICDs) are challenging, hard-to-control urges that can affect people with Parkinson's Disease (PD), leading to compulsive behaviors like gambling or shopping. While sometimes linked to PD medications, ICDs can also occur independently, suggesting other biological reasons. New research indicates your gut microbiome—the community of tiny living things in your intestines—might play a key role in ICDs in PD through the gut-brain axis. Studies have found certain gut bacteria like Methanobrevibacter and Intestinimonas butyriciproducens are more abundant in PD patients with impulsive behaviors. These bacteria and their metabolic activities, affecting pathways like nicotinate, nicotinamide, and caffeine metabolism, could influence brain chemicals such as GABA and serotonin, which are crucial for impulse and emotional control. These findings suggest new, non-medication-based ways to understand and potentially manage ICDs by focusing on the gut microbiome.""")
@@ -1,27 +1,25 @@
 import sys
 import os
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from minerva import MINERVA
+from food_disease_table import get_food_disease_table
+from .paper_upload import get_live_minerva
 
 def create_minerva_dashboard():
     """Create the MINERVA dashboard"""
     st.title("MINERVA Dashboard")
     
-    # Initialize MINERVA client
-    minerva = MINERVA()
-    
-    # Load research papers
+    # Shared client; research papers are loaded once per server process
     try:
-        minerva.load_research_papers("research_papers")
+        minerva = get_live_minerva()
         st.success("Research papers loaded successfully")
     except Exception as e:
         st.error(f"Error loading research papers: {str(e)}")
+        st.stop()
     
     # Add diagnostic information
     st.subheader("Database Information")
@@ -82,22 +80,28 @@ def create_minerva_dashboard():
             # Get disease-food relations using MINERVA's method
             try:
                 disease_cui = all_diseases[all_diseases['name'] == selected_disease]['cui'].iloc[0]
-                results = minerva.get_disease_food_relations(disease_cui)
+                table = get_food_disease_table()
+                paths = table.food_paths(disease_cui)
                 
-                if results:  # Check if list is not empty
-                    # Convert list of dicts to DataFrame for display
-                    df_results = pd.DataFrame(results)
+                if not paths.empty:
                     st.subheader(f"Top Foods Associated with {selected_disease}")
-                    st.dataframe(df_results)
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown("**Protective**")
+                        st.dataframe(table.top_foods(disease_cui, 'protective', limit=10))
+                    with col2:
+                        st.markdown("**Risk**")
+                        st.dataframe(table.top_foods(disease_cui, 'risk', limit=10))
+                    st.dataframe(paths)
                     
                     # Create visualization
                     fig = px.scatter(
-                        results,
+                        paths.assign(abs_strength=paths['food_disease_strength'].abs()),
                         x='food_microbe_strength',
                         y='microbe_disease_strength',
                         color='derived_relation',
-                        size='food_disease_strength',
-                        hover_data=['food_name', 'microbe_name'],
+                        size='abs_strength',
+                        hover_data=['food_name', 'microbe_name', 'food_disease_strength'],
                         title=f'Food-Microbe-{selected_disease} Relationships'
                     )
                     st.plotly_chart(fig)
@@ -107,35 +111,6 @@ def create_minerva_dashboard():
                 st.error(f"Error querying disease-food relations: {str(e)}")
         except Exception as e:
             st.error(f"Error fetching diseases: {str(e)}")
-        
-        if not results.empty:
-            # Display table
-            st.subheader("Top Microbes Associated with Parkinson's")
-            st.dataframe(results)
-            
-            # Create bar chart
-            fig = px.bar(
-                results,
-                x='strength',
-                y='microbe',
-                orientation='h',
-                title='Microbe Strength Relationship with Parkinson\'s Disease',
-                labels={'strength': 'Relationship Strength', 'microbe': 'Microbe'}
-            )
-            st.plotly_chart(fig)
-        else:
-            st.warning("No data found. Please check Neo4j connection.")
-            
-            # Show sample data for Microbe and Disease labels
-            st.write("### Sample Microbe Data:")
-            microbe_data = minerva.get_sample_data('Microbe', 3)
-            if not microbe_data.empty:
-                st.dataframe(microbe_data)
-            
-            st.write("### Sample Disease Data:")
-            disease_data = minerva.get_sample_data('Disease', 3)
-            if not disease_data.empty:
-                st.dataframe(disease_data)
     
     with tab2:
         st.header("Risk Factors Analysis")
@@ -2,12 +2,13 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from minerva import MINERVA
 from agent import minerva_agent, MINERVADependencies
 import asyncio
 import time
 from metrics import span, log_csv, now_iso
 from .survey import SurveyManager, SurveyType
+from .paper_upload import get_live_minerva
+from graph_backend import close_async_graph_backend
 
 MICROBIOME_DESCRIPTIONS = {
     "Streptobacillaceae": (
@@ -46,14 +47,19 @@ MICROBIOME_DESCRIPTIONS = {
 
 async def create_oral_health_pd_connection():
     """Create the Oral Health & PD Connection dashboard"""
+    try:
+        await _create_oral_health_pd_connection()
+    finally:
+        # app.py renders this page with asyncio.run(), a new loop per render
+        await close_async_graph_backend()
+
+
+async def _create_oral_health_pd_connection():
     st.title("Oral Health & Parkinson's Disease")
     
-    # Initialize MINERVA client
-    minerva = MINERVA()
-    
-    # Load research papers
+    # Shared client; research papers are loaded once per server process
     try:
-        minerva.load_research_papers("research_papers")
+        minerva = get_live_minerva()
     except Exception as e:
         st.error(f"Error loading research papers: {str(e)}")
         st.error("Please ensure the research_papers directory exists and contains PDF files.")
@@ -308,11 +314,10 @@ async def create_oral_health_pd_connection():
                         # ---- LLM total generation time (non-streaming)
                         with span("insights_llm_generation", page="oral_health"):
                             try:
-                                insights = asyncio.run(
-                                    minerva_agent.run(
-                                        query,
-                                        deps=MINERVADependencies(minerva_client=minerva_client)
-                                    )
+                                # Awaited on the page's own loop, so its queries use (and close) the page's driver
+                                insights = await minerva_agent.run(
+                                    query,
+                                    deps=MINERVADependencies(minerva_client=minerva)
                                 )
                                 st.markdown("### Suggestions for You")
                                 st.markdown(insights.output)
@@ -0,0 +1,77 @@
+import os
+import streamlit as st
+from minerva import MINERVA
+from ingest import PaperIngestionWorker
+from shared_index import ensure_published, publish_from_minerva
+
+PAPERS_DIRECTORY = "research_papers"
+PAPERS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), PAPERS_DIRECTORY)
+
+STAGE_LABELS = {
+    'queued': 'Waiting in queue',
+    'extracting': 'Extracting text',
+    'chunking': 'Splitting into passages',
+    'embedding': 'Embedding passages',
+    'indexing': 'Adding to the search index',
+    'done': 'Ready',
+    'failed': 'Failed',
+}
+
+
+@st.cache_resource
+def get_live_minerva() -> MINERVA:
+    """MINERVA client shared by every session, with the research papers loaded once.
+
+    Uploaded papers are appended to this client's index in the background, so
+    all pages that query papers through it see them as soon as they are ready.
+    When SHARED_INDEX_DIR is set, the client attaches to the memory-mapped index
+    published there so several server processes share a single copy. If none
+    exists yet, the first process to get the publish lock loads the papers and
+    publishes one; the others wait for it and attach.
+    """
+    minerva = MINERVA()
+    shared_dir = os.getenv('SHARED_INDEX_DIR')
+    if shared_dir:
+        def publish():
+            minerva.load_research_papers(PAPERS_DIRECTORY)
+            publish_from_minerva(minerva, shared_dir, lock=False)
+
+        ensure_published(shared_dir, publish)
+        minerva.attach_shared_index(shared_dir)
+    else:
+        minerva.load_research_papers(PAPERS_DIRECTORY)
+    return minerva
+
+
+@st.cache_resource
+def get_ingestion_worker() -> PaperIngestionWorker:
+    """Background worker appending uploaded papers to the shared index."""
+    return PaperIngestionWorker(get_live_minerva(), PAPERS_DIR)
+
+
+def create_paper_upload():
+    """Upload form for new research papers plus the progress of queued uploads."""
+    worker = get_ingestion_worker()
+
+    st.subheader("Add a Research Paper")
+    uploaded = st.file_uploader("Upload a paper (PDF or text)", type=["pdf", "txt"], key="paper_upload")
+    if uploaded is not None and st.button("Add to library"):
+        try:
+            job = worker.submit(uploaded.name, uploaded.getvalue())
+            st.success(f"{job.filename} queued. You can keep asking questions while it is processed.")
+        except Exception as e:
+            st.error(f"Could not queue {uploaded.name}: {e}")
+
+    jobs = worker.list_jobs()
+    if jobs:
+        for job in jobs:
+            label = STAGE_LABELS.get(job.status, job.status)
+            if job.status == 'failed':
+                st.error(f"{job.filename}: {label} ({job.error})")
+            elif job.status == 'done':
+                st.caption(f"✅ {job.filename}: {label} ({job.chunks_added} passages added)")
+            else:
+                st.progress(job.progress, text=f"{job.filename}: {label}")
+        if any(not job.finished for job in jobs):
+            if st.button("Refresh progress"):
+                st.rerun()
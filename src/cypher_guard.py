@@ -0,0 +1,206 @@
+"""Cost guardrails for the Cypher the agent writes (agent.query_neo4j).
+
+The model's queries run against the shared database. One unbounded
+``MATCH (n)-[*]-(m)`` or a listing without a LIMIT can pin the server and
+the event loop for every user. CypherGuard checks each query before it runs:
+
+  read_only          no write clauses or procedure calls (query_cache.is_read_only)
+  unbounded_path     variable-length patterns need an upper bound of at most max_hops
+  LIMIT              appended when the query has none, lowered when above max_rows
+  plan_too_expensive EXPLAIN's largest estimated row count must stay under max_estimated_rows
+                     (skipped on backends without query plans)
+  unsupported_backend the backend only runs registered queries (GRAPH_BACKEND=embedded)
+
+Accepted queries run with a server-side transaction timeout. Each guard also
+keeps a per-turn budget of rows returned and graph time spent; create one
+guard per agent turn (MINERVADependencies does). A rejection raises
+CypherGuardError. Its to_dict() is returned to the model so that it can
+rewrite the query.
+
+Configuration (environment):
+    AGENT_CYPHER_MAX_ROWS             rows per query (default 200)
+    AGENT_CYPHER_MAX_HOPS             longest variable-length pattern (default 4)
+    AGENT_CYPHER_MAX_ESTIMATED_ROWS   largest planned row count (default 1000000)
+    AGENT_CYPHER_TIMEOUT_S            transaction timeout per query (default 10)
+    AGENT_TURN_MAX_ROWS               rows per agent turn (default 1000)
+    AGENT_TURN_MAX_GRAPH_S            graph time per agent turn (default 30)
+"""
+import asyncio
+import os
+import re
+import time
+from typing import Dict, Optional
+
+import pandas as pd
+from neo4j.exceptions import ClientError
+
+from metrics import log_csv, now_iso
+from query_cache import code_text, is_read_only, normalize_query
+
+_VAR_LENGTH = re.compile(r"-\s*\[([^\[\]]*)\]\s*-")
+_HOPS = re.compile(r"\*\s*(\d+)?\s*(\.\.)?\s*(\d+)?")
+_TRAILING_LIMIT = re.compile(r"\bLIMIT\s+(\S+)\s*$", re.IGNORECASE)
+_UNION = re.compile(r"\bUNION\b", re.IGNORECASE)
+_RETURN = re.compile(r"\bRETURN\b", re.IGNORECASE)
+
+
+class CypherGuardError(Exception):
+    """A query the guard refused, with a hint for rewriting it."""
+
+    def __init__(self, code: str, message: str, hint: str = ""):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+        self.hint = hint
+
+    def to_dict(self) -> Dict:
+        return {'error': self.code, 'message': self.message, 'hint': self.hint}
+
+
+def max_estimated_rows(plan: Dict) -> float:
+    """Largest EstimatedRows of any operator in an EXPLAIN plan tree."""
+    largest, stack = 0.0, [plan]
+    while stack:
+        op = stack.pop()
+        largest = max(largest, float(op.get('args', {}).get('EstimatedRows', 0.0)))
+        stack.extend(op.get('children', []))
+    return largest
+
+
+class CypherGuard:
+    """Checks, bounds and budgets the agent's queries for one turn.
+
+    Args:
+        max_rows: Rows per query (LIMIT injected or lowered to this)
+        max_hops: Longest allowed variable-length relationship pattern
+        max_estimated_rows: Largest planned row count accepted
+        timeout: Server-side transaction timeout per query, in seconds
+        max_turn_rows: Rows returned over the whole turn
+        max_turn_seconds: Graph time spent over the whole turn
+    """
+
+    def __init__(self, max_rows: Optional[int] = None, max_hops: Optional[int] = None,
+                 max_estimated_rows: Optional[float] = None, timeout: Optional[float] = None,
+                 max_turn_rows: Optional[int] = None, max_turn_seconds: Optional[float] = None):
+        self.max_rows = max_rows or int(os.getenv('AGENT_CYPHER_MAX_ROWS', '200'))
+        self.max_hops = max_hops or int(os.getenv('AGENT_CYPHER_MAX_HOPS', '4'))
+        self.max_estimated_rows = max_estimated_rows or float(os.getenv('AGENT_CYPHER_MAX_ESTIMATED_ROWS', '1000000'))
+        self.timeout = timeout or float(os.getenv('AGENT_CYPHER_TIMEOUT_S', '10'))
+        self.max_turn_rows = max_turn_rows or int(os.getenv('AGENT_TURN_MAX_ROWS', '1000'))
+        self.max_turn_seconds = max_turn_seconds or float(os.getenv('AGENT_TURN_MAX_GRAPH_S', '30'))
+        self.rows_used = 0
+        self.seconds_used = 0.0
+        self.queries = 0
+
+    def prepare(self, query: str) -> str:
+        """Check a query and bound its result size.
+
+        Returns:
+            str: The normalized query, with a LIMIT of at most max_rows
+
+        Raises:
+            CypherGuardError: write, no_return or unbounded_path
+        """
+        query = normalize_query(query)
+        if not is_read_only(query):
+            raise CypherGuardError('write', "Only read queries are allowed; write clauses and procedure calls are rejected.",
+                                   "Use MATCH ... RETURN without CREATE, MERGE, SET, DELETE, REMOVE or CALL procedures.")
+        code = code_text(query)
+        if not _RETURN.search(code):
+            raise CypherGuardError('no_return', "The query returns nothing.", "End the query with a RETURN clause.")
+        for pattern in _VAR_LENGTH.findall(code):
+            hops = _HOPS.search(pattern)
+            if hops is None:
+                continue
+            low, dots, high = hops.groups()
+            upper = int(low) if low and not dots else (int(high) if high else None)
+            if upper is None or upper > self.max_hops:
+                raise CypherGuardError(
+                    'unbounded_path', f"Variable-length pattern [{pattern}] is unbounded or longer than {self.max_hops} hops.",
+                    f"Give it an upper bound, e.g. [{pattern.split('*')[0]}*1..{min(2, self.max_hops)}], "
+                    f"and anchor one end on a property such as cui.")
+
+        if _UNION.search(code):
+            # A trailing LIMIT would only bound the last branch
+            return f"CALL {{ {query} }} RETURN * LIMIT {self.max_rows}"
+        limit = _TRAILING_LIMIT.search(query)
+        if limit is None:
+            return f"{query} LIMIT {self.max_rows}"
+        if limit.group(1).isdigit() and int(limit.group(1)) > self.max_rows:
+            return f"{query[:limit.start(1)]}{self.max_rows}"
+        return query
+
+    def _check_budget(self):
+        if self.rows_used >= self.max_turn_rows or self.seconds_used >= self.max_turn_seconds:
+            raise CypherGuardError(
+                'turn_budget_exhausted',
+                f"This turn already used {self.rows_used} rows and {self.seconds_used:.1f} s of graph time "
+                f"(limits {self.max_turn_rows} rows, {self.max_turn_seconds:g} s).",
+                "Answer with the results you already have.")
+
+    async def check_plan(self, db, query: str, parameters: Optional[Dict] = None) -> Optional[float]:
+        """Refuse queries whose plan estimates more than max_estimated_rows rows (None without plans)."""
+        if not hasattr(db, 'explain'):
+            return None
+        try:
+            plan = await db.explain(query, parameters)
+        except ClientError as e:
+            raise CypherGuardError('invalid_query', e.message, "Fix the query syntax or parameter names.") from e
+        estimate = max_estimated_rows(plan)
+        if estimate > self.max_estimated_rows:
+            raise CypherGuardError(
+                'plan_too_expensive',
+                f"The query plan touches about {estimate:,.0f} rows (limit {self.max_estimated_rows:,.0f}).",
+                "Anchor on a specific node (e.g. {cui: $cui}), filter earlier with WHERE, "
+                "or shorten variable-length patterns.")
+        return estimate
+
+    async def run(self, minerva, query: str, parameters: Optional[Dict] = None) -> pd.DataFrame:
+        """Check, bound and run a query through MINERVA.aquery_neo4j within the turn's budget.
+
+        Raises:
+            CypherGuardError: The query was refused, timed out or cannot run on this backend
+        """
+        from graph_backend import get_async_graph_backend
+
+        self._check_budget()
+        prepared = self.prepare(query)
+        estimate = await self.check_plan(get_async_graph_backend(), prepared, parameters)
+        timeout = min(self.timeout, self.max_turn_seconds - self.seconds_used)
+
+        t0 = time.perf_counter()
+        try:
+            # The server aborts the transaction; wait_for also frees the loop if the server does not
+            result = await asyncio.wait_for(minerva.aquery_neo4j(prepared, parameters, timeout=timeout), timeout + 1)
+        except asyncio.TimeoutError:
+            raise CypherGuardError('timeout', f"The query ran longer than {timeout:.1f} s.",
+                                   "Anchor it on a specific node and bound its paths.") from None
+        except NotImplementedError as e:
+            # The embedded backend answers registered queries only, never free-form Cypher
+            raise CypherGuardError('unsupported_backend', str(e),
+                                   "Use the other tools to answer; free-form Cypher needs a Neo4j server.") from e
+        except ClientError as e:
+            if 'Timeout' in (e.code or '') or 'TimedOut' in (e.code or ''):
+                raise CypherGuardError('timeout', f"The query ran longer than {timeout:.1f} s.",
+                                       "Anchor it on a specific node and bound its paths.") from e
+            raise CypherGuardError('invalid_query', e.message, "Fix the query syntax or parameter names.") from e
+        finally:
+            self.seconds_used += time.perf_counter() - t0
+            self.queries += 1
+
+        # LIMIT $param is left as written, so the row cap is also applied here
+        cap = min(self.max_rows, self.max_turn_rows - self.rows_used)
+        truncated = len(result) > cap
+        if truncated:
+            result = result.head(cap)
+        self.rows_used += len(result)
+
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"[METRIC] agent_cypher_ms={ms:.2f} rows={len(result)} estimated_rows={estimate} truncated={truncated}")
+        log_csv({
+            "ts": now_iso(),
+            "metric": "agent_cypher",
+            "ms": round(ms, 2),
+            "rows": len(result),
+        })
+        return result
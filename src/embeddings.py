@@ -0,0 +1,145 @@
+import hashlib
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class EmbeddingBackend(Embeddings):
+    """Base class for the embedding backends MINERVA can index papers with.
+
+    Backends are LangChain ``Embeddings`` so they plug straight into the FAISS
+    vector store, and describe themselves so the index manifest records which
+    backend (and which vector space) an index was built with.
+    """
+
+    name = "base"
+
+    def describe(self) -> Dict:
+        """Return the manifest entry identifying this backend."""
+        return {"backend": self.name}
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """OpenAI embeddings (network access and an API key required)."""
+
+    name = "openai"
+
+    def __init__(self, model: Optional[str] = None):
+        from langchain_community.embeddings import OpenAIEmbeddings
+
+        self.model = model or os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-ada-002')
+        self._client = OpenAIEmbeddings(model=self.model)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._client.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._client.embed_query(text)
+
+    def describe(self) -> Dict:
+        return {"backend": self.name, "model": self.model}
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """Fully local embeddings from hashed word and bigram counts.
+
+    Tokens are hashed (with a stable hash, not Python's salted ``hash``) into
+    ``dim`` signed buckets, weighted with sublinear term frequency and L2
+    normalized. No model files, no network and no fitted state, so the same
+    text always maps to the same vector in every process.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 1024, ngram_range: tuple = (1, 2)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str) -> Counter:
+        tokens = _TOKEN_RE.findall(text.lower())
+        features = Counter()
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(tokens) - n + 1):
+                features[" ".join(tokens[i:i + n])] += 1
+        return features
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for feature, count in self._features(text).items():
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign * (1.0 + math.log(count))
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def describe(self) -> Dict:
+        return {"backend": self.name, "dim": self.dim, "ngram_range": list(self.ngram_range)}
+
+
+class LocalModelEmbeddingBackend(EmbeddingBackend):
+    """Sentence-transformers model loaded from a local directory, run on CPU."""
+
+    name = "local_model"
+
+    def __init__(self, model_path: Optional[str] = None):
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        self.model_path = model_path or os.getenv('EMBEDDING_MODEL_PATH')
+        if not self.model_path or not os.path.isdir(self.model_path):
+            raise ValueError(f"Local embedding model directory not found: {self.model_path}")
+        self._client = HuggingFaceEmbeddings(
+            model_name=self.model_path,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={"normalize_embeddings": True},
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._client.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._client.embed_query(text)
+
+    def describe(self) -> Dict:
+        return {"backend": self.name, "model_path": os.path.abspath(self.model_path)}
+
+
+EMBEDDING_BACKENDS = {
+    OpenAIEmbeddingBackend.name: OpenAIEmbeddingBackend,
+    HashingEmbeddingBackend.name: HashingEmbeddingBackend,
+    LocalModelEmbeddingBackend.name: LocalModelEmbeddingBackend,
+}
+
+
+def get_embedding_backend(name: Optional[str] = None, **kwargs) -> EmbeddingBackend:
+    """Create the embedding backend selected by name or the EMBEDDING_BACKEND setting.
+
+    Args:
+        name: Backend name ('openai', 'hashing' or 'local_model'); defaults to
+            the EMBEDDING_BACKEND environment variable, then 'openai'
+        **kwargs: Passed to the backend constructor
+
+    Returns:
+        EmbeddingBackend: The configured backend
+    """
+    name = name or os.getenv('EMBEDDING_BACKEND', 'openai')
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'. Choose one of: {', '.join(EMBEDDING_BACKENDS)}")
+    if name == HashingEmbeddingBackend.name and 'dim' not in kwargs and os.getenv('EMBEDDING_DIM'):
+        kwargs['dim'] = int(os.getenv('EMBEDDING_DIM'))
+    return EMBEDDING_BACKENDS[name](**kwargs)
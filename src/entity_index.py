@@ -0,0 +1,125 @@
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used for both entity terms and chunk text."""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    try:
+        return [v for v in value if isinstance(v, str)]
+    except TypeError:
+        return []
+
+
+class EntityChunkIndex:
+    """Inverted index from graph entities (by CUI) to the text chunks that mention them.
+
+    Terms (entity names and synonyms) are matched as whole token sequences, so
+    "Akkermansia" matches "Akkermansia muciniphila was enriched" but not
+    "Akkermansiaceae". Lookups are plain dictionary hits: no embedding or LLM
+    call is involved.
+    """
+
+    def __init__(self, min_term_length: int = 3, max_term_tokens: int = 8):
+        self.min_term_length = min_term_length
+        self.max_term_tokens = max_term_tokens
+        self.entities: Dict[str, Dict] = {}                 # cui -> {label, name}
+        self.term_to_cuis: Dict[Tuple[str, ...], set] = defaultdict(set)
+        self.postings: Dict[str, List[int]] = {}            # cui -> sorted chunk ids
+        self._term_lengths: Dict[str, set] = defaultdict(set)  # first token -> term lengths
+        self.num_chunks = 0
+
+    def add_entity(self, label: str, cui: str, name: str, synonyms: Iterable[str] = ()) -> None:
+        """Register an entity and the terms it is known by."""
+        if not cui or not name:
+            return
+        self.entities[cui] = {"label": label, "name": name}
+        for term in [name] + _as_list(synonyms):
+            tokens = tuple(tokenize(term))
+            if not tokens or len(tokens) > self.max_term_tokens:
+                continue
+            if len(" ".join(tokens)) < self.min_term_length or all(t.isdigit() for t in tokens):
+                continue
+            self.term_to_cuis[tokens].add(cui)
+            self._term_lengths[tokens[0]].add(len(tokens))
+
+    def add_entities_from_records(self, records: Iterable[Dict]) -> None:
+        """Register entities from rows shaped like get_query('entity_terms') results."""
+        for row in records:
+            self.add_entity(row.get("label"), row.get("cui"), row.get("name"), row.get("synonyms"))
+
+    def _match_chunk(self, text: str) -> set:
+        tokens = tokenize(text)
+        found = set()
+        for i, token in enumerate(tokens):
+            lengths = self._term_lengths.get(token)
+            if not lengths:
+                continue
+            for n in lengths:
+                cuis = self.term_to_cuis.get(tuple(tokens[i:i + n]))
+                if cuis:
+                    found.update(cuis)
+        return found
+
+    def build(self, chunks: List[str]) -> "EntityChunkIndex":
+        """Scan every chunk once and record which entities it mentions."""
+        self.postings = {}
+        self.num_chunks = 0
+        self._add_chunks(chunks)
+        return self
+
+    def _add_chunks(self, chunks: List[str]) -> None:
+        for offset, text in enumerate(chunks):
+            for cui in self._match_chunk(text):
+                self.postings.setdefault(cui, []).append(self.num_chunks + offset)
+        self.num_chunks += len(chunks)
+
+    def extended(self, chunks: List[str]) -> "EntityChunkIndex":
+        """Return a copy that also covers chunks appended after the current ones.
+        
+        The entity terms are shared; postings are copied so readers of this
+        index never observe ids past the chunk list they were built for.
+        """
+        index = EntityChunkIndex(self.min_term_length, self.max_term_tokens)
+        index.entities = self.entities
+        index.term_to_cuis = self.term_to_cuis
+        index._term_lengths = self._term_lengths
+        index.postings = {cui: list(ids) for cui, ids in self.postings.items()}
+        index.num_chunks = self.num_chunks
+        index._add_chunks(chunks)
+        return index
+
+    def resolve(self, entity: str, label: Optional[str] = None) -> List[str]:
+        """Map a CUI, name or synonym to the CUIs it refers to."""
+        if entity in self.entities:
+            cuis = [entity]
+        else:
+            cuis = sorted(self.term_to_cuis.get(tuple(tokenize(entity)), ()))
+        if label:
+            cuis = [c for c in cuis if self.entities[c]["label"] == label]
+        return cuis
+
+    def lookup(self, entity: str, label: Optional[str] = None) -> List[int]:
+        """Return the sorted ids of chunks mentioning the entity (CUI, name or synonym)."""
+        chunk_ids = set()
+        for cui in self.resolve(entity, label):
+            chunk_ids.update(self.postings.get(cui, ()))
+        return sorted(chunk_ids)
+
+    def stats(self) -> Dict:
+        return {
+            "entities": len(self.entities),
+            "terms": len(self.term_to_cuis),
+            "linked_entities": len(self.postings),
+            "chunks": self.num_chunks,
+        }
@@ -0,0 +1,444 @@
+"""In-process resolution of Disease, Food and Microbe names to CUIs.
+
+Several lookups find an entity by scanning every node of a label:
+``toLower(f.official_name) CONTAINS toLower($food_name)`` (food_microbiomes),
+``toLower(d.name) CONTAINS toLower($disease_name)`` (disease_by_name_contains)
+and ``d.name =~ '(?i)Parkinson.*'`` (parkinsons_microbiome,
+parkinsons_risk_factors). No index can serve them. EntityResolver loads every
+name, official name and synonym once (the resolver_terms query) and resolves
+text to CUIs in memory, so the Cypher that follows anchors on ``cui``.
+
+Terms are normalized to lowercase word tokens joined by single spaces
+(entity_index.tokenize), so "Parkinson's disease" is stored as
+"parkinson s disease". Three kinds of match, tried in this order by search():
+
+  exact   the whole query equals a term; a Bloom filter over all terms answers
+          most misses without touching the index
+  prefix  the query is a prefix of a term or of a term's suffix starting at a
+          word, e.g. "garl" and "garlic" both find "Raw garlic". Keys live in
+          one sorted array and a prefix is a bisect range, which makes
+          search-as-you-type cheap
+  fuzzy   every query word is within a few edits (optimal string alignment:
+          insertions, deletions, substitutions and adjacent transpositions) of
+          a word of the same term; 0 edits for words of up to 3 characters, 1 up
+          to 7, 2 beyond. Candidate words come from a deletion index of every
+          word with up to 1 character deleted: two words within 1 edit share
+          such a form, and a word within 2 edits is within 1 edit of some
+          string 1 edit away from the query word. Candidates are verified with
+          edit_distance, so no term is compared one by one. The deletion index
+          is built on the first fuzzy lookup.
+
+get_entity_resolver() loads the terms on a background thread; until they are
+loaded, ``ready`` is False and callers keep matching names in the graph. Like
+the graph snapshot, the resolver does not follow graph changes on its own;
+call refresh() after the graph is updated.
+
+Configuration (environment):
+    ENTITY_RESOLVER   0 keeps the Cypher scans instead (default 1)
+
+Usage (from ``src/``):
+    python entity_resolver.py "parkinsons" [--label Disease] [--limit 10]
+"""
+import argparse
+import bisect
+import hashlib
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from entity_index import tokenize
+from metrics import log_csv, now_iso
+from query_registry import get_query
+
+FIELDS = ('name', 'official_name', 'synonym')
+MAX_EDITS = 2
+
+
+class Match(NamedTuple):
+    label: str
+    cui: str
+    name: str
+    term: str    # normalized term that matched
+    field: str   # name, official_name or synonym
+    kind: str    # exact, prefix or fuzzy
+    edits: int
+
+
+def normalize(text: str) -> str:
+    return ' '.join(tokenize(text)) if isinstance(text, str) else ''
+
+
+def allowed_edits(word: str) -> int:
+    return 0 if len(word) <= 3 else 1 if len(word) <= 7 else MAX_EDITS
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 once it is certain to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _deletions(word: str, depth: int) -> Set[str]:
+    """The word with every combination of up to depth characters removed (the word itself included)."""
+    found, frontier = {word}, {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+def _edits(word: str, alphabet: List[str]) -> Set[str]:
+    """Every string one deletion, insertion, substitution or adjacent transposition away from word."""
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    found = {a + b[1:] for a, b in splits if b}
+    found |= {a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1}
+    found |= {a + c + b[1:] for a, b in splits if b for c in alphabet}
+    found |= {a + c + b for a, b in splits for c in alphabet}
+    return found
+
+
+class _BloomFilter:
+    """Set membership with no false negatives and about error_rate false positives."""
+
+    def __init__(self, items: List[str], error_rate: float = 0.01):
+        n = max(len(items), 1)
+        self.bits = max(64, int(-n * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / n * math.log(2)))
+        self.array = np.zeros((self.bits + 7) // 8, dtype='uint8')
+        if items:
+            positions = np.concatenate([self._positions(item) for item in items])
+            np.bitwise_or.at(self.array, positions >> 3, (1 << (positions & 7)).astype('uint8'))
+
+    def _positions(self, item: str) -> np.ndarray:
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return np.array([(h1 + i * h2) % self.bits for i in range(self.hashes)], dtype='int64')
+
+    def __contains__(self, item: str) -> bool:
+        positions = self._positions(item)
+        return bool(np.all(self.array[positions >> 3] & (1 << (positions & 7)).astype('uint8')))
+
+
+class _Index:
+    """Immutable lookup structures of one loaded term list."""
+
+    def __init__(self, rows: Iterable[Dict]):
+        # Entities: (label, cui, display name); terms: (entity, field, normalized text)
+        self.entities: List[Tuple[str, str, str]] = []
+        self.terms: List[Tuple[int, int, str]] = []
+        seen = {}
+        for row in rows:
+            label, cui = row.get('label'), row.get('cui')
+            if not cui or (label, cui) in seen:
+                continue
+            entity = seen[(label, cui)] = len(self.entities)
+            self.entities.append((label, cui, row.get('name') or row.get('official_name') or cui))
+            synonyms = row.get('synonyms')
+            synonyms = [synonyms] if isinstance(synonyms, str) else [s for s in synonyms or () if isinstance(s, str)]
+            texts = {}
+            for field, values in ((0, [row.get('name')]), (1, [row.get('official_name')]), (2, synonyms)):
+                for value in values:
+                    term = normalize(value)
+                    if term and term not in texts:
+                        texts[term] = field
+            self.terms.extend((entity, field, term) for term, field in texts.items())
+
+        # Sorted keys: every term and each of its suffixes that starts at a word
+        keys = []
+        for t, (_, _, term) in enumerate(self.terms):
+            words = term.split(' ')
+            keys.extend((' '.join(words[w:]), t, w) for w in range(len(words)))
+        keys.sort()
+        self.keys = [k for k, _, _ in keys]
+        self.key_term = np.array([t for _, t, _ in keys], dtype='int32')
+        self.key_word = np.array([w for _, _, w in keys], dtype='int32')
+        self.exact: Dict[str, List[int]] = {}
+        for t, (_, _, term) in enumerate(self.terms):
+            self.exact.setdefault(term, []).append(t)
+        self.bloom = _BloomFilter(list(self.exact))
+
+        # Words -> terms containing them, for fuzzy matching
+        self.word_terms: Dict[str, List[int]] = {}
+        for t, (_, _, term) in enumerate(self.terms):
+            for word in set(term.split(' ')):
+                self.word_terms.setdefault(word, []).append(t)
+        self.words = list(self.word_terms)
+        self.alphabet: List[str] = []
+        self._fuzzy_lock = threading.Lock()
+        self._deletions: Optional[Dict[str, List[int]]] = None
+
+    @property
+    def deletions(self) -> Dict[str, List[int]]:
+        """Every word and each of its 1-character deletions -> word ids, built on first use."""
+        if self._deletions is None:
+            with self._fuzzy_lock:
+                if self._deletions is None:
+                    deletions: Dict[str, List[int]] = {}
+                    for w, word in enumerate(self.words):
+                        for deleted in _deletions(word, 1):
+                            deletions.setdefault(deleted, []).append(w)
+                    self.alphabet = sorted({c for word in self.words for c in word})
+                    self._deletions = deletions
+        return self._deletions
+
+    def candidates(self, word: str, max_edits: int) -> Set[int]:
+        """Ids of the words that may be within max_edits of word (to be verified with edit_distance)."""
+        deletions = self.deletions
+        forms = {word}
+        if max_edits >= 2:
+            # Two edits go through an intermediate string one edit away from the word
+            forms |= _edits(word, self.alphabet)
+        keys = set(forms)
+        for form in forms:
+            keys.update([form[:i] + form[i + 1:] for i in range(len(form))])
+        found = set()
+        for key in keys:
+            ids = deletions.get(key)
+            if ids:
+                found.update(ids)
+        return found
+
+
+class EntityResolver:
+    """Exact, prefix and typo-tolerant lookup of entity names, official names and synonyms.
+
+    Args:
+        db: Graph backend to load from (get_graph_backend() by default)
+    """
+
+    def __init__(self, db=None):
+        self.db = db
+        self.loaded_at: Optional[float] = None
+        self.load_ms: Optional[float] = None
+        self._index: Optional[_Index] = None
+        self._lock = threading.Lock()
+        self._loader: Optional[threading.Thread] = None
+        self.lookups = self.bloom_rejections = 0
+
+    @classmethod
+    def from_records(cls, rows: Iterable[Dict]) -> "EntityResolver":
+        """Build a resolver from rows shaped like the resolver_terms query results."""
+        resolver = cls()
+        resolver._index = _Index(rows)
+        resolver.loaded_at = time.time()
+        return resolver
+
+    def refresh(self) -> "EntityResolver":
+        """(Re)load every term and swap the new index in."""
+        if self.db is None:
+            from graph_backend import get_graph_backend
+            self.db = get_graph_backend()
+        with self._lock:
+            t0 = time.perf_counter()
+            index = _Index(self.db.run(get_query('resolver_terms').cypher))
+            # A single reference swap, so lookups never see a half-built index
+            self._index = index
+            self.loaded_at = time.time()
+            self.load_ms = (time.perf_counter() - t0) * 1000
+        print(f"[METRIC] entity_resolver_load_ms={self.load_ms:.2f} entities={len(index.entities)} "
+              f"terms={len(index.terms)} keys={len(index.keys)}")
+        log_csv({
+            "ts": now_iso(),
+            "metric": "entity_resolver_load",
+            "ms": round(self.load_ms, 2),
+            "rows": len(index.terms),
+        })
+        return self
+
+    def load_in_background(self) -> bool:
+        """Start loading the terms on a background thread unless loaded or loading.
+
+        Returns:
+            bool: Whether a load was started
+        """
+        with _resolver_lock:
+            if self._index is not None or (self._loader is not None and self._loader.is_alive()):
+                return False
+            self._loader = threading.Thread(target=self._load_quietly, name="entity-resolver-load", daemon=True)
+            self._loader.start()
+        return True
+
+    def _load_quietly(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Entity resolver could not load, matching names in the graph: {e}")
+
+    @property
+    def ready(self) -> bool:
+        """Whether the terms are loaded (lookups would otherwise load them first)."""
+        return self._index is not None
+
+    @property
+    def index(self) -> _Index:
+        if self._index is None:
+            self.refresh()
+        return self._index
+
+    def _match(self, index: _Index, t: int, kind: str, edits: int = 0) -> Match:
+        entity, field, term = index.terms[t]
+        label, cui, name = index.entities[entity]
+        return Match(label, cui, name, term, FIELDS[field], kind, edits)
+
+    @staticmethod
+    def _keep(matches: List[Match], label: Optional[str], fields: Optional[Iterable[str]],
+              limit: Optional[int]) -> List[Match]:
+        """Matches of the label and fields, one per entity (the first, i.e. best), at most limit."""
+        fields = set(fields) if fields is not None else None
+        kept, seen = [], set()
+        for match in matches:
+            if (label is not None and match.label != label) or (fields is not None and match.field not in fields):
+                continue
+            if (match.label, match.cui) not in seen:
+                seen.add((match.label, match.cui))
+                kept.append(match)
+                if limit is not None and len(kept) >= limit:
+                    break
+        return kept
+
+    def exact(self, text: str, label: Optional[str] = None, fields: Optional[Iterable[str]] = None) -> List[Match]:
+        """Entities with a term equal to text (after normalization)."""
+        index, key = self.index, normalize(text)
+        self.lookups += 1
+        if key not in index.bloom:
+            self.bloom_rejections += 1
+            return []
+        return self._keep([self._match(index, t, 'exact') for t in index.exact.get(key, ())], label, fields, None)
+
+    def prefix(self, text: str, label: Optional[str] = None, fields: Optional[Iterable[str]] = None,
+               limit: Optional[int] = 10, whole_terms: bool = False) -> List[Match]:
+        """Entities with a term that starts with text, or a word of a term that does.
+
+        Matches at the start of a term come first, then shorter terms.
+
+        Args:
+            whole_terms: Only match at the start of a term (like ``=~ '(?i)text.*'``)
+        """
+        index, key = self.index, normalize(text)
+        if not key:
+            return []
+        lo = bisect.bisect_left(index.keys, key)
+        hi = bisect.bisect_left(index.keys, key + '\uffff')
+        words, terms = index.key_word[lo:hi], index.key_term[lo:hi]
+        if whole_terms:
+            terms = terms[words == 0]
+            words = words[words == 0]
+        lengths = np.array([len(index.terms[t][2]) for t in terms.tolist()], dtype='int64')
+        order = np.lexsort((lengths, words > 0))
+        return self._keep([self._match(index, int(t), 'prefix') for t in terms[order]], label, fields, limit)
+
+    def fuzzy(self, text: str, label: Optional[str] = None, fields: Optional[Iterable[str]] = None,
+              limit: Optional[int] = 10) -> List[Match]:
+        """Entities with a term containing a close spelling of every word of text, fewest edits first."""
+        index = self.index
+        words = normalize(text).split(' ') if normalize(text) else []
+        if not words:
+            return []
+        edits_by_term: Optional[Dict[int, int]] = None
+        for word in words:
+            limit_edits = allowed_edits(word)
+            best: Dict[int, int] = {}
+            for w in index.candidates(word, limit_edits):
+                candidate = index.words[w]
+                edits = edit_distance(word, candidate, limit_edits)
+                if edits > limit_edits:
+                    continue
+                for t in index.word_terms[candidate]:
+                    if edits < best.get(t, limit_edits + 1):
+                        best[t] = edits
+            if edits_by_term is None:
+                edits_by_term = best
+            else:
+                edits_by_term = {t: edits_by_term[t] + e for t, e in best.items() if t in edits_by_term}
+            if not edits_by_term:
+                return []
+        ranked = sorted(edits_by_term.items(), key=lambda item: (item[1], len(index.terms[item[0]][2])))
+        return self._keep([self._match(index, t, 'fuzzy', e) for t, e in ranked], label, fields, limit)
+
+    def search(self, text: str, label: Optional[str] = None, limit: int = 10) -> List[Match]:
+        """Search-as-you-type: exact matches, then prefix matches, then fuzzy ones, one per entity."""
+        matches = self.exact(text, label)
+        if len(matches) < limit:
+            matches += self.prefix(text, label, limit=limit)
+        if len(matches) < limit:
+            matches += self.fuzzy(text, label, limit=limit)
+        return self._keep(matches, None, None, limit)
+
+    def resolve(self, text: str, label: Optional[str] = None) -> Optional[Match]:
+        """The best match for text (exact, else prefix, else fuzzy), or None."""
+        matches = self.search(text, label, limit=1)
+        return matches[0] if matches else None
+
+    def cuis(self, text: str, label: Optional[str] = None, fields: Optional[Iterable[str]] = None,
+             whole_terms: bool = False) -> List[str]:
+        """CUIs of every exact or prefix match of text, for queries that used to match by CONTAINS or =~."""
+        matches = self.exact(text, label, fields) + self.prefix(text, label, fields, None, whole_terms)
+        return [m.cui for m in self._keep(matches, None, None, None)]
+
+    def stats(self) -> Dict:
+        index = self.index
+        return {
+            'entities': len(index.entities),
+            'terms': len(index.terms),
+            'keys': len(index.keys),
+            'words': len(index.words),
+            'deletions': len(index.deletions),
+            'bloom_bytes': int(index.bloom.array.nbytes),
+            'loaded_at': self.loaded_at,
+            'load_ms': self.load_ms,
+            'lookups': self.lookups,
+            'bloom_rejections': self.bloom_rejections,
+        }
+
+
+_resolver: Optional[EntityResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_entity_resolver() -> Optional[EntityResolver]:
+    """Return the process-wide resolver, None when ENTITY_RESOLVER=0.
+
+    The first call starts loading it in the background and returns at once;
+    check ``ready`` before relying on it.
+    """
+    global _resolver
+    if os.getenv('ENTITY_RESOLVER', '1') == '0':
+        return None
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = EntityResolver()
+    _resolver.load_in_background()
+    return _resolver
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resolve an entity name to CUIs")
+    parser.add_argument('text')
+    parser.add_argument('--label', choices=['Microbe', 'Disease', 'Food'])
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    resolver = EntityResolver().refresh()
+    print(resolver.stats())
+    t0 = time.perf_counter()
+    matches = resolver.search(args.text, args.label, args.limit)
+    print(f"search: {(time.perf_counter() - t0) * 1000:.3f} ms")
+    for match in matches:
+        print(f"{match.kind:<6} {match.edits} {match.label:<8} {match.cui:<12} {match.name}  ({match.field}: {match.term})")
@@ -0,0 +1,297 @@
+"""Materialized per-(disease, food) derived strength, kept in an indexed SQLite table.
+
+The gut navigator, the MINERVA dashboard and the agent all need "which foods
+are protective or risky for disease X". Each used to fetch every
+Food-Microbe-Disease path for the disease and aggregate them in pandas.
+build() does that aggregation once for every disease, summing the
+strength_scoring food_disease_strength over the paths of each (disease, food). Every row stores its path
+count and its contributing microbe paths. A top-k read is then a range
+scan over the (disease_cui, strength) index.
+
+The table remembers a fingerprint of the STRENGTH edges (their count and
+strength sum). refresh_if_stale() rebuilds when the graph no longer matches;
+refresh_in_background() does the same check and rebuild on a background thread
+while the existing table keeps being served, which is what
+get_food_disease_table() uses on the page and agent paths.
+
+Usage (from ``src/``):
+    python food_disease_table.py build
+    python food_disease_table.py top --disease C0030567 [--kind risk] [--limit 5]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from metrics import log_csv, now_iso
+from query_registry import get_query
+from strength_scoring import aggregate, score_paths
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'food_disease.sqlite')
+
+SCHEMA = """
+CREATE TABLE food_disease (
+    disease_cui TEXT NOT NULL,
+    disease_name TEXT,
+    food_name TEXT NOT NULL,
+    food_cui TEXT,
+    food_disease_strength REAL,
+    path_count INTEGER NOT NULL,
+    positive_paths INTEGER NOT NULL,
+    negative_paths INTEGER NOT NULL,
+    paths TEXT NOT NULL,
+    PRIMARY KEY (disease_cui, food_name)
+);
+CREATE INDEX idx_food_disease_strength ON food_disease (disease_cui, food_disease_strength);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+PATH_COLUMNS = ['food_name', 'microbe_name', 'food_microbe_strength', 'microbe_disease_strength',
+                'derived_relation', 'food_disease_strength']
+
+
+def strength_fingerprint(db) -> str:
+    """Fingerprint of the STRENGTH edges, used to detect graph changes."""
+    row = db.run(get_query('strength_fingerprint').cypher)[0]
+    return f"{int(row['edges'])}:{float(row['strength_sum'] or 0.0):.6f}"
+
+
+class FoodDiseaseTable:
+    """Keyed reads over the materialized food-disease table.
+
+    Args:
+        path: SQLite file (FOOD_DISEASE_DB, default data/food_disease.sqlite)
+        db: Graph backend used to build it (get_graph_backend() by default)
+        check_interval: Minimum seconds between graph fingerprint checks in refresh_if_stale
+    """
+
+    def __init__(self, path: Optional[str] = None, db=None, check_interval: float = 60.0):
+        self.path = path or os.getenv('FOOD_DISEASE_DB', DEFAULT_PATH)
+        self.db = db
+        self.check_interval = check_interval
+        self._last_check = 0.0
+        self._build_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def _graph(self):
+        if self.db is None:
+            from graph_backend import get_graph_backend
+            self.db = get_graph_backend()
+        return self.db
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def meta(self) -> Dict[str, str]:
+        if not self.exists():
+            return {}
+        with self._connect() as conn:
+            return {row['key']: row['value'] for row in conn.execute("SELECT key, value FROM meta")}
+
+    def build(self) -> Dict:
+        """Recompute the whole table from the graph and swap it in atomically."""
+        with self._build_lock:
+            t0 = time.perf_counter()
+            db = self._graph()
+            fingerprint = strength_fingerprint(db)
+            paths = pd.DataFrame(db.run(get_query('food_disease_paths').cypher),
+                                 columns=['disease_cui', 'disease_name', 'food_name', 'food_cui', 'microbe_name',
+                                          'food_microbe_strength', 'microbe_disease_strength'])
+            paths = score_paths(paths.dropna(subset=['disease_cui', 'food_name']))
+            totals = aggregate(paths, by=['disease_cui', 'food_name'])
+
+            # Contributing paths per (disease, food), in the same first-seen key order as totals
+            details = paths.groupby(['disease_cui', 'food_name'], sort=False)
+            first = details[['disease_name', 'food_cui']].first().reindex(
+                pd.MultiIndex.from_frame(totals[['disease_cui', 'food_name']]))
+            path_json = details[PATH_COLUMNS[1:-1]].apply(lambda g: json.dumps(g.to_dict('records'))).reindex(first.index)
+            rows = list(zip(
+                totals['disease_cui'], first['disease_name'], totals['food_name'], first['food_cui'],
+                totals['food_disease_strength'].astype(float), totals['path_count'].astype(int),
+                totals['positive_paths'].astype(int), totals['negative_paths'].astype(int), path_json,
+            ))
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            conn = sqlite3.connect(tmp_path)
+            try:
+                conn.executescript(SCHEMA)
+                conn.executemany("INSERT INTO food_disease VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                    ('fingerprint', fingerprint),
+                    ('built_at', now_iso()),
+                    ('paths', str(len(paths))),
+                ])
+                conn.commit()
+            finally:
+                conn.close()
+            # Readers keep whichever file they opened; new reads see the new table
+            os.replace(tmp_path, self.path)
+            self._last_check = time.monotonic()
+
+            ms = (time.perf_counter() - t0) * 1000
+            print(f"[METRIC] food_disease_build_ms={ms:.2f} paths={len(paths)} rows={len(rows)}")
+            log_csv({
+                "ts": now_iso(),
+                "metric": "food_disease_build",
+                "ms": round(ms, 2),
+                "rows": len(rows),
+            })
+            return {'paths': len(paths), 'rows': len(rows), 'fingerprint': fingerprint}
+
+    def refresh_if_stale(self) -> bool:
+        """Build the table if it is missing or the graph changed since it was built.
+
+        The graph is checked at most every check_interval seconds. When the graph
+        is unreachable, an existing table keeps being served.
+
+        Returns:
+            bool: Whether the table was rebuilt
+        """
+        if not self.exists():
+            self.build()
+            return True
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        return self._rebuild_if_changed()
+
+    def refresh_in_background(self) -> bool:
+        """Like refresh_if_stale, but check and rebuild on a background thread.
+
+        Reads keep being served from the existing table until the rebuilt one is
+        swapped in. A missing table is built in the calling thread, since there
+        is nothing to serve yet.
+
+        Returns:
+            bool: Whether a background check was started
+        """
+        if not self.exists():
+            self.build()
+            return False
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval or \
+                (self._refresh_thread is not None and self._refresh_thread.is_alive()):
+            return False
+        self._last_check = now
+        self._refresh_thread = threading.Thread(target=self._rebuild_if_changed, name="food-disease-refresh",
+                                                daemon=True)
+        self._refresh_thread.start()
+        return True
+
+    def _rebuild_if_changed(self) -> bool:
+        try:
+            current = strength_fingerprint(self._graph())
+        except Exception as e:
+            print(f"Could not check the graph for changes, serving the existing food-disease table: {e}")
+            return False
+        if current != self.meta().get('fingerprint'):
+            try:
+                self.build()
+            except Exception as e:
+                print(f"Could not rebuild the food-disease table, serving the existing one: {e}")
+                return False
+            return True
+        return False
+
+    def top_foods(self, disease_cui: str, kind: str = 'protective', limit: int = 5) -> pd.DataFrame:
+        """Most protective (most negative strength) or risky (most positive) foods for a disease.
+
+        Args:
+            disease_cui: Disease CUI
+            kind: 'protective' or 'risk'
+            limit: Number of foods
+
+        Returns:
+            pd.DataFrame: food_name, food_cui, food_disease_strength, path_count, microbes
+        """
+        if kind not in ('protective', 'risk'):
+            raise ValueError("kind must be 'protective' or 'risk'")
+        condition, order = ("< 0", "ASC") if kind == 'protective' else ("> 0", "DESC")
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT food_name, food_cui, food_disease_strength, path_count, paths FROM food_disease "
+                f"WHERE disease_cui = ? AND food_disease_strength {condition} "
+                f"ORDER BY food_disease_strength {order} LIMIT ?", (disease_cui, limit)).fetchall()
+        return pd.DataFrame([{
+            'food_name': row['food_name'],
+            'food_cui': row['food_cui'],
+            'food_disease_strength': row['food_disease_strength'],
+            'path_count': row['path_count'],
+            'microbes': [p['microbe_name'] for p in json.loads(row['paths'])],
+        } for row in rows], columns=['food_name', 'food_cui', 'food_disease_strength', 'path_count', 'microbes'])
+
+    def foods(self, disease_cui: str) -> pd.DataFrame:
+        """Every food linked to a disease with its aggregated strength and path counts."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT food_name, food_cui, food_disease_strength, path_count, positive_paths, negative_paths "
+                "FROM food_disease WHERE disease_cui = ? ORDER BY food_name", (disease_cui,)).fetchall()
+        return pd.DataFrame([dict(row) for row in rows],
+                            columns=['food_name', 'food_cui', 'food_disease_strength', 'path_count',
+                                     'positive_paths', 'negative_paths'])
+
+    def food_paths(self, disease_cui: str, food_name: Optional[str] = None) -> pd.DataFrame:
+        """Contributing Food-Microbe-Disease paths, one row per path, with their derived strength."""
+        query = "SELECT food_name, paths FROM food_disease WHERE disease_cui = ?"
+        params: tuple = (disease_cui,)
+        if food_name is not None:
+            query += " AND food_name = ?"
+            params += (food_name,)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        records: List[Dict] = [{'food_name': row['food_name'], **path}
+                               for row in rows for path in json.loads(row['paths'])]
+        paths = pd.DataFrame(records, columns=PATH_COLUMNS[:-2])
+        return score_paths(paths)[PATH_COLUMNS]
+
+
+_table: Optional[FoodDiseaseTable] = None
+_table_lock = threading.Lock()
+
+
+def get_food_disease_table() -> FoodDiseaseTable:
+    """Return the process-wide table, building it first if it does not exist yet.
+
+    Later graph changes are picked up by a background rebuild; the existing table is served meanwhile.
+    """
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = FoodDiseaseTable()
+    _table.refresh_in_background()
+    return _table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the materialized food-disease table")
+    parser.add_argument('command', choices=['build', 'top', 'info'])
+    parser.add_argument('--disease', default='C0030567', help="Disease CUI for 'top'")
+    parser.add_argument('--kind', default='protective', choices=['protective', 'risk'])
+    parser.add_argument('--limit', type=int, default=5)
+    args = parser.parse_args()
+
+    table = FoodDiseaseTable()
+    if args.command == 'build':
+        print(table.build())
+    elif args.command == 'info':
+        print(table.meta())
+    else:
+        t0 = time.perf_counter()
+        top = table.top_foods(args.disease, args.kind, args.limit)
+        print(top[['food_name', 'food_disease_strength', 'path_count']])
+        print(f"lookup: {(time.perf_counter() - t0) * 1000:.2f} ms")
@@ -0,0 +1,975 @@
+"""Graph backend selection plus an embedded, in-process implementation.
+
+GraphQueries, MINERVA and the graph snapshot talk to "the graph" through an
+object with ``run(query, parameters)``, ``run_df(...)`` and ``is_available()``.
+Two backends implement it:
+
+  neo4j      the pooled Neo4j connection manager (neo4j_pool), the default
+  embedded   EmbeddedGraphBackend, which loads an exported dataset file and
+             answers every query registered in query_registry in-process,
+             with the same columns Neo4j returns
+
+Select one with GRAPH_BACKEND=neo4j|embedded. The embedded backend reads
+GRAPH_DATASET, which defaults to data/graph_export.json.gz.
+get_async_graph_backend() returns the awaitable equivalent.
+
+Usage (from ``src/``):
+    python graph_backend.py export [--out PATH]     # dump the live Neo4j graph to a dataset file
+    python graph_backend.py info [--dataset PATH]   # summarize a dataset file
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import numbers
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from query_registry import PAGE_YEAR_NULL, QUERIES
+
+DATASET_FORMAT = "neurobiome-graph/1"
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data',
+                               'graph_export.json.gz')
+
+EXPORT_NODES_QUERY = """
+MATCH (n)
+RETURN elementId(n) AS id, labels(n) AS labels, properties(n) AS properties
+"""
+
+EXPORT_RELATIONSHIPS_QUERY = """
+MATCH (a)-[r]->(b)
+RETURN elementId(r) AS id, type(r) AS type, elementId(a) AS start, elementId(b) AS end, properties(r) AS properties
+"""
+
+PUBLICATION_TYPES = ('POSITIVE', 'NEGATIVE')
+
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode + 't', encoding='utf-8') if path.endswith('.gz') else open(path, mode, encoding='utf-8')
+
+
+def export_dataset(path: str, db=None) -> Dict:
+    """Write every node and relationship of the live graph to a dataset file.
+
+    Args:
+        path: Output file (.json, or .json.gz for gzip)
+        db: Neo4j connection manager (the shared one by default)
+
+    Returns:
+        Dict: Node and relationship counts
+    """
+    if db is None:
+        from neo4j_pool import get_connection_manager
+        db = get_connection_manager()
+    nodes = db.run(EXPORT_NODES_QUERY)
+    relationships = db.run(EXPORT_RELATIONSHIPS_QUERY)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with _open(tmp_path, 'w') as f:
+        # Temporal and spatial property values are stored as their string form
+        json.dump({
+            'format': DATASET_FORMAT,
+            'exported_at': time.time(),
+            'nodes': nodes,
+            'relationships': relationships,
+        }, f, default=str)
+    os.replace(tmp_path, path)
+    summary = {'nodes': len(nodes), 'relationships': len(relationships)}
+    print(f"Exported {summary['nodes']} nodes and {summary['relationships']} relationships to {path}")
+    return summary
+
+
+def _is_true(value) -> bool:
+    """Cypher truthiness for WHERE/CASE: null counts as false."""
+    return value is True
+
+
+def _lt(a, b):
+    return None if a is None or b is None else a < b
+
+
+def _ge(a, b):
+    return None if a is None or b is None else a >= b
+
+
+def _to_string(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _contains_ci(text, needle) -> bool:
+    """toLower(text) CONTAINS toLower(needle)."""
+    return isinstance(text, str) and isinstance(needle, str) and needle.lower() in text.lower()
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
+def _distinct(rows: Iterable[Dict]) -> List[Dict]:
+    seen, out = set(), []
+    for row in rows:
+        key = _hashable(row)
+        if key not in seen:
+            seen.add(key)
+            out.append(row)
+    return out
+
+
+def _order_by(rows: List[Dict], *keys: Tuple[str, bool]) -> List[Dict]:
+    """ORDER BY with Cypher null handling: null sorts last ascending and first descending.
+
+    Args:
+        rows: Rows to sort
+        *keys: (column, descending) pairs, most significant first
+    """
+    rows = list(rows)
+    for column, descending in reversed(keys):
+        rows.sort(key=lambda row: _order_key(row[column]), reverse=descending)
+    return rows
+
+
+def _order_key(value) -> Tuple[int, object]:
+    """Sort key that ranks mixed types as Cypher does: strings, then booleans, then numbers, then null.
+
+    Values are only compared within their own type, so a column holding both
+    integer and string PMIDs sorts instead of raising TypeError.
+    """
+    if value is None:
+        return (3, 0)
+    if isinstance(value, str):
+        return (0, value)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, numbers.Number):
+        return (2, value)
+    # Lists, maps and temporal values: before strings, compared by their text
+    return (-1, str(value))
+
+
+class EmbeddedGraphBackend:
+    """In-memory property graph loaded from an exported dataset file.
+
+    Only queries registered in query_registry can run here; each one has a
+    handler below that follows the Cypher semantics of its template (pattern
+    direction, null handling, ordering and limits). Arbitrary Cypher, such as
+    the agent's free-form query tool, raises NotImplementedError (reported
+    to the agent as CypherGuard's unsupported_backend error).
+
+    Args:
+        path: Dataset file written by export_dataset
+    """
+
+    name = 'embedded'
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('GRAPH_DATASET', DEFAULT_DATASET)
+        t0 = time.perf_counter()
+        with _open(self.path, 'r') as f:
+            data = json.load(f)
+        if data.get('format') != DATASET_FORMAT:
+            raise ValueError(f"{self.path} is not a {DATASET_FORMAT} dataset")
+
+        self.node_ids: List[str] = [n['id'] for n in data['nodes']]
+        self.labels: List[List[str]] = [list(n['labels']) for n in data['nodes']]
+        self.props: List[Dict] = [n.get('properties') or {} for n in data['nodes']]
+        index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.node_index = index
+        self.by_label: Dict[str, List[int]] = {}
+        for i, labels in enumerate(self.labels):
+            for label in labels:
+                self.by_label.setdefault(label, []).append(i)
+
+        self.rel_ids: List[str] = []
+        self.rel_type: List[str] = []
+        self.rel_start: List[int] = []
+        self.rel_end: List[int] = []
+        self.rel_props: List[Dict] = []
+        # Incident relationships per node as (relationship, other node, outgoing)
+        self.adjacency: List[List[Tuple[int, int, bool]]] = [[] for _ in self.node_ids]
+        for rel in data['relationships']:
+            start, end = index.get(rel['start']), index.get(rel['end'])
+            if start is None or end is None:
+                continue
+            r = len(self.rel_type)
+            self.rel_ids.append(rel.get('id', str(r)))
+            self.rel_type.append(rel['type'])
+            self.rel_start.append(start)
+            self.rel_end.append(end)
+            self.rel_props.append(rel.get('properties') or {})
+            self.adjacency[start].append((r, end, True))
+            if end != start:
+                self.adjacency[end].append((r, start, False))
+
+        self._by_text = {query.cypher: query for query in QUERIES.values()}
+        # graph_version's change counter, as exported from the (:GraphVersion) node
+        self.version_counter = max((self.props[i].get('version') or 0 for i in self.by_label.get('GraphVersion', ())),
+                                   default=0)
+        print(f"Loaded embedded graph from {self.path} ({len(self.node_ids)} nodes, {len(self.rel_type)} "
+              f"relationships) in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    # --- backend interface ---------------------------------------------------
+
+    def run(self, query: str, parameters: Optional[Dict] = None, **kwparameters) -> List[Dict]:
+        """Run a registered query and return the rows as dictionaries."""
+        named = self._by_text.get(query)
+        if named is None:
+            raise NotImplementedError("The embedded graph backend only runs queries registered in "
+                                      "query_registry; arbitrary Cypher needs GRAPH_BACKEND=neo4j")
+        params = named.bind(**dict(parameters or {}, **kwparameters))
+        template, *variant = named.name.split(':')
+        return getattr(self, f'_q_{template}')(*variant, **params)
+
+    def stream(self, query: str, parameters: Optional[Dict] = None, fetch_size: int = 1000,
+               **kwparameters) -> Iterator[Dict]:
+        """Yield the rows of a registered query (already in memory, so fetch_size has no effect)."""
+        yield from self.run(query, parameters, **kwparameters)
+
+    def run_df(self, query: str, parameters: Optional[Dict] = None, **kwparameters) -> pd.DataFrame:
+        return pd.DataFrame(self.run(query, parameters, **kwparameters))
+
+    def is_available(self, max_age: float = 10.0) -> bool:
+        return True
+
+    def close(self):
+        pass
+
+    # --- matching helpers ------------------------------------------------------
+
+    def _nodes(self, label: str, key: Optional[str] = None, value=None) -> List[int]:
+        nodes = self.by_label.get(label, [])
+        if key is None:
+            return list(nodes)
+        return [i for i in nodes if value is not None and self.props[i].get(key) == value]
+
+    def _has_label(self, node: int, label: Optional[str]) -> bool:
+        return label is None or label in self.labels[node]
+
+    def _expand(self, node: int, types: Optional[Iterable[str]] = None, label: Optional[str] = None,
+                direction: Optional[str] = None):
+        """Yield (relationship, other node) for a node's relationships.
+
+        direction is 'out' for (node)-[r]->(other), 'in' for (node)<-[r]-(other)
+        and None for either.
+        """
+        types = set(types) if types is not None else None
+        for r, other, outgoing in self.adjacency[node]:
+            if types is not None and self.rel_type[r] not in types:
+                continue
+            if direction == 'out' and not outgoing or direction == 'in' and outgoing:
+                continue
+            if self._has_label(other, label):
+                yield r, other
+
+    def _rels(self, types: Iterable[str], start_label: Optional[str] = None, end_label: Optional[str] = None):
+        """Yield (relationship, start, end) for directed ()-[r:types]->() matches."""
+        types = set(types)
+        for r, rel_type in enumerate(self.rel_type):
+            if rel_type in types and self._has_label(self.rel_start[r], start_label) \
+                    and self._has_label(self.rel_end[r], end_label):
+                yield r, self.rel_start[r], self.rel_end[r]
+
+    def _p(self, node: int, key: str):
+        return self.props[node].get(key)
+
+    def _rp(self, rel: int, key: str):
+        return self.rel_props[rel].get(key)
+
+    # --- counts and overview ---------------------------------------------------
+
+    def _q_count_nodes(self, label):
+        count = sum(1 for i in self._nodes(label) if any(True for _ in self._expand(i, ['STRENGTH'])))
+        return [{'count': count}]
+
+    def _q_count_papers(self):
+        pmids = {self._rp(r, 'pmid') for r, _, _ in self._rels(PUBLICATION_TYPES, 'Microbe', 'Disease')}
+        pmids.discard(None)
+        return [{'total_papers': len(pmids)}]
+
+    def _q_count_relationships(self, rel_type):
+        return [{'count': sum(1 for t in self.rel_type if t == rel_type)}]
+
+    def _q_graph_node_counts(self):
+        return [{'microbes': self._q_count_nodes('Microbe')[0]['count'],
+                 'diseases': self._q_count_nodes('Disease')[0]['count'],
+                 'foods': self._q_count_nodes('Food')[0]['count']}]
+
+    def _q_graph_statistics(self):
+        groups: "OrderedDict[tuple, int]" = OrderedDict()
+        for r, start, end in self._rels(PUBLICATION_TYPES):
+            key = (self.rel_type[r], self._rp(r, 'publication_year'), self._rp(r, 'pmid'), self._rp(r, 'journal'),
+                   self._has_label(start, 'Microbe') and self._has_label(end, 'Disease'),
+                   self._entity_label(start), self._p(start, 'cui'), self._entity_label(end), self._p(end, 'cui'))
+            groups[key] = groups.get(key, 0) + 1
+        return [{'rel': rel, 'year': year, 'pmid': pmid, 'journal': journal, 'microbe_disease': microbe_disease,
+                 'start_label': start_label, 'start_cui': start_cui, 'end_label': end_label, 'end_cui': end_cui,
+                 'edges': edges}
+                for (rel, year, pmid, journal, microbe_disease,
+                     start_label, start_cui, end_label, end_cui), edges in groups.items()]
+
+    def _q_paper_titles(self, pmids):
+        titles: "OrderedDict[object, Optional[str]]" = OrderedDict()
+        for r, _, _ in self._rels(PUBLICATION_TYPES):
+            pmid, title = self._rp(r, 'pmid'), self._rp(r, 'title')
+            if pmid in pmids:
+                # min() in Cypher skips nulls
+                current = titles.get(pmid)
+                titles[pmid] = title if current is None or (title is not None and title < current) else current
+        return [{'pmid': pmid, 'title': title} for pmid, title in titles.items()]
+
+    def _entity_label(self, node: int) -> Optional[str]:
+        """The node's first Microbe/Disease/Food label, as head([l IN labels(n) WHERE ...])."""
+        return next((label for label in self.labels[node] if label in ('Microbe', 'Disease', 'Food')), None)
+
+    def _q_graph_version(self):
+        return [{'nodes': len(self.props), 'relationships': len(self.rel_type), 'version': self.version_counter}]
+
+    def _q_bump_graph_version(self):
+        # The loaded dataset is read-only; the counter still lets callers signal a change
+        self.version_counter += 1
+        return [{'version': self.version_counter}]
+
+    def _q_all_diseases(self):
+        return _distinct({'cui': self._p(d, 'cui'), 'name': self._p(d, 'name'),
+                          'official_name': self._p(d, 'official_name')}
+                         for d in self._nodes('Disease') for _ in self._expand(d, ['STRENGTH'], 'Microbe'))
+
+    def _q_all_microbes(self):
+        return _distinct({'cui': self._p(m, 'cui'), 'tax_id': self._p(m, 'tax_id'), 'name': self._p(m, 'name')}
+                         for m in self._nodes('Microbe') for _ in self._expand(m, ['STRENGTH'], 'Disease'))
+
+    def _q_all_food(self):
+        rows = _distinct({'cui': self._p(f, 'cui'), 'name': self._p(f, 'name'),
+                          'official_name': self._p(f, 'official_name')} for f in self._nodes('Food'))
+        return _order_by(rows, ('official_name', False))
+
+    # --- entity lookups ----------------------------------------------------------
+
+    def _q_microbe_by_property(self, key, value):
+        return [{
+            'name': self._p(m, 'name'), 'official_name': self._p(m, 'official_name'), 'cui': self._p(m, 'cui'),
+            'rank': self._p(m, 'rank'), 'tax_id': self._p(m, 'tax_id'), 'definition': self._p(m, 'definition'),
+            'synonyms': self._p(m, 'synonyms'),
+        } for m in self._nodes('Microbe', key, value)]
+
+    def _q_disease_by_property(self, key, value):
+        return [{
+            'name': self._p(d, 'name'), 'official_name': self._p(d, 'official_name'), 'cui': self._p(d, 'cui'),
+            'tui': self._p(d, 'tui'), 'snomedct_concept': self._p(d, 'snomedct_concept'),
+            'definition': self._p(d, 'definition'), 'synonyms': self._p(d, 'synonyms'),
+        } for d in self._nodes('Disease', key, value)]
+
+    def _q_food_by_property(self, key, value):
+        return [{
+            'official_name': self._p(f, 'official_name'), 'tui': self._p(f, 'tui'),
+            'snomedct_concept': self._p(f, 'snomedct_concept'), 'definition': self._p(f, 'definition'),
+            'synonyms': self._p(f, 'synonyms'), 'cui': self._p(f, 'cui'), 'name': self._p(f, 'name'),
+        } for f in self._nodes('Food', key, value)]
+
+    # --- microbe-disease relationships -----------------------------------------
+
+    def _microbe_disease_pairs(self, rel_type, dkey, mkey, disease, microbe):
+        for d in self._nodes('Disease', dkey, disease):
+            for r, m in self._expand(d, [rel_type], 'Microbe'):
+                if microbe is not None and self._p(m, mkey) == microbe:
+                    yield r
+
+    def _q_relationship_by_microbe_disease(self, rel_type, dkey, mkey, disease, microbe):
+        return [{
+            'Type': self._rp(r, 'rel_type'), 'Title': self._rp(r, 'title'), 'PMID': self._rp(r, 'pmid'),
+            'PMCID': self._rp(r, 'pmcid'), 'Year': self._rp(r, 'publication_year'),
+            'ImpactFactor': self._rp(r, 'impact_factor'), 'Evidence': self._rp(r, 'evidence'),
+        } for r in self._microbe_disease_pairs(rel_type, dkey, mkey, disease, microbe)]
+
+    def _q_strength_by_microbe_disease(self, dkey, mkey, disease, microbe):
+        return [{
+            'Strength': self._rp(r, 'strength_raw'), 'Strength_IF': self._rp(r, 'strength_IF'),
+            'Strength_IFQ': self._rp(r, 'strength_IFQ'),
+        } for r in self._microbe_disease_pairs('STRENGTH', dkey, mkey, disease, microbe)]
+
+    # --- batched lookups -------------------------------------------------------
+
+    def _q_microbes_by_property(self, prop, keys):
+        return [{'key': key, **row} for key in keys for row in self._q_microbe_by_property(prop, key)]
+
+    def _q_diseases_by_property(self, prop, keys):
+        return [{'key': key, **row} for key in keys for row in self._q_disease_by_property(prop, key)]
+
+    def _q_foods_by_property(self, prop, keys):
+        return [{'key': key, **row} for key in keys for row in self._q_food_by_property(prop, key)]
+
+    def _q_relationships_by_microbe_disease(self, dkey, mkey, pairs):
+        rows = []
+        for pair in pairs:
+            for d in self._nodes('Disease', dkey, pair.get('disease')):
+                for r, m in self._expand(d, PUBLICATION_TYPES, 'Microbe'):
+                    if pair.get('microbe') is not None and self._p(m, mkey) == pair.get('microbe'):
+                        rows.append({
+                            'disease_key': pair.get('disease'), 'microbe_key': pair.get('microbe'),
+                            'relationship': self.rel_type[r],
+                            'Type': self._rp(r, 'rel_type'), 'Title': self._rp(r, 'title'),
+                            'PMID': self._rp(r, 'pmid'), 'PMCID': self._rp(r, 'pmcid'),
+                            'Year': self._rp(r, 'publication_year'), 'ImpactFactor': self._rp(r, 'impact_factor'),
+                            'Evidence': self._rp(r, 'evidence'),
+                        })
+        return rows
+
+    def _q_strengths_by_microbe_disease(self, dkey, mkey, pairs):
+        return [{'disease_key': pair.get('disease'), 'microbe_key': pair.get('microbe'), **row}
+                for pair in pairs
+                for row in self._q_strength_by_microbe_disease(dkey, mkey, pair.get('disease'), pair.get('microbe'))]
+
+    def _shortest_path(self, source: int, target: int, max_hops: int) -> Optional[list]:
+        """Unweighted shortest path over any relationship, in Record.data() path form."""
+        parents = {source: None}
+        frontier = deque([(source, 0)])
+        while frontier:
+            node, depth = frontier.popleft()
+            if node == target:
+                break
+            if depth == max_hops:
+                continue
+            for r, other, _ in self.adjacency[node]:
+                if other not in parents:
+                    parents[other] = (node, r)
+                    frontier.append((other, depth + 1))
+        if target not in parents:
+            return None
+        steps, node = [], target
+        while parents[node] is not None:
+            previous, r = parents[node]
+            steps.append((r, node))
+            node = previous
+        path = [dict(self.props[source])]
+        for r, node in reversed(steps):
+            path.extend([self.rel_type[r], dict(self.props[node])])
+        return path
+
+    def _q_shortest_path_by_microbe_disease(self, mkey, dkey, microbe, disease):
+        rows = []
+        for m in self._nodes('Microbe', mkey, microbe):
+            for d in self._nodes('Disease', dkey, disease):
+                path = self._shortest_path(m, d, 15)
+                if path is not None:
+                    rows.append({'p': path})
+        return rows
+
+    def _signed_neighbors(self, label, cui, other_label, sign):
+        keep = _ge if sign == 'positive' else _lt
+        for node in self._nodes(label, 'cui', cui):
+            for r, other in self._expand(node, ['STRENGTH'], other_label):
+                if _is_true(keep(self._rp(r, 'strength_raw'), 0)):
+                    yield node, r, other
+
+    def _q_microbe_relations(self, sign, cui):
+        return [{'microbe_name': self._p(m, 'name'), 'disease_name': self._p(d, 'name'),
+                 'strength': self._rp(r, 'strength_raw'), 'cui': self._p(d, 'cui')}
+                for m, r, d in self._signed_neighbors('Microbe', cui, 'Disease', sign)]
+
+    def _q_disease_relations(self, sign, cui):
+        return [{'disease_name': self._p(d, 'name'), 'microbe_name': self._p(m, 'name'),
+                 'strength': self._rp(r, 'strength_raw'), 'cui': self._p(m, 'cui')}
+                for d, r, m in self._signed_neighbors('Disease', cui, 'Microbe', sign)]
+
+    def _q_food_relations(self, sign, cui):
+        return [{'microbe_name': self._p(m, 'name'), 'food_name': self._p(f, 'official_name'),
+                 'strength': self._rp(r, 'strength_raw'), 'cui': self._p(f, 'cui')}
+                for f, r, m in self._signed_neighbors('Food', cui, 'Microbe', sign)]
+
+    # --- food-microbe-disease paths ------------------------------------------
+
+    def _q_disease_food_relations(self, cui):
+        rows = []
+        for d in self._nodes('Disease', 'cui', cui):
+            for r2, m in self._expand(d, ['STRENGTH'], 'Microbe'):
+                for r1, f in self._expand(m, ['STRENGTH'], 'Food'):
+                    s1, s2 = self._rp(r1, 'strength_raw'), self._rp(r2, 'strength_raw')
+                    rows.append({'food_name': self._p(f, 'official_name'), 'microbe_name': self._p(m, 'name'),
+                                 'food_microbe_strength': s1, 'microbe_disease_strength': s2})
+        return rows
+
+    def _q_food_disease_relations(self, cui):
+        rows = []
+        for f in self._nodes('Food', 'cui', cui):
+            for r1, m in self._expand(f, ['STRENGTH'], 'Microbe'):
+                for r2, d in self._expand(m, ['STRENGTH'], 'Disease'):
+                    s1, s2 = self._rp(r1, 'strength_raw'), self._rp(r2, 'strength_raw')
+                    rows.append({'disease_name': self._p(d, 'official_name'), 'microbe_name': self._p(m, 'name'),
+                                 'food_name': self._p(f, 'official_name'),
+                                 'food_microbe_strength': s1, 'microbe_disease_strength': s2})
+        return rows
+
+    def _q_food_microbiomes(self, food_name):
+        groups: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+        for f in self._nodes('Food'):
+            if not (_contains_ci(self._p(f, 'official_name'), food_name) or _contains_ci(self._p(f, 'name'), food_name)):
+                continue
+            key = (self._p(f, 'name'), self._p(f, 'official_name'))
+            microbes = groups.setdefault(key, [])
+            for r, m in self._expand(f, label='Microbe'):
+                microbes.append({'microbe': self._p(m, 'name'), 'microbe_id': self._p(m, 'id'),
+                                 'relationship': self.rel_type[r], 'strength': self._rp(r, 'strength_raw')})
+        return [{'food_name': name, 'food_official_name': official_name, 'microbiomes': _distinct(microbes)}
+                for (name, official_name), microbes in groups.items() if microbes]
+
+    def _q_food_microbiomes_by_cui(self, cuis):
+        groups: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+        for f in self._nodes('Food'):
+            if self._p(f, 'cui') not in cuis:
+                continue
+            key = (self._p(f, 'name'), self._p(f, 'official_name'))
+            microbes = groups.setdefault(key, [])
+            for r, m in self._expand(f, label='Microbe'):
+                microbes.append({'microbe': self._p(m, 'name'), 'microbe_id': self._p(m, 'id'),
+                                 'relationship': self.rel_type[r], 'strength': self._rp(r, 'strength_raw')})
+        return [{'food_name': name, 'food_official_name': official_name, 'microbiomes': _distinct(microbes)}
+                for (name, official_name), microbes in groups.items() if microbes]
+
+    # --- neighbourhoods ----------------------------------------------------------
+
+    def _neighbourhood(self, label, cui, hops, name_key, as_text):
+        paths: List[Tuple[int, ...]] = []
+
+        def expand(node: int, path: Tuple[int, ...]):
+            for r, other in self._expand(node, ['STRENGTH', 'PARENT']):
+                if len(paths) >= 50:
+                    return
+                if r in path:
+                    continue
+                paths.append(path + (r,))
+                if len(path) + 1 < hops:
+                    expand(other, path + (r,))
+
+        for node in self._nodes(label, 'cui', cui):
+            expand(node, ())
+        rows = []
+        for path in paths:
+            for r in path:
+                source, target = self.rel_start[r], self.rel_end[r]
+                if self.rel_type[r] == 'PARENT':
+                    relation = 'PARENT'
+                else:
+                    strength = self._rp(r, 'strength_raw')
+                    relation = _to_string(strength) if as_text else strength
+                rows.append({
+                    'source': self._p(source, name_key),
+                    'source_type': self.labels[source][0] if self.labels[source] else None,
+                    'relation': relation,
+                    'target': self._p(target, name_key),
+                    'target_type': self.labels[target][0] if self.labels[target] else None,
+                })
+        return rows
+
+    def _q_two_hop_neighbourhood(self, label, cui):
+        return self._neighbourhood(label, cui, 2, 'official_name', as_text=True)
+
+    def _q_one_hop_neighbourhood(self, label, cui):
+        return self._neighbourhood(label, cui, 1, 'name', as_text=False)
+
+    # --- rankings ------------------------------------------------------------------
+
+    def _connection_counts(self, group_label, other_label, group_is_start, key):
+        groups: "OrderedDict[int, List[int]]" = OrderedDict()
+        types = ['STRENGTH'] if key == 'strength_count' else PUBLICATION_TYPES
+        start_label, end_label = (group_label, other_label) if group_is_start else (other_label, group_label)
+        for r, start, end in self._rels(types, start_label, end_label):
+            groups.setdefault(start if group_is_start else end, []).append(r)
+        rows = []
+        for node, rels in groups.items():
+            if key == 'strength_count':
+                strengths = [self._rp(r, 'strength_raw') for r in rels]
+                counts = {'strength_count': len(rels),
+                          'strength_positive': sum(1 for s in strengths if _is_true(_ge(s, 0))),
+                          'strength_negative': sum(1 for s in strengths if _is_true(_lt(s, 0)))}
+            else:
+                counts = {'total_relations': len(rels),
+                          'negative_count': sum(1 for r in rels if self.rel_type[r] == 'NEGATIVE'),
+                          'positive_count': sum(1 for r in rels if self.rel_type[r] == 'POSITIVE')}
+            rows.append({f"{group_label.lower()}_name": self._p(node, 'name'), **counts})
+        return _order_by(rows, (key, True))
+
+    def _q_microbes_with_more_connections(self, n):
+        return self._connection_counts('Microbe', 'Disease', True, 'strength_count')[:n]
+
+    def _q_diseases_with_more_connections(self, n):
+        return self._connection_counts('Disease', 'Microbe', False, 'strength_count')[:n]
+
+    def _q_microbes_with_more_references(self, n):
+        return self._connection_counts('Microbe', 'Disease', True, 'total_relations')[:n]
+
+    def _q_diseases_with_more_references(self, n):
+        return self._connection_counts('Disease', 'Microbe', False, 'total_relations')[:n]
+
+    def _q_rank_by_strength(self, strength_type, order, n):
+        rows = [{'Microbe': self._p(m, 'name'), 'Disease': self._p(d, 'name'), 'Strength': self._rp(r, strength_type)}
+                for m in self._nodes('Microbe') for r, d in self._expand(m, ['STRENGTH'], 'Disease')]
+        return _order_by(rows, ('Strength', order == 'DESC'))[:n]
+
+    def _q_rank_by_strength_for(self, strength_type, order, label, cui, n):
+        rows = [{'Microbe': self._p(m, 'name'), 'Disease': self._p(d, 'name'), 'Strength': self._rp(r, strength_type)}
+                for m in self._nodes('Microbe') for r, d in self._expand(m, ['STRENGTH'], 'Disease')
+                if self._p(m if label == 'Microbe' else d, 'cui') == cui]
+        return _order_by(rows, ('Strength', order == 'DESC'))[:n]
+
+    def _ranking_edges(self, diseases: Optional[set] = None):
+        return [{'id': self.rel_ids[r], 'microbe_id': self.node_ids[m], 'microbe_cui': self._p(m, 'cui'),
+                 'microbe_name': self._p(m, 'name'), 'disease_id': self.node_ids[d], 'disease_cui': self._p(d, 'cui'),
+                 'disease_name': self._p(d, 'name'), 'microbe_to_disease': self.rel_start[r] == m,
+                 'strength_raw': self._rp(r, 'strength_raw'), 'strength_IF': self._rp(r, 'strength_IF'),
+                 'strength_IFQ': self._rp(r, 'strength_IFQ')}
+                for m in self._nodes('Microbe') for r, d in self._expand(m, ['STRENGTH'], 'Disease')
+                if diseases is None or self.node_ids[d] in diseases]
+
+    def _q_strength_ranking_edges(self):
+        return self._ranking_edges()
+
+    def _q_strength_ranking_edges_for_diseases(self, disease_ids):
+        return self._ranking_edges(set(disease_ids))
+
+    def _q_strength_disease_fingerprints(self):
+        groups: "OrderedDict[str, Dict]" = OrderedDict()
+        for row in self._ranking_edges():
+            group = groups.setdefault(row['disease_id'], {'disease_id': row['disease_id'], 'edges': 0, 'strength_raw': 0.0,
+                                                          'strength_IF': 0.0, 'strength_IFQ': 0.0})
+            group['edges'] += 1
+            for column in ('strength_raw', 'strength_IF', 'strength_IFQ'):
+                group[column] += row[column] or 0.0
+        return list(groups.values())
+
+    # --- publications --------------------------------------------------------------
+
+    def _q_relationships_by_year(self):
+        counts: "OrderedDict[object, int]" = OrderedDict()
+        for r, _, _ in self._rels(PUBLICATION_TYPES):
+            year = self._rp(r, 'publication_year')
+            counts[year] = counts.get(year, 0) + 1
+        rows = [{'publication_year': year, 'relationship_count': count} for year, count in counts.items()]
+        return _order_by(rows, ('publication_year', False))
+
+    def _publications_by_year(self, rels: Iterable[int]):
+        pmids: "OrderedDict[object, set]" = OrderedDict()
+        for r in rels:
+            pmid = self._rp(r, 'pmid')
+            group = pmids.setdefault(self._rp(r, 'publication_year'), set())
+            if pmid is not None:
+                group.add(pmid)
+        rows = [{'publication_year': year, 'publications': len(group)} for year, group in pmids.items()]
+        return _order_by(rows, ('publication_year', False))
+
+    def _q_publications_by_year(self):
+        return self._publications_by_year(r for r, _, _ in self._rels(PUBLICATION_TYPES))
+
+    def _q_more_relevant_papers(self, n):
+        counts: "OrderedDict[tuple, int]" = OrderedDict()
+        for r, _, _ in self._rels(PUBLICATION_TYPES):
+            key = (self._rp(r, 'pmid'), self._rp(r, 'title'))
+            counts[key] = counts.get(key, 0) + 1
+        rows = [{'Title': title, 'PMID': pmid, 'Frequency': count} for (pmid, title), count in counts.items()]
+        return _order_by(rows, ('Frequency', True), ('PMID', False))[:n]
+
+    def _q_publication_journals(self):
+        return [{'PMID': self._rp(r, 'pmid'), 'Journal': self._rp(r, 'journal')}
+                for r, _, _ in self._rels(PUBLICATION_TYPES, 'Microbe', 'Disease')]
+
+    def _q_popularity_in_time(self, label, cui):
+        return self._publications_by_year(r for node in self._nodes(label, 'cui', cui)
+                                          for r, _ in self._expand(node, PUBLICATION_TYPES))
+
+    def _related_publication_rows(self, label, cui):
+        """(relationship, row) pairs of the related_publications listings, unordered."""
+        name_key, name_column, other_column, other_label = {
+            'Microbe': ('name', 'microbe', ('disease', 'cui_disease'), None),
+            'Disease': ('name', 'disease', ('microbe', 'cui_microbe'), None),
+            'Food': ('official_name', 'food', ('microbe', 'cui_microbe'), 'Microbe'),
+        }[label]
+        return [(r, {
+            'pmid': self._rp(r, 'pmid'), name_column: self._p(node, name_key),
+            other_column[0]: self._rp(r, other_column[1]), 'rel_type': self._rp(r, 'rel_type'),
+            'year': self._rp(r, 'publication_year'), 'journal': self._rp(r, 'journal'),
+            'title': self._rp(r, 'title'), 'evidence': self._rp(r, 'evidence'),
+        }) for node in self._nodes(label, 'cui', cui) for r, _ in self._expand(node, PUBLICATION_TYPES, other_label)]
+
+    def _q_related_publications(self, label, cui):
+        return _order_by([row for _, row in self._related_publication_rows(label, cui)], ('year', False))
+
+    def _q_related_publications_page(self, label, mode, cui, limit, after_year=None, after_pmid=None, after_rel=None):
+        rows = []
+        for r, row in self._related_publication_rows(label, cui):
+            year, pmid = row['year'], row['pmid']
+            row.update(year_key=PAGE_YEAR_NULL if year is None else year,
+                       pmid_key='' if pmid is None else _to_string(pmid), rel_key=str(r))
+            rows.append(row)
+        key = itemgetter('year_key', 'pmid_key', 'rel_key')
+        if mode == 'after':
+            rows = [row for row in rows if key(row) > (after_year, after_pmid, after_rel)]
+        return sorted(rows, key=key)[:limit]
+
+    # --- bulk export ----------------------------------------------------------------
+
+    def _q_export_nodes(self, label, mode, after=None):
+        nodes = sorted((n for n in self._nodes(label) if mode == 'first' or self.node_ids[n] > after),
+                       key=self.node_ids.__getitem__)
+        return [{'id': self.node_ids[n], 'labels': list(self.labels[n]), 'properties': dict(self.props[n])}
+                for n in nodes]
+
+    def _q_export_relationships(self, rel_type, mode, after=None):
+        rels = sorted((rel for rel in self._rels([rel_type]) if mode == 'first' or self.rel_ids[rel[0]] > after),
+                      key=lambda rel: self.rel_ids[rel[0]])
+        return [{'id': self.rel_ids[r], 'start': self.node_ids[start], 'end': self.node_ids[end],
+                 'start_cui': self._p(start, 'cui'), 'end_cui': self._p(end, 'cui'),
+                 'properties': dict(self.rel_props[r])}
+                for r, start, end in rels]
+
+    # --- MINERVA client ------------------------------------------------------------
+
+    def _q_schema_labels(self):
+        return [{'label': label} for label in sorted(self.by_label)]
+
+    def _q_schema_relationship_types(self):
+        return [{'relationshipType': rel_type} for rel_type in sorted(set(self.rel_type))]
+
+    def _q_schema_label_counts(self):
+        counts: "OrderedDict[tuple, int]" = OrderedDict()
+        for labels in self.labels:
+            counts[tuple(labels)] = counts.get(tuple(labels), 0) + 1
+        return [{'label': list(labels), 'count': count} for labels, count in counts.items()]
+
+    def _q_sample_nodes(self, label, limit):
+        return [{'n': dict(self.props[i])} for i in self._nodes(label)[:limit]]
+
+    def _q_disease_names(self):
+        return [{'name': self._p(d, 'name'), 'cui': self._p(d, 'cui')} for d in self._nodes('Disease')]
+
+    def _q_disease_by_name_contains(self, disease_name):
+        return [{'cui': self._p(d, 'cui'), 'name': self._p(d, 'name')}
+                for d in self._nodes('Disease') if _contains_ci(self._p(d, 'name'), disease_name)][:1]
+
+    def _q_disease_food_strength_paths(self, disease_cui):
+        rows = []
+        for d in self._nodes('Disease', 'cui', disease_cui):
+            for md, m in self._expand(d, ['STRENGTH'], 'Microbe', direction='in'):
+                for fm, f in self._expand(m, ['STRENGTH'], 'Food', direction='in'):
+                    rows.append({
+                        'food_name': self._p(f, 'name'), 'food_synonyms': self._p(f, 'synonyms'),
+                        'microbe_name': self._p(m, 'name'), 'microbe_synonyms': self._p(m, 'synonyms'),
+                        'disease_name': self._p(d, 'name'),
+                        'food_microbe_strength': self._rp(fm, 'strength'),
+                        'microbe_disease_strength': self._rp(md, 'strength'),
+                    })
+        return rows
+
+    def _parkinsons(self) -> List[int]:
+        pattern = re.compile(r'Parkinson.*', re.IGNORECASE | re.DOTALL)
+        return [d for d in self._nodes('Disease')
+                if isinstance(self._p(d, 'name'), str) and pattern.fullmatch(self._p(d, 'name'))]
+
+    def _q_parkinsons_microbiome(self):
+        return self._disease_microbiome(self._parkinsons())
+
+    def _q_parkinsons_risk_factors(self):
+        return self._disease_risk_factors(self._parkinsons())
+
+    def _q_disease_microbiome(self, cuis):
+        return self._disease_microbiome([d for d in self._nodes('Disease') if self._p(d, 'cui') in cuis])
+
+    def _q_disease_risk_factors(self, cuis):
+        return self._disease_risk_factors([d for d in self._nodes('Disease') if self._p(d, 'cui') in cuis])
+
+    def _disease_microbiome(self, diseases: List[int]):
+        rows = [{'microbe_name': self._p(m, 'name'), 'microbe_synonyms': self._p(m, 'synonyms'),
+                 'strength': self._rp(r, 'strength'), 'disease_name': self._p(d, 'name')}
+                for d in diseases for r, m in self._expand(d, ['STRENGTH'], 'Microbe', direction='in')]
+        return _order_by(rows, ('strength', True))[:10]
+
+    def _disease_risk_factors(self, diseases: List[int]):
+        rows = [{'risk_factor': self._p(f, 'name'), 'factor_type': self._p(f, 'type'),
+                 'description': self._p(f, 'description')}
+                for d in diseases for _, f in self._expand(d, ['ASSOCIATED_WITH'], 'RiskFactor', direction='in')]
+        return _order_by(rows, ('risk_factor', False))
+
+    def _q_resolver_terms(self):
+        return [{'label': label, 'cui': self._p(i, 'cui'), 'name': self._p(i, 'name'),
+                 'official_name': self._p(i, 'official_name'), 'synonyms': self._p(i, 'synonyms')}
+                for label in ('Microbe', 'Food', 'Disease') for i in self._nodes(label)]
+
+    def _q_entity_terms(self):
+        rows = []
+        for label in ('Microbe', 'Food', 'Disease'):
+            rows.extend({'label': label, 'cui': self._p(i, 'cui'), 'name': self._p(i, 'name'),
+                         'synonyms': self._p(i, 'synonyms') if label != 'Disease' else []}
+                        for i in self._nodes(label))
+        return rows
+
+    # --- food-disease table ----------------------------------------------------------
+
+    def _q_food_disease_paths(self):
+        rows = []
+        for m in self._nodes('Microbe'):
+            foods = list(self._expand(m, ['STRENGTH'], 'Food'))
+            for r2, d in self._expand(m, ['STRENGTH'], 'Disease'):
+                for r1, f in foods:
+                    rows.append({'disease_cui': self._p(d, 'cui'), 'disease_name': self._p(d, 'name'),
+                                 'food_name': self._p(f, 'official_name'), 'food_cui': self._p(f, 'cui'),
+                                 'microbe_name': self._p(m, 'name'),
+                                 'food_microbe_strength': self._rp(r1, 'strength_raw'),
+                                 'microbe_disease_strength': self._rp(r2, 'strength_raw')})
+        return rows
+
+    def _q_strength_fingerprint(self):
+        strengths = [self._rp(r, 'strength_raw') for r, _, _ in self._rels(['STRENGTH'])]
+        return [{'edges': len(strengths), 'strength_sum': float(sum(s for s in strengths if s is not None))}]
+
+    # --- graph snapshot loaders ------------------------------------------------------
+
+    _SNAPSHOT_LABELS = ('Microbe', 'Disease', 'Food')
+
+    def _in_snapshot(self, node: int) -> bool:
+        return any(label in self._SNAPSHOT_LABELS for label in self.labels[node])
+
+    def _q_snapshot_nodes(self):
+        return [{'id': self.node_ids[i], 'label': self.labels[i][0], 'cui': self._p(i, 'cui'),
+                 'name': self._p(i, 'name'), 'official_name': self._p(i, 'official_name')}
+                for i in range(len(self.node_ids)) if self._in_snapshot(i)]
+
+    def _q_snapshot_edges(self):
+        return [{'source': self.node_ids[start], 'target': self.node_ids[end], 'type': self.rel_type[r],
+                 'strength_raw': self._rp(r, 'strength_raw'), 'strength_IF': self._rp(r, 'strength_IF'),
+                 'strength_IFQ': self._rp(r, 'strength_IFQ')}
+                for r, start, end in self._rels(('STRENGTH', 'PARENT'))
+                if self._in_snapshot(start) and self._in_snapshot(end)]
+
+    def _q_path_nodes(self):
+        return [{'id': node_id, 'labels': list(labels), 'properties': dict(props)}
+                for node_id, labels, props in zip(self.node_ids, self.labels, self.props)]
+
+    def _q_path_edges(self):
+        return [{'source': self.node_ids[start], 'target': self.node_ids[end], 'type': rel_type}
+                for start, end, rel_type in zip(self.rel_start, self.rel_end, self.rel_type)]
+
+    # --- disease-food path enumeration ---------------------------------------------------
+
+    def _strongest(self, node: int, keep=None) -> List[Tuple[int, int]]:
+        """(relationship, other node) pairs ordered by abs(coalesce(r.strength_raw, 0.0)) DESC, elementId(r)."""
+        rels = [(r, other) for r, other in self._expand(node) if keep is None or other in keep]
+        return sorted(rels, key=lambda pair: (-abs(self._rp(pair[0], 'strength_raw') or 0.0), self.rel_ids[pair[0]]))
+
+    def _path_rel(self, r: int, other: int) -> Dict:
+        return {'id': self.rel_ids[r], 'type': self.rel_type[r], 'start': self.node_ids[self.rel_start[r]],
+                'end': self.node_ids[self.rel_end[r]], 'properties': dict(self.rel_props[r]),
+                'other': self.node_ids[other]}
+
+    def _q_path_endpoint_neighbors(self, disease_cui, food_name, fanout):
+        rows = []
+        for side, nodes in (('disease', self._nodes('Disease', 'cui', disease_cui)),
+                            ('food', self._nodes('Food', 'name', food_name))):
+            for n in nodes:
+                rels = [dict(self._path_rel(r, m), other_labels=list(self.labels[m]), other_properties=dict(self.props[m]))
+                        for r, m in self._strongest(n)[:max(fanout, 0)]]
+                rows.append({'side': side, 'id': self.node_ids[n], 'labels': list(self.labels[n]),
+                             'properties': dict(self.props[n]), 'rels': rels})
+        return rows
+
+    def _q_path_links(self, left, right, fanout):
+        right = {self.node_index[node_id] for node_id in right if node_id in self.node_index}
+        rows = []
+        for node_id in left:
+            a = self.node_index.get(node_id)
+            rels = self._strongest(a, right) if a is not None else []
+            if rels:
+                rows.append({'id': node_id, 'rels': [self._path_rel(r, b) for r, b in rels[:max(fanout, 0)]]})
+        return rows
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_graph_backend():
+    """Return the process-wide graph backend selected by GRAPH_BACKEND (neo4j or embedded)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                kind = os.getenv('GRAPH_BACKEND', 'neo4j').lower()
+                if kind == 'embedded':
+                    _backend = EmbeddedGraphBackend()
+                elif kind == 'neo4j':
+                    from neo4j_pool import get_connection_manager
+                    _backend = get_connection_manager()
+                else:
+                    raise ValueError(f"Unknown GRAPH_BACKEND {kind!r}; use 'neo4j' or 'embedded'")
+    return _backend
+
+
+class AsyncBackendAdapter:
+    """Async interface over a synchronous backend; each query runs in a worker thread."""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def run(self, query, parameters: Optional[Dict] = None, **kwparameters) -> List[Dict]:
+        # A neo4j.Query (text plus timeout) runs as its text; there is no server to time out
+        query = getattr(query, 'text', query)
+        return await asyncio.to_thread(self.db.run, query, parameters, **kwparameters)
+
+    async def run_df(self, query: str, parameters: Optional[Dict] = None, **kwparameters) -> pd.DataFrame:
+        return pd.DataFrame(await self.run(query, parameters, **kwparameters))
+
+    async def is_available(self) -> bool:
+        return self.db.is_available()
+
+    async def close(self):
+        pass
+
+
+def get_async_graph_backend():
+    """Async counterpart of get_graph_backend() for the running event loop.
+
+    neo4j uses the loop's AsyncDriver (neo4j_pool.get_async_connection_manager).
+    The embedded backend has no I/O to await, so its queries run in worker threads.
+    """
+    if os.getenv('GRAPH_BACKEND', 'neo4j').lower() == 'neo4j':
+        from neo4j_pool import get_async_connection_manager
+        return get_async_connection_manager()
+    return AsyncBackendAdapter(get_graph_backend())
+
+
+async def close_async_graph_backend():
+    """Close the running loop's async driver (neo4j); await it before every asyncio.run() returns.
+
+    Each asyncio.run() is a new loop and so gets its own driver and connection pool.
+    """
+    if os.getenv('GRAPH_BACKEND', 'neo4j').lower() == 'neo4j':
+        from neo4j_pool import close_async_connection_manager
+        await close_async_connection_manager()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or inspect embedded graph datasets")
+    parser.add_argument('command', choices=['export', 'info'])
+    parser.add_argument('--out', default=DEFAULT_DATASET, help="Dataset file to write")
+    parser.add_argument('--dataset', default=None, help="Dataset file to inspect")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export_dataset(args.out)
+    else:
+        backend = EmbeddedGraphBackend(args.dataset)
+        print(json.dumps({
+            'labels': {label: len(nodes) for label, nodes in sorted(backend.by_label.items())},
+            'relationship_types': {t: backend.rel_type.count(t) for t in sorted(set(backend.rel_type))},
+        }, indent=2))
@@ -0,0 +1,297 @@
+"""Bulk export of the knowledge graph to Parquet, one dataset per label and relationship type.
+
+Offline analytics, local snapshots and benchmarks need the whole graph outside
+Neo4j. ``graph.run(...).to_data_frame()`` (and ``graph_backend.py export``)
+materialize all of it as Python dicts at once. GraphExporter streams it
+instead: one registered export query per part, whose rows are pulled from the
+server fetch_size at a time (db.stream) and written out every page_size rows:
+
+  export_nodes:<Label>                the nodes of a label, by element id
+  export_relationships:<TYPE>         the relationships of a type, by element id,
+                                      with their start and end node ids and CUIs
+
+Each page is written as its own Parquet file:
+
+  <out>/nodes/<Label>/part-00000.parquet
+  <out>/relationships/<TYPE>/part-00000.parquet
+  <out>/manifest.json                 per part: pages, rows, last exported id, done
+
+Columns are typed per label and type (PROPERTY_COLUMNS): CUIs and names as
+strings, synonyms as lists, tax_id and publication_year as int64, the strength
+properties as float64. Properties outside the schema, or values that do not
+fit their column, are kept as JSON in the ``extra`` column, so every page of a
+part has the same schema and nothing is dropped. A part directory reads back as
+one table, e.g. ``pd.read_parquet('<out>/relationships/STRENGTH')``.
+
+The manifest is rewritten after every page, so an interrupted export resumes
+after the last id written (--restart starts over). Rows per second are
+reported per part.
+
+Configuration (environment):
+    GRAPH_EXPORT_PAGE_SIZE   rows per page and file (default 50000)
+    GRAPH_EXPORT_FETCH_SIZE  rows per fetch from the server (default 10000)
+
+Usage (from ``src/``):
+    python graph_export.py [--out ../data/parquet] [--page-size 50000] [--fetch-size 10000] [--labels Microbe ...] [--types STRENGTH ...] [--restart]
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from metrics import log_csv, now_iso
+from query_registry import EXPORT_LABELS, EXPORT_TYPES, STRENGTH_TYPES, get_query
+
+EXPORT_FORMAT = "neurobiome-parquet/1"
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'parquet')
+
+_STRINGS = pa.list_(pa.string())
+NODE_COLUMNS = [('id', pa.string()), ('labels', _STRINGS)]
+RELATIONSHIP_COLUMNS = [('id', pa.string()), ('start', pa.string()), ('end', pa.string()),
+                        ('start_cui', pa.string()), ('end_cui', pa.string())]
+_ENTITY = [('cui', pa.string()), ('name', pa.string()), ('official_name', pa.string()), ('synonyms', _STRINGS)]
+_PUBLICATION = [('pmid', pa.string()), ('publication_year', pa.int64()), ('title', pa.string()),
+                ('journal', pa.string()), ('rel_type', pa.string()), ('evidence', pa.string()),
+                ('cui_microbe', pa.string()), ('cui_disease', pa.string())]
+PROPERTY_COLUMNS = {
+    'Microbe': _ENTITY + [('rank', pa.string()), ('tax_id', pa.int64())],
+    'Disease': _ENTITY + [('definition', pa.string())],
+    'Food': list(_ENTITY),
+    'RiskFactor': [('name', pa.string()), ('type', pa.string()), ('description', pa.string())],
+    'STRENGTH': [(key, pa.float64()) for key in ('strength',) + STRENGTH_TYPES],
+    'POSITIVE': list(_PUBLICATION),
+    'NEGATIVE': list(_PUBLICATION),
+    'PARENT': [],
+    'ASSOCIATED_WITH': [],
+}
+
+
+def _cast(value, type_: pa.DataType):
+    """One property value as the column type; TypeError/ValueError when it does not fit."""
+    if value is None:
+        return None
+    if pa.types.is_list(type_):
+        if not isinstance(value, (list, tuple)):
+            raise TypeError(f"expected a list, got {type(value).__name__}")
+        return [_cast(v, type_.value_type) for v in value]
+    if isinstance(value, (list, tuple, dict)):
+        raise TypeError(f"expected a scalar, got {type(value).__name__}")
+    if pa.types.is_string(type_):
+        # Integer PMIDs, temporal values and the like keep their string form
+        return value if isinstance(value, str) else str(value)
+    if pa.types.is_integer(type_):
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f"{value!r} is not an integer")
+        return int(value)
+    if isinstance(value, bool):
+        raise ValueError(f"{value!r} is not a number")
+    return float(value)
+
+
+def schema(base: List[Tuple[str, pa.DataType]], properties: List[Tuple[str, pa.DataType]]) -> pa.Schema:
+    return pa.schema(base + properties + [('extra', pa.string())])
+
+
+def page_table(rows: List[Dict], base: List[Tuple[str, pa.DataType]],
+               properties: List[Tuple[str, pa.DataType]]) -> pa.Table:
+    """One page of export rows as a table with the part's schema.
+
+    Properties outside the schema, and values that do not fit their column, go to the 'extra' JSON column.
+    """
+    typed = {name for name, _ in properties}
+    props = [row.get('properties') or {} for row in rows]
+    extra = [{key: value for key, value in p.items() if key not in typed} for p in props]
+    columns = {name: pa.array([row.get(name) for row in rows], type=type_) for name, type_ in base}
+    for name, type_ in properties:
+        values = [p.get(name) for p in props]
+        try:
+            columns[name] = pa.array(values, type=type_)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed types in this page: cast value by value and keep the misfits in extra
+            cast = []
+            for i, value in enumerate(values):
+                try:
+                    cast.append(_cast(value, type_))
+                except (TypeError, ValueError):
+                    cast.append(None)
+                    extra[i][name] = value
+            columns[name] = pa.array(cast, type=type_)
+    columns['extra'] = pa.array([json.dumps(e, default=str, sort_keys=True) if e else None for e in extra],
+                                type=pa.string())
+    return pa.table(columns, schema=schema(base, properties))
+
+
+class GraphExporter:
+    """Restartable, streamed export of nodes and relationships to Parquet.
+
+    Args:
+        out_dir: Output directory (holds the part directories and manifest.json)
+        db: Graph backend (get_graph_backend() by default)
+        page_size: Rows per page and file (GRAPH_EXPORT_PAGE_SIZE, default 50000)
+        fetch_size: Rows per fetch from the server (GRAPH_EXPORT_FETCH_SIZE, default 10000)
+    """
+
+    def __init__(self, out_dir: str = DEFAULT_OUT, db=None, page_size: Optional[int] = None,
+                 fetch_size: Optional[int] = None):
+        self.out_dir = out_dir
+        self.db = db
+        self.page_size = page_size or int(os.getenv('GRAPH_EXPORT_PAGE_SIZE', '50000'))
+        self.fetch_size = fetch_size or int(os.getenv('GRAPH_EXPORT_FETCH_SIZE', '10000'))
+        self.manifest_path = os.path.join(out_dir, 'manifest.json')
+        self.manifest = self._load_manifest()
+
+    def _graph(self):
+        if self.db is None:
+            from graph_backend import get_graph_backend
+            self.db = get_graph_backend()
+        return self.db
+
+    def _load_manifest(self) -> Dict:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('format') != EXPORT_FORMAT:
+                raise ValueError(f"{self.manifest_path} is not a {EXPORT_FORMAT} manifest")
+            return manifest
+        return {'format': EXPORT_FORMAT, 'started_at': now_iso(), 'parts': {}}
+
+    def _save_manifest(self):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def reset(self, parts: Iterable[str]):
+        """Forget the progress of the given parts and delete their page files."""
+        for part in parts:
+            self.manifest['parts'].pop(part, None)
+            for path in glob.glob(os.path.join(self.out_dir, part, 'part-*.parquet')):
+                os.remove(path)
+        self.manifest['started_at'] = now_iso()
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._save_manifest()
+
+    def export_part(self, kind: str, name: str) -> Dict:
+        """Export one label ('nodes') or relationship type ('relationships'), resuming after the last id written.
+
+        Returns:
+            Dict: The part's manifest entry plus rows and rows_per_s of this run
+        """
+        template, base = {
+            'nodes': ('export_nodes', NODE_COLUMNS),
+            'relationships': ('export_relationships', RELATIONSHIP_COLUMNS),
+        }[kind]
+        part = f"{kind}/{name}"
+        part_dir = os.path.join(self.out_dir, kind, name)
+        os.makedirs(part_dir, exist_ok=True)
+        state = self.manifest['parts'].setdefault(part, {'pages': 0, 'rows': 0, 'after': None, 'done': False})
+        properties = PROPERTY_COLUMNS[name]
+
+        t0 = time.perf_counter()
+        exported = 0
+
+        def write_page(rows: List[Dict]):
+            nonlocal exported
+            path = os.path.join(part_dir, f"part-{state['pages']:05d}.parquet")
+            # Dot-prefixed, so readers of the part directory skip a half-written page
+            tmp_path = os.path.join(part_dir, f".part-{state['pages']:05d}.parquet.tmp")
+            pq.write_table(page_table(rows, base, properties), tmp_path)
+            os.replace(tmp_path, path)
+            state['pages'] += 1
+            state['rows'] += len(rows)
+            state['after'] = rows[-1]['id']
+            exported += len(rows)
+            self._save_manifest()
+
+        if not state['done']:
+            if state['after'] is None:
+                query = get_query(template, name, 'first')
+                params = query.bind()
+            else:
+                query = get_query(template, name, 'after')
+                params = query.bind(after=state['after'])
+            rows = []
+            for row in self._graph().stream(query.cypher, params, fetch_size=self.fetch_size):
+                rows.append(row)
+                if len(rows) == self.page_size:
+                    write_page(rows)
+                    rows = []
+            if rows:
+                write_page(rows)
+            state['done'] = True
+            self._save_manifest()
+
+        ms = (time.perf_counter() - t0) * 1000
+        rows_per_s = exported / (ms / 1000) if ms > 0 else 0.0
+        print(f"[METRIC] graph_export_ms={ms:.2f} part={part} rows={exported} rows_per_s={rows_per_s:.0f}")
+        log_csv({
+            "ts": now_iso(),
+            "metric": "graph_export",
+            "label": part,
+            "ms": round(ms, 2),
+            "rows": exported,
+        })
+        return {**state, 'exported': exported, 'rows_per_s': round(rows_per_s, 1)}
+
+    def unexported(self) -> Dict[str, List[str]]:
+        """Labels and relationship types in the graph that have no export query."""
+        labels = [row['label'] for row in self._graph().run(get_query('schema_labels').cypher)]
+        types = [row['relationshipType'] for row in self._graph().run(get_query('schema_relationship_types').cypher)]
+        return {'labels': [label for label in labels if label not in EXPORT_LABELS],
+                'types': [rel_type for rel_type in types if rel_type not in EXPORT_TYPES]}
+
+    def export(self, labels: Iterable[str] = EXPORT_LABELS, types: Iterable[str] = EXPORT_TYPES,
+               restart: bool = False) -> Dict:
+        """Export the given labels and relationship types.
+
+        Args:
+            labels: Node labels, from EXPORT_LABELS
+            types: Relationship types, from EXPORT_TYPES
+            restart: Start every part over instead of resuming
+
+        Returns:
+            Dict: Per part rows and rows_per_s, plus the totals of this run
+        """
+        labels, types = list(labels), list(types)
+        unknown = [label for label in labels if label not in EXPORT_LABELS] + \
+                  [rel_type for rel_type in types if rel_type not in EXPORT_TYPES]
+        if unknown:
+            raise ValueError(f"No export query for {unknown}; labels: {EXPORT_LABELS}, types: {EXPORT_TYPES}")
+        parts = [('nodes', label) for label in labels] + [('relationships', rel_type) for rel_type in types]
+        if restart:
+            self.reset(f"{kind}/{name}" for kind, name in parts)
+
+        t0 = time.perf_counter()
+        results = {f"{kind}/{name}": self.export_part(kind, name) for kind, name in parts}
+        seconds = time.perf_counter() - t0
+        exported = sum(result['exported'] for result in results.values())
+        return {
+            'out': self.out_dir,
+            'parts': {part: {'rows': result['rows'], 'pages': result['pages'], 'exported': result['exported'],
+                             'rows_per_s': result['rows_per_s']} for part, result in results.items()},
+            'exported': exported,
+            'seconds': round(seconds, 2),
+            'rows_per_s': round(exported / seconds, 1) if seconds > 0 else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the knowledge graph to Parquet, per label and type")
+    parser.add_argument('--out', default=DEFAULT_OUT, help="Output directory")
+    parser.add_argument('--page-size', type=int, help="Rows per page and file")
+    parser.add_argument('--fetch-size', type=int, help="Rows per fetch from the server")
+    parser.add_argument('--labels', nargs='*', default=list(EXPORT_LABELS))
+    parser.add_argument('--types', nargs='*', default=list(EXPORT_TYPES))
+    parser.add_argument('--restart', action='store_true', help="Start over instead of resuming")
+    args = parser.parse_args()
+
+    exporter = GraphExporter(args.out, page_size=args.page_size, fetch_size=args.fetch_size)
+    missing = exporter.unexported()
+    if missing['labels'] or missing['types']:
+        print(f"Not exported (no export query): {missing}")
+    print(json.dumps(exporter.export(args.labels, args.types, restart=args.restart), indent=2))
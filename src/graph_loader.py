@@ -0,0 +1,189 @@
+"""DataLoader-style batching of per-entity graph lookups.
+
+Pages and agent tools ask for entities one at a time (a microbe by name, a
+disease by CUI, the papers linking a microbe and a disease). A
+GraphBatchLoader collects those requests instead of running them. The first
+time any result is needed, it sends one ``UNWIND $keys`` query per lookup
+kind and property key (see the batched templates in query_registry). Keys
+are deduplicated, and each caller gets back the rows for its own key.
+
+Results are cached for the loader's lifetime, so create one loader per
+render or per agent turn. GraphQueries does this per instance, and the agent
+does it per turn.
+
+Usage:
+    loader = GraphBatchLoader()
+    pending = [loader.load('microbe', 'name', name) for name in names]
+    rows = [p.result() for p in pending]   # one query for all names
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+import pandas as pd
+
+from metrics import log_csv, now_iso
+from query_registry import get_query
+
+
+class _Batch(NamedTuple):
+    template: str                           # batched registry template
+    param: str                              # list parameter of the template
+    to_param: Callable                      # key -> list element
+    row_key: Callable[[Dict], object]       # row -> key it answers (removes the key columns)
+
+
+def _pop_key(row: Dict):
+    return row.pop('key')
+
+
+def _pop_pair(row: Dict) -> Tuple[str, str]:
+    return row.pop('disease_key'), row.pop('microbe_key')
+
+
+BATCHES: Dict[str, _Batch] = {
+    'microbe': _Batch('microbes_by_property', 'keys', lambda key: key, _pop_key),
+    'disease': _Batch('diseases_by_property', 'keys', lambda key: key, _pop_key),
+    'food': _Batch('foods_by_property', 'keys', lambda key: key, _pop_key),
+    'relationship': _Batch('relationships_by_microbe_disease', 'pairs',
+                           lambda pair: {'disease': pair[0], 'microbe': pair[1]}, _pop_pair),
+    'strength': _Batch('strengths_by_microbe_disease', 'pairs',
+                       lambda pair: {'disease': pair[0], 'microbe': pair[1]}, _pop_pair),
+}
+
+
+def relationship_frame(rows: List[Dict]) -> pd.DataFrame:
+    """Rows of a 'relationship' lookup as the paper table, NEGATIVE before POSITIVE."""
+    result = pd.DataFrame(rows)
+    if result.empty:
+        return result
+    return result.sort_values('relationship', kind='stable').drop(columns='relationship').reset_index(drop=True)
+
+
+class Pending:
+    """Handle for a requested lookup; result() runs every pending batch if needed."""
+
+    def __init__(self, loader: 'GraphBatchLoader', slot: tuple):
+        self._loader = loader
+        self._slot = slot
+
+    def result(self) -> List[Dict]:
+        return self._loader._resolve(self._slot)
+
+
+class GraphBatchLoader:
+    """Collects entity lookups and runs them as one UNWIND query per kind.
+
+    Args:
+        db: Graph backend (get_graph_backend() by default)
+    """
+
+    def __init__(self, db=None):
+        if db is None:
+            from graph_backend import get_graph_backend
+            db = get_graph_backend()
+        self.db = db
+        self._lock = threading.Lock()
+        # (kind, variant) -> keys waiting for the next dispatch, in request order
+        self._pending: "OrderedDict[tuple, OrderedDict]" = OrderedDict()
+        # (kind, variant, key) -> rows
+        self._results: Dict[tuple, List[Dict]] = {}
+        self.queries = 0
+
+    def load(self, kind: str, *args) -> Pending:
+        """Request a lookup without running it.
+
+        Args:
+            kind: 'microbe', 'disease' or 'food' with (property key, value);
+                'relationship' or 'strength' with (disease key, microbe key, disease value, microbe value)
+
+        Returns:
+            Pending: Call result() to get the rows for this key
+        """
+        if kind not in BATCHES:
+            raise ValueError(f"Unknown lookup kind {kind}; expected one of {sorted(BATCHES)}")
+        if kind in ('relationship', 'strength'):
+            d_key, m_key, disease, microbe = args
+            variant, key = (d_key, m_key), (disease, microbe)
+        else:
+            prop, value = args
+            variant, key = (prop,), value
+        values = key if isinstance(key, tuple) else (key,)
+        if not all(isinstance(v, str) for v in values):
+            raise TypeError(f"Lookup {kind}: values must be str, got {[type(v).__name__ for v in values]}")
+        get_query(BATCHES[kind].template, *variant)  # reject unknown property keys now, not at dispatch
+        slot = (kind, variant, key)
+        with self._lock:
+            if slot not in self._results:
+                self._pending.setdefault((kind, variant), OrderedDict())[key] = None
+        return Pending(self, slot)
+
+    def load_many(self, kind: str, requests: List[tuple]) -> List[List[Dict]]:
+        """Request several lookups of one kind and return their rows, in order."""
+        pending = [self.load(kind, *args) for args in requests]
+        return [p.result() for p in pending]
+
+    def dispatch(self):
+        """Run one batched query per pending (kind, variant).
+
+        A batch leaves the pending set only once its query succeeded. A failed
+        batch stays pending (a later result() retries it); the other batches
+        still run, and the first error is raised.
+        """
+        errors = self._dispatch()
+        if errors:
+            raise next(iter(errors.values()))
+
+    def _dispatch(self) -> Dict[tuple, Exception]:
+        errors: Dict[tuple, Exception] = {}
+        with self._lock:
+            for batch, keys in list(self._pending.items()):
+                kind, variant = batch
+                spec = BATCHES[kind]
+                query = get_query(spec.template, *variant)
+                t0 = time.perf_counter()
+                try:
+                    rows = self.db.run(query.cypher, query.bind(**{spec.param: [spec.to_param(k) for k in keys]}))
+                except Exception as e:
+                    errors[batch] = e
+                    continue
+                ms = (time.perf_counter() - t0) * 1000
+                self.queries += 1
+
+                fanned = {key: [] for key in keys}
+                for row in rows:
+                    row = dict(row)
+                    fanned.setdefault(spec.row_key(row), []).append(row)
+                for key, key_rows in fanned.items():
+                    self._results[(kind, variant, key)] = key_rows
+                del self._pending[batch]
+
+                print(f"[METRIC] graph_batch_ms={ms:.2f} label={query.name} keys={len(keys)} rows={len(rows)}")
+                log_csv({
+                    "ts": now_iso(),
+                    "metric": "graph_batch",
+                    "label": query.name,
+                    "ms": round(ms, 2),
+                    "keys": len(keys),
+                    "rows": len(rows),
+                })
+        return errors
+
+    def _resolve(self, slot: tuple) -> List[Dict]:
+        if slot not in self._results:
+            errors = self._dispatch()
+            if slot not in self._results:
+                error = errors.get(slot[:2])
+                if error is not None:
+                    raise error
+                # Requested again after clear(): queue it and run it now
+                with self._lock:
+                    self._pending.setdefault(slot[:2], OrderedDict())[slot[2]] = None
+                self.dispatch()
+        return [dict(row) for row in self._results.get(slot, [])]
+
+    def clear(self):
+        """Forget cached results (e.g. after the graph changed)."""
+        with self._lock:
+            self._results.clear()
@@ -1,26 +1,13 @@
-from py2neo import Graph, NodeMatcher
-import os
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import pandas as pd
-
-# Fetch connection details from environment variables
-neo4j_host = os.getenv('NEO4J_HOST', 'localhost')
-neo4j_port = os.getenv('NEO4J_PORT', '7687')
-neo4j_user = os.getenv('NEO4J_USER', 'neo4j')
-neo4j_password = os.getenv('NEO4J_PASSWORD', 'synhodo123')
-
-# Build the bolt URL
-bolt_url = f'bolt://{neo4j_host}:{neo4j_port}'
+from graph_backend import get_graph_backend
+from path_enumerator import PathEnumerator, PathTable
+from strength_scoring import score_paths
 
 class GraphQueries:
     def __init__(self):
-        """Initialize Neo4j connection"""
-        self.graph = Graph(
-            bolt_url,
-            auth=(neo4j_user, neo4j_password),
-            secure=False,
-            verify=False
-        )
+        """Use the configured graph backend (the shared, pooled Neo4j connection by default)"""
+        self.db = get_graph_backend()
 
     def get_all_diseases(self) -> pd.DataFrame:
         """Get all diseases with their CUIs"""
@@ -29,7 +16,7 @@ class GraphQueries:
         RETURN DISTINCT d.cui as cui, d.name as name
         ORDER BY d.name
         """
-        return self.graph.run(query).to_data_frame()
+        return self.db.run_df(query)
 
     def get_disease_by_property(self, properties: Dict[str, str]) -> Optional[Dict]:
         """Get disease information by property"""
@@ -46,7 +33,7 @@ class GraphQueries:
             d.synonyms as synonyms
         """.format(property=list(properties.keys())[0])
         
-        result = self.graph.run(query, value=list(properties.values())[0]).data()
+        result = self.db.run(query, value=list(properties.values())[0])
         return result[0] if result else None
 
     def get_disease_food_relations(self, cui: str) -> pd.DataFrame:
@@ -61,33 +48,34 @@ class GraphQueries:
             m.synonyms as microbe_synonyms,
             d.name as disease_name,
             fm.strength as food_microbe_strength,
-            md.strength as microbe_disease_strength,
-            CASE 
-                WHEN fm.strength > 0 AND md.strength > 0 THEN 'positive'
-                WHEN fm.strength < 0 AND md.strength < 0 THEN 'positive'
-                ELSE 'negative'
-            END as derived_relation
+            md.strength as microbe_disease_strength
         """
-        result = self.graph.run(query, cui=cui).to_data_frame()
+        result = self.db.run_df(query, cui=cui)
         
         # Clean up data
         result = result.dropna(subset=["food_microbe_strength", "microbe_disease_strength"])
         
-        # Calculate food_disease_strength
-        result['food_disease_strength'] = abs(result['food_microbe_strength']) + \
-            abs(result['microbe_disease_strength']) * (
-                1 if result['derived_relation'] == 'positive' else -1
-            )
-        
-        return result
+        # Add derived_relation and food_disease_strength
+        return score_paths(result)
 
-    def get_relationship_paths(self, disease_cui: str, food_name: str) -> dict:
-        """Get relationship paths between disease and food"""
-        query = """
-        MATCH p = (d:Disease {cui: $disease_cui})-[*1..3]-(f:Food {name: $food_name})
-        RETURN 
-            collect(DISTINCT nodes(p)) as allNodes,
-            collect(DISTINCT relationships(p)) as allRels
+    def iter_relationship_paths(self, disease_cui: str, food_name: str, table: Optional[PathTable] = None,
+                                max_paths: Optional[int] = None, max_fanout: Optional[int] = None) -> Iterator[Dict]:
+        """Yield the strongest paths (up to 3 hops) between a disease and a food, strongest first
+
+        Paths refer to nodes and relationships by id; see path_enumerator.PathEnumerator.
+        """
+        enumerator = PathEnumerator(self.db, max_paths=max_paths, max_fanout=max_fanout)
+        return enumerator.paths(disease_cui, food_name, table)
+
+    def get_relationship_paths(self, disease_cui: str, food_name: str, max_paths: Optional[int] = None,
+                               max_fanout: Optional[int] = None) -> dict:
+        """Get the strongest relationship paths between disease and food
+
+        Returns:
+            dict: paths (ranked, by node and relationship id), nodes and relationships
+                (id -> labels/type and properties, each stored once) and candidates
         """
-        result = self.graph.run(query, disease_cui=disease_cui, food_name=food_name).data()
-        return result[0] if result else {}
+        table = PathTable()
+        paths = list(self.iter_relationship_paths(disease_cui, food_name, table, max_paths, max_fanout))
+        return {'paths': paths, 'nodes': table.nodes, 'relationships': table.relationships,
+                'candidates': table.candidates}
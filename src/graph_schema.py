@@ -0,0 +1,197 @@
+"""Index/constraint bootstrap for the knowledge graph, plus a query plan verifier.
+
+The registered queries (query_registry) anchor on a Microbe, Disease or Food
+by cui, name or official_name. Without indexes on those properties, a fresh
+database answers every one of them with a label scan, and nothing says so.
+bootstrap() creates what the queries need, idempotently:
+
+  - a uniqueness constraint on cui per label (a range index when existing
+    data has duplicate CUIs and the constraint cannot be created)
+  - range indexes on name and official_name
+  - text indexes on name and official_name, for CONTAINS filters
+
+verify() runs EXPLAIN on every registered query. It fails when a query that
+matches a node by an indexed property equality (``n.cui = $cui``,
+``m.name = key``, ``d.cui = pair.disease``) plans a NodeByLabelScan or
+AllNodesScan for that node instead of an index seek. Scans in queries with no
+such anchor (listings, statistics) are expected, and are only reported with --verbose.
+
+Case-insensitive searches (``toLower(n.name) CONTAINS ...``) cannot use any
+index, because the function is applied to the property. They are listed as
+scans but not failed.
+
+Usage (from ``src/``):
+    python graph_schema.py bootstrap [--verify]
+    python graph_schema.py verify [--verbose]
+    python graph_schema.py show
+"""
+import argparse
+import re
+import sys
+from typing import Dict, List, Optional
+
+from neo4j.exceptions import ClientError
+
+from query_registry import LABELS, PROPERTY_KEYS, QUERIES, NamedQuery
+
+SCAN_OPERATORS = ('NodeByLabelScan', 'AllNodesScan')
+SEEK_OPERATORS = ('NodeIndexSeek', 'NodeUniqueIndexSeek', 'NodeIndexSeekByRange', 'NodeUniqueIndexSeekByRange',
+                  'MultiNodeIndexSeek', 'AssertingMultiNodeIndexSeek')
+RANGE_PROPERTIES = ('name', 'official_name')
+TEXT_PROPERTIES = ('name', 'official_name')
+
+# n.<key> = $param | key | pair.<field>, for a property key an index covers
+_ANCHOR = re.compile(r"\b([A-Za-z_]\w*)\.(%s)\s*=\s*(\$\w+|key\b|pair\.\w+)"
+                     % '|'.join(sorted({k for keys in PROPERTY_KEYS.values() for k in keys})))
+
+# Placeholder values for EXPLAIN; the plan does not depend on them
+_SAMPLE_VALUES = {str: '', int: 1, float: 0.0, bool: False}
+_SAMPLE_LISTS = {'keys': [''], 'pairs': [{'disease': '', 'microbe': ''}]}
+
+
+def _db(db=None):
+    if db is None:
+        from neo4j_pool import get_connection_manager
+        db = get_connection_manager()
+    return db
+
+
+def schema_statements() -> List[Dict]:
+    """The constraints and indexes bootstrap() creates, as {name, cypher, fallback} dicts."""
+    statements = []
+    for label in LABELS:
+        prefix = label.lower()
+        statements.append({
+            'name': f"{prefix}_cui_unique",
+            'cypher': f"CREATE CONSTRAINT {prefix}_cui_unique IF NOT EXISTS FOR (n:`{label}`) REQUIRE n.cui IS UNIQUE",
+            'fallback': f"CREATE INDEX {prefix}_cui_range IF NOT EXISTS FOR (n:`{label}`) ON (n.cui)",
+        })
+        for prop in RANGE_PROPERTIES:
+            statements.append({
+                'name': f"{prefix}_{prop}_range",
+                'cypher': f"CREATE INDEX {prefix}_{prop}_range IF NOT EXISTS FOR (n:`{label}`) ON (n.{prop})",
+                'fallback': None,
+            })
+        for prop in TEXT_PROPERTIES:
+            statements.append({
+                'name': f"{prefix}_{prop}_text",
+                'cypher': f"CREATE TEXT INDEX {prefix}_{prop}_text IF NOT EXISTS FOR (n:`{label}`) ON (n.{prop})",
+                'fallback': None,
+            })
+    return statements
+
+
+def bootstrap(db=None, wait_seconds: int = 300) -> List[Dict]:
+    """Create the constraints and indexes (existing ones are left alone) and wait until they are online.
+
+    Returns:
+        list: {name, status} per statement; status is 'ok' or 'fallback: <reason>'
+    """
+    db = _db(db)
+    report = []
+    for statement in schema_statements():
+        try:
+            db.run(statement['cypher'])
+            report.append({'name': statement['name'], 'status': 'ok'})
+        except ClientError as e:
+            if statement['fallback'] is None:
+                raise
+            # e.g. duplicate CUIs in the data, or an equivalent index created by hand
+            print(f"Could not create {statement['name']}, creating a range index instead: {e.message}")
+            db.run(statement['fallback'])
+            report.append({'name': statement['name'], 'status': f"fallback: {e.code}"})
+    db.run("CALL db.awaitIndexes($seconds)", {'seconds': wait_seconds})
+    return report
+
+
+def show_indexes(db=None) -> List[Dict]:
+    return _db(db).run("SHOW INDEXES YIELD name, type, state, labelsOrTypes, properties, owningConstraint "
+                       "RETURN name, type, state, labelsOrTypes, properties, owningConstraint ORDER BY name")
+
+
+def sample_parameters(query: NamedQuery) -> Dict:
+    """Type-correct placeholder parameters for planning a query."""
+    return {key: _SAMPLE_LISTS.get(key, []) if expected is list else _SAMPLE_VALUES[expected]
+            for key, expected in query.params.items()}
+
+
+def anchors(cypher: str) -> List[str]:
+    """Variables of Microbe/Disease/Food nodes the query matches by an indexed property equality."""
+    found = []
+    for var, _, _ in _ANCHOR.findall(cypher):
+        label = re.search(r"\(\s*%s\s*:\s*`?(\w+)`?" % re.escape(var), cypher)
+        if label and label.group(1) in LABELS and var not in found:
+            found.append(var)
+    return found
+
+
+def _operators(plan: Dict) -> List[Dict]:
+    """Every operator of a plan tree, with the planner version suffix removed."""
+    operators, stack = [], [plan]
+    while stack:
+        op = stack.pop()
+        operators.append({'operator': op['operatorType'].split('@')[0],
+                          'identifiers': list(op.get('identifiers', []))})
+        stack.extend(op.get('children', []))
+    return operators
+
+
+def check_plan(query: NamedQuery, plan: Dict) -> Dict:
+    """Compare a plan with the seeks its anchors call for.
+
+    Returns:
+        dict: name, anchors, scans (variables scanned), seeks (operators), ok
+    """
+    expected = anchors(query.cypher)
+    operators = _operators(plan)
+    scans = sorted({ident for op in operators if op['operator'] in SCAN_OPERATORS for ident in op['identifiers']})
+    seeks = sorted({op['operator'] for op in operators if op['operator'] in SEEK_OPERATORS})
+    return {
+        'name': query.name,
+        'anchors': expected,
+        'scans': scans,
+        'seeks': seeks,
+        'ok': not any(var in scans for var in expected),
+    }
+
+
+def verify(db=None, names: Optional[List[str]] = None) -> List[Dict]:
+    """EXPLAIN every registered query (or those named) and check its plan; see check_plan."""
+    db = _db(db)
+    results = []
+    for name in names or sorted(QUERIES):
+        query = QUERIES[name]
+        plan = db.explain(query.cypher, sample_parameters(query))
+        results.append(check_plan(query, plan))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create graph indexes and verify that queries use them")
+    parser.add_argument('command', choices=['bootstrap', 'verify', 'show'])
+    parser.add_argument('--verify', action='store_true', help="Verify query plans after bootstrap")
+    parser.add_argument('--verbose', action='store_true', help="Also list scans in queries without anchors")
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        for index in show_indexes():
+            print(index)
+        sys.exit(0)
+
+    if args.command == 'bootstrap':
+        for row in bootstrap():
+            print(f"{row['name']:<32} {row['status']}")
+        if not args.verify:
+            sys.exit(0)
+
+    results = verify()
+    failures = [r for r in results if not r['ok']]
+    for r in results:
+        if not r['ok']:
+            print(f"FAIL {r['name']}: scans {r['scans']} where {r['anchors']} should be index seeks")
+        elif args.verbose and r['scans']:
+            print(f"scan {r['name']}: {r['scans']} (no indexed anchor)")
+    print(f"{len(results)} queries planned, {sum(bool(r['anchors']) for r in results)} with indexed anchors, "
+          f"{len(failures)} failing")
+    if failures:
+        sys.exit(1)
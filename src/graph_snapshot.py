@@ -0,0 +1,304 @@
+"""In-process snapshot of the Food-Microbe-Disease STRENGTH/PARENT graph.
+
+The hottest GraphQueries calls are 1-2 hop traversals over STRENGTH and
+PARENT edges. Each one costs a Bolt round trip. GraphSnapshot pulls those
+edges once into NumPy CSR adjacency arrays. Node ids are interned to
+consecutive ints, and every edge keeps its strength_raw / strength_IF /
+strength_IFQ. The snapshot then answers the same row shapes as
+GraphQueries in memory.
+
+The snapshot does not follow graph changes on its own; call refresh() after
+the graph is updated.
+
+Usage (from ``src/``):
+    python graph_snapshot.py            # load from Neo4j and print stats and timings
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import log_csv, now_iso
+from query_registry import get_query
+
+NODES_QUERY = get_query('snapshot_nodes').cypher
+EDGES_QUERY = get_query('snapshot_edges').cypher
+
+STRENGTH, PARENT = 0, 1
+EDGE_TYPES = ('STRENGTH', 'PARENT')
+STRENGTH_FIELDS = ('strength_raw', 'strength_IF', 'strength_IFQ')
+
+
+def _float(value) -> float:
+    return float('nan') if value is None else float(value)
+
+
+def _value(x: float):
+    """NaN (missing property) back to None, as Neo4j returns it."""
+    return None if x != x else float(x)
+
+
+def _relation_text(x: float):
+    """toString(strength_raw) as Cypher renders it."""
+    return None if x != x else str(float(x))
+
+
+class _Arrays:
+    """Immutable arrays of one loaded snapshot version."""
+
+    def __init__(self, nodes: List[Dict], edges: List[Dict]):
+        self.labels: List[str] = sorted({n['label'] for n in nodes})
+        label_code = {label: i for i, label in enumerate(self.labels)}
+        ids = {n['id']: i for i, n in enumerate(nodes)}
+
+        self.node_label = np.array([label_code[n['label']] for n in nodes], dtype='int8')
+        self.cui = [n.get('cui') for n in nodes]
+        self.name = [n.get('name') for n in nodes]
+        self.official_name = [n.get('official_name') for n in nodes]
+        self.by_cui: Dict[Tuple[str, str], List[int]] = {}
+        for i, n in enumerate(nodes):
+            if n.get('cui') is not None:
+                self.by_cui.setdefault((n['label'], n['cui']), []).append(i)
+
+        edges = [e for e in edges if e['source'] in ids and e['target'] in ids and e['type'] in EDGE_TYPES]
+        self.edge_source = np.array([ids[e['source']] for e in edges], dtype='int32')
+        self.edge_target = np.array([ids[e['target']] for e in edges], dtype='int32')
+        self.edge_type = np.array([EDGE_TYPES.index(e['type']) for e in edges], dtype='int8')
+        self.strength = {f: np.array([_float(e.get(f)) for e in edges], dtype='float64') for f in STRENGTH_FIELDS}
+
+        # Undirected CSR: every edge appears in the adjacency of both endpoints
+        n_nodes, n_edges = len(nodes), len(edges)
+        owner = np.concatenate([self.edge_source, self.edge_target])
+        other = np.concatenate([self.edge_target, self.edge_source])
+        edge_id = np.concatenate([np.arange(n_edges, dtype='int32')] * 2)
+        order = np.lexsort((edge_id, owner))  # by node, then edge id
+        self.neighbors = other[order]
+        self.neighbor_edge = edge_id[order]
+        self.indptr = np.zeros(n_nodes + 1, dtype='int64')
+        np.cumsum(np.bincount(owner, minlength=n_nodes), out=self.indptr[1:])
+
+    def nbytes(self) -> int:
+        arrays = [self.node_label, self.edge_source, self.edge_target, self.edge_type,
+                  self.neighbors, self.neighbor_edge, self.indptr] + list(self.strength.values())
+        return int(sum(a.nbytes for a in arrays))
+
+
+class GraphSnapshot:
+    """CSR snapshot of STRENGTH/PARENT edges answering GraphQueries row shapes.
+
+    Args:
+        db: Graph backend to load from (get_graph_backend() by default)
+    """
+
+    def __init__(self, db=None):
+        self.db = db
+        self.loaded_at: Optional[float] = None
+        self.load_ms: Optional[float] = None
+        self._arrays: Optional[_Arrays] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_records(cls, nodes: Iterable[Dict], edges: Iterable[Dict]) -> "GraphSnapshot":
+        """Build a snapshot from rows shaped like NODES_QUERY / EDGES_QUERY results."""
+        snapshot = cls()
+        snapshot._set(_Arrays(list(nodes), list(edges)))
+        return snapshot
+
+    def _set(self, arrays: _Arrays):
+        # A single reference swap, so queries never see a half-built snapshot
+        self._arrays = arrays
+        self.loaded_at = time.time()
+
+    def refresh(self) -> "GraphSnapshot":
+        """(Re)load all nodes and edges from the graph and swap the new arrays in."""
+        if self.db is None:
+            from graph_backend import get_graph_backend
+            self.db = get_graph_backend()
+        with self._lock:
+            t0 = time.perf_counter()
+            arrays = _Arrays(self.db.run(NODES_QUERY), self.db.run(EDGES_QUERY))
+            self._set(arrays)
+            self.load_ms = (time.perf_counter() - t0) * 1000
+        print(f"[METRIC] graph_snapshot_load_ms={self.load_ms:.2f} nodes={len(arrays.cui)} "
+              f"edges={len(arrays.edge_source)}")
+        log_csv({
+            "ts": now_iso(),
+            "metric": "graph_snapshot_load",
+            "ms": round(self.load_ms, 2),
+            "rows": len(arrays.edge_source),
+        })
+        return self
+
+    @property
+    def arrays(self) -> _Arrays:
+        if self._arrays is None:
+            self.refresh()
+        return self._arrays
+
+    def stats(self) -> Dict:
+        a = self.arrays
+        return {
+            "nodes": len(a.cui),
+            "edges": int(len(a.edge_source)),
+            "bytes": a.nbytes(),
+            "loaded_at": self.loaded_at,
+            "load_ms": self.load_ms,
+        }
+
+    # --- traversal helpers ---------------------------------------------------
+
+    def _nodes(self, a: _Arrays, label: str, cui: str) -> List[int]:
+        return a.by_cui.get((label, cui), [])
+
+    def _incident(self, a: _Arrays, node: int, edge_type: Optional[int] = None, label: Optional[str] = None):
+        """(neighbor ids, edge ids) around a node, optionally filtered by edge type and neighbor label."""
+        start, end = a.indptr[node], a.indptr[node + 1]
+        neighbors, edge_ids = a.neighbors[start:end], a.neighbor_edge[start:end]
+        mask = np.ones(len(neighbors), dtype=bool)
+        if edge_type is not None:
+            mask &= a.edge_type[edge_ids] == edge_type
+        if label is not None:
+            if label not in a.labels:
+                return neighbors[:0], edge_ids[:0]
+            mask &= a.node_label[neighbors] == a.labels.index(label)
+        return neighbors[mask], edge_ids[mask]
+
+    def _food_microbe_disease(self, a: _Arrays, start_label: str, cui: str):
+        """(food, microbe, disease, food-microbe edge, microbe-disease edge) arrays for all paths."""
+        end_label = 'Food' if start_label == 'Disease' else 'Disease'
+        parts = []
+        for start in self._nodes(a, start_label, cui):
+            microbes, first_edges = self._incident(a, start, STRENGTH, 'Microbe')
+            for microbe, first_edge in zip(microbes, first_edges):
+                ends, second_edges = self._incident(a, microbe, STRENGTH, end_label)
+                if len(ends):
+                    parts.append((np.full(len(ends), start), np.full(len(ends), microbe), ends,
+                                  np.full(len(ends), first_edge), second_edges))
+        if not parts:
+            empty = np.zeros(0, dtype='int64')
+            return empty, empty, empty, empty, empty
+        starts, microbes, ends, first_edges, second_edges = (np.concatenate(p) for p in zip(*parts))
+        if start_label == 'Disease':
+            return ends, microbes, starts, second_edges, first_edges
+        return starts, microbes, ends, first_edges, second_edges
+
+    # --- GraphQueries-shaped queries -----------------------------------------
+
+    def disease_food_relations(self, cui: str) -> List[Dict]:
+        """Rows of the disease_food_relations query (raw strengths, scored by GraphQueries)."""
+        a = self.arrays
+        foods, microbes, _, fm, md = self._food_microbe_disease(a, 'Disease', cui)
+        s1, s2 = a.strength['strength_raw'][fm], a.strength['strength_raw'][md]
+        return [{
+            'food_name': a.official_name[f],
+            'microbe_name': a.name[m],
+            'food_microbe_strength': _value(x1),
+            'microbe_disease_strength': _value(x2),
+        } for f, m, x1, x2 in zip(foods, microbes, s1, s2)]
+
+    def food_disease_relations(self, cui: str) -> List[Dict]:
+        """Rows of the food_disease_relations query (raw strengths, scored by GraphQueries)."""
+        a = self.arrays
+        foods, microbes, diseases, fm, md = self._food_microbe_disease(a, 'Food', cui)
+        s1, s2 = a.strength['strength_raw'][fm], a.strength['strength_raw'][md]
+        return [{
+            'disease_name': a.official_name[d],
+            'microbe_name': a.name[m],
+            'food_name': a.official_name[f],
+            'food_microbe_strength': _value(x1),
+            'microbe_disease_strength': _value(x2),
+        } for f, m, d, x1, x2 in zip(foods, microbes, diseases, s1, s2)]
+
+    def _strength_neighbors(self, label: str, cui: str, other_label: str, sign: str):
+        a = self.arrays
+        rows = []
+        for node in self._nodes(a, label, cui):
+            neighbors, edge_ids = self._incident(a, node, STRENGTH, other_label)
+            strength = a.strength['strength_raw'][edge_ids]
+            keep = strength >= 0 if sign == 'positive' else strength < 0
+            rows.extend((node, int(n), float(s)) for n, s in zip(neighbors[keep], strength[keep]))
+        return a, rows
+
+    def microbe_relations(self, cui: str, sign: str = 'positive') -> List[Dict]:
+        """Rows of GraphQueries.get_microbe_relations (sign 'positive' is strength_raw >= 0)."""
+        a, rows = self._strength_neighbors('Microbe', cui, 'Disease', sign)
+        return [{'microbe_name': a.name[m], 'disease_name': a.name[d], 'strength': s, 'cui': a.cui[d]}
+                for m, d, s in rows]
+
+    def disease_relations(self, cui: str, sign: str = 'positive') -> List[Dict]:
+        """Rows of GraphQueries.get_disease_relations."""
+        a, rows = self._strength_neighbors('Disease', cui, 'Microbe', sign)
+        return [{'disease_name': a.name[d], 'microbe_name': a.name[m], 'strength': s, 'cui': a.cui[m]}
+                for d, m, s in rows]
+
+    def food_relations(self, cui: str, sign: str = 'positive') -> List[Dict]:
+        """Rows of GraphQueries.get_food_relations."""
+        a, rows = self._strength_neighbors('Food', cui, 'Microbe', sign)
+        return [{'microbe_name': a.name[m], 'food_name': a.official_name[f], 'strength': s, 'cui': a.cui[f]}
+                for f, m, s in rows]
+
+    def _edge_row(self, a: _Arrays, edge: int, name_field: str, as_text: bool) -> Dict:
+        names = a.official_name if name_field == 'official_name' else a.name
+        source, target = int(a.edge_source[edge]), int(a.edge_target[edge])
+        if a.edge_type[edge] == PARENT:
+            relation = 'PARENT'
+        else:
+            x = a.strength['strength_raw'][edge]
+            relation = _relation_text(x) if as_text else _value(x)
+        return {
+            'source': names[source],
+            'source_type': a.labels[a.node_label[source]],
+            'relation': relation,
+            'target': names[target],
+            'target_type': a.labels[a.node_label[target]],
+        }
+
+    def neighbourhood(self, label: str, cui: str, hops: int = 1, limit: int = 50) -> List[Dict]:
+        """Rows of the find_one_hop_* queries: the relationships of the first `limit` paths.
+
+        hops=1 matches find_one_hop_microbe/disease (node names, numeric relation);
+        hops=2 matches find_one_hop_food/disease_food (official names, relation as text).
+        """
+        a = self.arrays
+        name_field, as_text = ('official_name', True) if hops == 2 else ('name', False)
+        paths: List[Tuple[int, ...]] = []
+
+        def expand(node: int, path: Tuple[int, ...]):
+            neighbors, edge_ids = self._incident(a, node)
+            for neighbor, edge in zip(neighbors, edge_ids):
+                if len(paths) >= limit:
+                    return
+                if edge in path:
+                    continue
+                paths.append(path + (int(edge),))
+                if len(path) + 1 < hops:
+                    expand(int(neighbor), path + (int(edge),))
+
+        for node in self._nodes(a, label, cui):
+            expand(node, ())
+        return [self._edge_row(a, edge, name_field, as_text) for path in paths for edge in path]
+
+
+_snapshot: Optional[GraphSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_graph_snapshot() -> GraphSnapshot:
+    """Return the process-wide snapshot, loading it on first use."""
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = GraphSnapshot().refresh()
+    return _snapshot
+
+
+if __name__ == "__main__":
+    snapshot = get_graph_snapshot()
+    print(snapshot.stats())
+    diseases = [cui for (label, cui) in snapshot.arrays.by_cui if label == 'Disease'][:20]
+    t0 = time.perf_counter()
+    rows = sum(len(snapshot.disease_food_relations(cui)) for cui in diseases)
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"disease_food_relations: {len(diseases)} diseases, {rows} rows, {ms / max(1, len(diseases)):.3f} ms/query")
@@ -0,0 +1,301 @@
+"""Overview statistics of the knowledge graph, computed in one round trip and served from memory.
+
+The dashboard numbers (node counts per label, distinct papers, POSITIVE and
+NEGATIVE relationship counts, relationships and publications per year, the
+most referenced papers, papers per journal) used to cost one or two Bolt
+round trips each. Each of those rescanned every POSITIVE/NEGATIVE
+relationship. GraphStats runs 'graph_node_counts' and 'graph_statistics'
+once: node counts plus the relationships grouped by (type, year, paper,
+journal, start and end entity), one row per group. Every number is then
+derived from that in memory; only the titles of the most referenced papers
+are looked up ('paper_titles'), and kept until the next refresh.
+
+The same pass also builds the per-entity publication rollup: the distinct
+(entity, year, journal, rel_type, pmid) rows with their relationship counts,
+indexed by entity. Distinct-paper counts do not add up across years or
+journals, so the rollup keeps the papers of each (entity, year, journal,
+rel_type) key rather than a bare count; publication_slice counts them for any
+entity/year/journal/type slice, and popularity_in_time is the per-year slice
+of one entity.
+
+The result is stamped with the graph version (node and relationship totals
+plus the change counter that writers bump, see query_registry.graph_version).
+A daemon thread checks it every check_interval seconds and recomputes when it
+changed, so only the first call waits for the graph; refresh() recomputes at
+once.
+
+Usage (from ``src/``):
+    python graph_stats.py
+"""
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from metrics import log_csv, now_iso
+from query_registry import LABELS, get_query, graph_version
+
+GROUP_COLUMNS = ['rel', 'year', 'pmid', 'journal', 'microbe_disease',
+                 'start_label', 'start_cui', 'end_label', 'end_cui', 'edges']
+# Dimensions of the publication rollup; label and cui identify the entity
+ROLLUP_KEYS = ['label', 'cui', 'year', 'journal', 'rel']
+
+
+class GraphStats:
+    """Version-stamped in-memory overview statistics.
+
+    Args:
+        db: Graph backend (get_graph_backend() by default)
+        check_interval: Seconds between background graph version checks
+    """
+
+    def __init__(self, db=None, check_interval: float = 60.0):
+        self.db = db
+        self.check_interval = check_interval
+        self.version: Optional[str] = None
+        self.built_at: Optional[str] = None
+        self._nodes: Dict[str, int] = {}
+        self._groups = pd.DataFrame(columns=GROUP_COLUMNS)
+        self._rollup = _build_rollup(self._groups)
+        self._titles: Dict = {}
+        self._watcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _graph(self):
+        if self.db is None:
+            from graph_backend import get_graph_backend
+            self.db = get_graph_backend()
+        return self.db
+
+    def _graph_version(self) -> str:
+        return graph_version(self._graph())
+
+    def refresh(self) -> "GraphStats":
+        """Recompute every statistic from the node counts and the grouped relationships."""
+        with self._lock:
+            t0 = time.perf_counter()
+            version = self._graph_version()
+            row = self._graph().run(get_query('graph_node_counts').cypher)[0]
+            rows = self._graph().run(get_query('graph_statistics').cypher)
+            # object columns keep integer years/PMIDs next to nulls as Cypher returns them
+            groups = pd.DataFrame({column: pd.Series([g.get(column) for g in rows], dtype=object)
+                                   for column in GROUP_COLUMNS})
+            groups['edges'] = groups['edges'].astype('int64')
+            rollup = _build_rollup(groups)
+            # Built first and swapped in together, since readers do not take the lock
+            self._nodes = {'Microbe': row['microbes'], 'Disease': row['diseases'], 'Food': row['foods']}
+            self._groups, self._rollup, self._titles = groups, rollup, {}
+            self.version = version
+            self.built_at = now_iso()
+
+            ms = (time.perf_counter() - t0) * 1000
+            print(f"[METRIC] graph_stats_ms={ms:.2f} version={version} groups={len(self._groups)} "
+                  f"rollup_rows={len(self._rollup)}")
+            log_csv({
+                "ts": now_iso(),
+                "metric": "graph_stats",
+                "ms": round(ms, 2),
+                "rows": len(self._groups),
+            })
+        return self
+
+    def ensure_fresh(self) -> "GraphStats":
+        """Compute on first use; later changes are picked up by the background version check."""
+        if self.version is None:
+            self.refresh()
+        if self._watcher is None:
+            with self._lock:
+                if self._watcher is None:
+                    self._watcher = threading.Thread(target=self._watch_version, name='graph-stats-version',
+                                                     daemon=True)
+                    self._watcher.start()
+        return self
+
+    def _watch_version(self):
+        while True:
+            time.sleep(self.check_interval)
+            self.refresh_if_changed()
+
+    def refresh_if_changed(self) -> bool:
+        """Recompute when the graph version changed.
+
+        When the graph is unreachable, statistics that were already computed keep being served.
+        """
+        try:
+            if self._graph_version() != self.version:
+                self.refresh()
+                return True
+        except Exception as e:
+            print(f"Could not check the graph version, serving statistics from {self.built_at}: {e}")
+        return False
+
+    # --- statistics --------------------------------------------------------------
+
+    def count_nodes(self, label: str = 'Microbe') -> int:
+        """Nodes of a label with at least one STRENGTH relationship."""
+        if label not in LABELS:
+            raise ValueError(f"label must be one of {LABELS}")
+        return int(self.ensure_fresh()._nodes[label])
+
+    def count_papers(self) -> int:
+        """Distinct PMIDs on Microbe->Disease POSITIVE/NEGATIVE relationships."""
+        groups = self.ensure_fresh()._groups
+        return int(groups.loc[groups['microbe_disease'].astype(bool), 'pmid'].dropna().nunique())
+
+    def count_relationships(self, rel_type: Optional[str] = None) -> int:
+        """POSITIVE plus NEGATIVE relationships, or only those of rel_type."""
+        groups = self.ensure_fresh()._groups
+        if rel_type is not None:
+            groups = groups[groups['rel'] == rel_type]
+        return int(groups['edges'].sum())
+
+    def relationships_by_year(self) -> List[Dict]:
+        return [{'publication_year': row['year'], 'relationship_count': row['relationships']}
+                for row in self.publication_slice(by=('year',))]
+
+    def publications_by_year(self) -> List[Dict]:
+        return [{'publication_year': row['year'], 'publications': row['publications']}
+                for row in self.publication_slice(by=('year',))]
+
+    def popularity_in_time(self, label: str = 'Microbe', cui: str = '') -> List[Dict]:
+        """Distinct papers per year on the POSITIVE/NEGATIVE relationships of one entity."""
+        return [{'publication_year': row['year'], 'publications': row['publications']}
+                for row in self.publication_slice(label, cui, by=('year',))]
+
+    def publication_slice(self, label: Optional[str] = None, cui: Optional[str] = None, years=None,
+                          journals=None, rel_type: Optional[str] = None, by=('year',)) -> List[Dict]:
+        """Distinct papers and relationships in an entity/year/journal/type slice, grouped by `by`.
+
+        Without a label the slice covers every POSITIVE/NEGATIVE relationship once.
+        With a label (and optionally a cui) it covers that label's (or entity's)
+        relationships, counted once per matching end.
+
+        Args:
+            label: Entity label (Microbe, Disease or Food)
+            cui: Entity CUI; needs a label
+            years: A year or a list of years (None keeps every year)
+            journals: A journal or a list of journals
+            rel_type: POSITIVE or NEGATIVE
+            by: Columns to group by, from label, cui, year, journal and rel ((), for one total row)
+
+        Returns:
+            list: {<by columns>, publications, relationships} rows ordered by the by columns, nulls last
+        """
+        by = list(by)
+        if label is not None and label not in LABELS:
+            raise ValueError(f"label must be one of {LABELS}")
+        if cui is not None and label is None:
+            raise ValueError("cui needs a label")
+        if label is None and {'label', 'cui'} & set(by):
+            raise ValueError("grouping by label or cui needs a label")
+        if not set(by) <= set(ROLLUP_KEYS):
+            raise ValueError(f"by must be columns of {ROLLUP_KEYS}")
+
+        self.ensure_fresh()
+        if label is None:
+            frame = self._groups
+        else:
+            # The rollup is sorted by entity, so one label or entity is a contiguous slice
+            key = (label,) if cui is None else (label, cui)
+            frame = self._rollup.loc[key:key].reset_index()
+        if years is not None:
+            frame = frame[frame['year'].isin(_as_list(years))]
+        if journals is not None:
+            frame = frame[frame['journal'].isin(_as_list(journals))]
+        if rel_type is not None:
+            frame = frame[frame['rel'] == rel_type]
+
+        if not by:
+            return [{'publications': int(frame['pmid'].nunique()), 'relationships': int(frame['edges'].sum())}]
+        counts = frame.groupby(by, dropna=False, sort=False).agg(
+            publications=('pmid', 'nunique'), relationships=('edges', 'sum')).reset_index()
+        counts = counts.sort_values(by, na_position='last', kind='stable')
+        return [{**{column: _value(row[column]) for column in by},
+                 'publications': int(row['publications']), 'relationships': int(row['relationships'])}
+                for row in counts.to_dict('records')]
+
+    def more_relevant_papers(self, n: int = 10) -> List[Dict]:
+        """Papers referenced by the most relationships; titles are looked up for these papers only."""
+        groups = self.ensure_fresh()._groups
+        counts = groups.groupby('pmid', dropna=False, sort=False)['edges'].sum().reset_index()
+        counts = counts.sort_values(['edges', 'pmid'], ascending=[False, True], na_position='last', kind='stable')
+        top = [(_value(pmid), int(count)) for pmid, count in zip(counts['pmid'], counts['edges'])][:n]
+        missing = [pmid for pmid, _ in top if pmid is not None and pmid not in self._titles]
+        if missing:
+            rows = self._graph().run(get_query('paper_titles').cypher, {'pmids': missing})
+            self._titles.update({pmid: None for pmid in missing})
+            self._titles.update({row['pmid']: row['title'] for row in rows})
+        return [{'Title': self._titles.get(pmid), 'PMID': pmid, 'Frequency': count} for pmid, count in top]
+
+    def publications_by_journal(self, n: int = 10) -> pd.DataFrame:
+        """Distinct Microbe->Disease papers per journal, as a 'counts' frame indexed by journal."""
+        groups = self.ensure_fresh()._groups
+        papers = groups[groups['microbe_disease'].astype(bool)].drop_duplicates('pmid', keep='first')
+        return papers['journal'].value_counts().sort_values(ascending=False).iloc[:n].to_frame('counts')
+
+    def summary(self) -> Dict:
+        return {
+            'version': self.ensure_fresh().version,
+            'built_at': self.built_at,
+            'nodes': dict(self._nodes),
+            'papers': self.count_papers(),
+            'relationships': {rel: self.count_relationships(rel) for rel in ('POSITIVE', 'NEGATIVE')},
+        }
+
+
+def _build_rollup(groups: pd.DataFrame) -> pd.DataFrame:
+    """Distinct (entity, year, journal, rel, pmid) rows with their relationship counts, indexed by entity."""
+    columns = ['year', 'journal', 'rel', 'pmid', 'edges']
+    ends = [groups[[f'{side}_label', f'{side}_cui'] + columns].set_axis(['label', 'cui'] + columns, axis=1)
+            for side in ('start', 'end')]
+    facts = pd.concat(ends, ignore_index=True)
+    facts = facts[facts['label'].notna() & facts['cui'].notna()]
+    # transform + drop_duplicates rather than a grouped sum keeps integer years/PMIDs next to nulls
+    keys = ROLLUP_KEYS + ['pmid']
+    facts = facts.assign(edges=facts.groupby(keys, dropna=False, sort=False)['edges'].transform('sum'))
+    facts = facts.drop_duplicates(keys)
+    return facts.set_index(['label', 'cui']).sort_index()
+
+
+def _as_list(values) -> list:
+    return list(values) if isinstance(values, (list, tuple, set)) else [values]
+
+
+def _value(value):
+    """NaN (a missing year/PMID after pandas grouping) back to None.
+
+    Grouping also widens integer keys that sit next to nulls to floats; those go back to int.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+_stats: Optional[GraphStats] = None
+_stats_lock = threading.Lock()
+
+
+def get_graph_stats() -> GraphStats:
+    """Return the process-wide statistics (computed on first use)."""
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = GraphStats()
+    return _stats
+
+
+if __name__ == "__main__":
+    stats = get_graph_stats()
+    t0 = time.perf_counter()
+    stats.refresh()
+    print(f"refresh: {(time.perf_counter() - t0) * 1000:.1f} ms")
+    t0 = time.perf_counter()
+    summary = stats.summary()
+    stats.relationships_by_year()
+    stats.publications_by_year()
+    stats.more_relevant_papers()
+    print(f"all statistics from memory: {(time.perf_counter() - t0) * 1000:.2f} ms")
+    print(json.dumps(summary, indent=2, default=str))
@@ -0,0 +1,103 @@
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from metrics import log_csv, now_iso
+
+
+@dataclass
+class IngestionJob:
+    """Progress of one uploaded paper through the background ingestion worker."""
+    job_id: str
+    filename: str
+    path: str
+    status: str = 'queued'          # queued, extracting, chunking, embedding, indexing, done, failed
+    progress: float = 0.0
+    chunks_added: int = 0
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+
+class PaperIngestionWorker:
+    """Single background thread that ingests uploaded papers into a live MINERVA index.
+
+    Uploads are written to the papers directory (so a later full reload picks
+    them up too) and queued; a paper that fails to ingest is removed from it again. The worker extracts, chunks and embeds each paper
+    and appends it with MINERVA.ingest_paper, which swaps the new index in
+    atomically; queries are served from the current index meanwhile.
+    """
+
+    def __init__(self, minerva, papers_dir: str):
+        self.minerva = minerva
+        self.papers_dir = papers_dir
+        self.jobs: Dict[str, IngestionJob] = {}
+        self._queue: "queue.Queue[IngestionJob]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='paper-ingestion', daemon=True)
+        self._thread.start()
+
+    def submit(self, filename: str, data: bytes) -> IngestionJob:
+        """Save an uploaded paper and queue it for ingestion."""
+        filename = os.path.basename(filename)
+        os.makedirs(self.papers_dir, exist_ok=True)
+        path = os.path.join(self.papers_dir, filename)
+        if os.path.exists(path):
+            raise ValueError(f"A paper named {filename} already exists")
+        # Write under a temporary name so a concurrent full reload never sees a partial file
+        tmp_path = os.path.join(self.papers_dir, f".{filename}.{uuid.uuid4().hex}.part")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        job = IngestionJob(job_id=uuid.uuid4().hex[:8], filename=filename, path=path)
+        with self._lock:
+            self.jobs[job.job_id] = job
+        self._queue.put(job)
+        return job
+
+    def list_jobs(self) -> List[IngestionJob]:
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def _update(self, job: IngestionJob, stage: str, fraction: float):
+        job.status = stage
+        job.progress = fraction
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            t0 = time.perf_counter()
+            try:
+                job.chunks_added = self.minerva.ingest_paper(
+                    job.path, progress_callback=lambda stage, fraction: self._update(job, stage, fraction)
+                )
+                job.status, job.progress = 'done', 1.0
+            except Exception as e:
+                job.status, job.error = 'failed', str(e)
+                print(f"Failed to ingest {job.filename}: {e}")
+                # Nothing of it reached the index; remove it so the paper can be submitted again
+                try:
+                    os.remove(job.path)
+                except OSError:
+                    pass
+            finally:
+                job.finished_at = time.time()
+                ms = (time.perf_counter() - t0) * 1000
+                print(f"[METRIC] paper_ingest_ms={ms:.2f} file={job.filename} status={job.status}")
+                log_csv({
+                    "ts": now_iso(),
+                    "metric": "paper_ingest",
+                    "ms": round(ms, 2),
+                    "status": job.status,
+                    "chunks": job.chunks_added,
+                })
+                self._queue.task_done()
@@ -1,13 +1,15 @@
-from py2neo import Graph, Node, Relationship
+import asyncio
 import os
 from dotenv import load_dotenv
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import json
 import openai
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_community.chat_models import ChatOpenAI
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
@@ -15,15 +17,31 @@ from PyPDF2 import PdfReader
 import fitz  # Import PyMuPDF
 import json
 import numpy as np
-from metrics import PerformanceMonitor
+from neo4j import Query
+from metrics import PerformanceMonitor, span
+from entity_index import EntityChunkIndex
+from embeddings import get_embedding_backend
+from shared_index import SharedPaperIndex, publish_index, publish_lock
+from graph_backend import get_async_graph_backend, get_graph_backend
+from query_registry import get_query
+from query_cache import get_query_cache
+from entity_resolver import get_entity_resolver
+from strength_scoring import score_paths
+from datetime import datetime
+
+# Shared by every MINERVA instance; combined_query runs its graph and paper branches here
+_combined_executor = ThreadPoolExecutor(max_workers=int(os.getenv('COMBINED_QUERY_WORKERS', '8')),
+                                        thread_name_prefix='minerva-combined')
 
 class MINERVA:
-    def __init__(self, enable_perf_monitoring: bool = True, perf_monitor=None):
+    def __init__(self, enable_perf_monitoring: bool = True, perf_monitor=None, embedding_backend: str = None):
         """Initialize Neo4j connection and research paper processing
         
         Args:
             enable_perf_monitoring: Whether to enable performance monitoring
             perf_monitor: Optional external PerformanceMonitor instance
+            embedding_backend: Embedding backend name ('openai', 'hashing', 'local_model');
+                defaults to the EMBEDDING_BACKEND environment variable
         """
         load_dotenv()
         
@@ -32,29 +50,39 @@ class MINERVA:
         if self.enable_perf_monitoring:
             self.perf_monitor = perf_monitor if perf_monitor else PerformanceMonitor()
         
-        # Neo4j connection settings
-        neo4j_host = os.getenv('NEO4J_HOST', 'localhost')
-        neo4j_port = os.getenv('NEO4J_PORT', '7687')
-        neo4j_user = os.getenv('NEO4J_USER', 'neo4j')
-        neo4j_password = os.getenv('NEO4J_PASSWORD', 'synhodo123')
-        
-        # Initialize Neo4j connection
-        self.graph = Graph(
-            f"bolt://{neo4j_host}:{neo4j_port}",
-            auth=(neo4j_user, neo4j_password)
-        )
+        # Shared graph backend: pooled Neo4j connection, or the embedded graph when GRAPH_BACKEND=embedded
+        self.db = get_graph_backend()
+        self.query_cache = get_query_cache()
         
         # Initialize research paper processing
-        self.embeddings = OpenAIEmbeddings()
+        self.embeddings = get_embedding_backend(embedding_backend)
+        self.chunk_size = int(os.getenv('CHUNK_SIZE', '1000'))
+        self.chunk_overlap = int(os.getenv('CHUNK_OVERLAP', '200'))
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap
         )
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
+        # Created on first use (query_papers), so indexing and graph queries need no OpenAI key
+        self._llm = None
         
         # Initialize vector store
         self.vector_store = None
         
+        # Chunk texts (aligned with the vector store ids) and their source files
+        self.chunks = []
+        self.chunk_sources = []
+        self.entity_index = None
+        self.index_manifest = None
+        self.shared_index = None
+        self._ingest_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        
+    @property
+    def llm(self) -> ChatOpenAI:
+        if self._llm is None:
+            self._llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
+        return self._llm
+
     def load_research_papers(self, directory_path: str) -> str:
         """Load and process research papers from a directory."""
         try:
@@ -72,63 +100,27 @@ class MINERVA:
                 
             print(f"Processing files in {papers_dir}")
             documents = []
+            sources = []
             
             for filename in files:
                 filepath = os.path.join(papers_dir, filename)
                 if os.path.isfile(filepath):
-                    try:
-                        # Try PyPDF2 first
-                        try:
-                            reader = PdfReader(filepath)
-                            text = ""
-                            for page in reader.pages:
-                                text += page.extract_text()
-                            if text:
-                                chunks = self.text_splitter.split_text(text)
-                                documents.extend(chunks)
-                                print(f"Successfully processed {filename} with PyPDF2")
-                                continue
-                        except Exception:
-                            pass
-                            
-                        # Try PyMuPDF if PyPDF2 fails
-                        try:
-                            doc = fitz.open(filepath)
-                            text = ""
-                            for page_num in range(len(doc)):
-                                page = doc.load_page(page_num)
-                                text += page.get_text()
-                            if text:
-                                chunks = self.text_splitter.split_text(text)
-                                documents.extend(chunks)
-                                print(f"Successfully processed {filename} with PyMuPDF")
-                                continue
-                        except Exception:
-                            pass
-                            
-                        # Try reading as text file if PDF processing fails
-                        try:
-                            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                                text = f.read()
-                            if text:
-                                chunks = self.text_splitter.split_text(text)
-                                documents.extend(chunks)
-                                print(f"Successfully processed text file: {filename}")
-                        except Exception as e:
-                            print(f"Failed to process {filename}: {str(e)}")
-                            continue
-                    except Exception as e:
-                        print(f"Failed to process {filename}: {str(e)}")
-                        continue
+                    text = self.extract_text(filepath)
+                    if text:
+                        chunks = self.text_splitter.split_text(text)
+                        documents.extend(chunks)
+                        sources.extend([filename] * len(chunks))
             
             if not documents:
                 raise ValueError(f"No readable text files found in directory {papers_dir}")
                 
             # Create FAISS index
-            self.vector_store = FAISS.from_texts(
+            vector_store = FAISS.from_texts(
                 documents,
-                self.embeddings
+                self.embeddings,
+                metadatas=[{'source': source} for source in sources]
             )
+            self._swap_index(vector_store, documents, sources, self._entity_index_for(documents))
             
             print(f"Successfully loaded {len(documents)} text chunks from research papers")
             return f"Successfully loaded {len(documents)} text chunks from research papers"
@@ -137,22 +129,293 @@ class MINERVA:
             print(f"Error loading research papers: {e}")
             raise
     
+    def extract_text(self, filepath: str) -> str:
+        """Extract text from a paper, trying PyPDF2, then PyMuPDF, then plain text."""
+        filename = os.path.basename(filepath)
+        try:
+            # Try PyPDF2 first
+            try:
+                reader = PdfReader(filepath)
+                text = ""
+                for page in reader.pages:
+                    text += page.extract_text()
+                if text:
+                    print(f"Successfully processed {filename} with PyPDF2")
+                    return text
+            except Exception:
+                pass
+                
+            # Try PyMuPDF if PyPDF2 fails
+            try:
+                doc = fitz.open(filepath)
+                text = ""
+                for page_num in range(len(doc)):
+                    page = doc.load_page(page_num)
+                    text += page.get_text()
+                if text:
+                    print(f"Successfully processed {filename} with PyMuPDF")
+                    return text
+            except Exception:
+                pass
+                
+            # Try reading as text file if PDF processing fails
+            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+                text = f.read()
+            if text:
+                print(f"Successfully processed text file: {filename}")
+            return text
+        except Exception as e:
+            print(f"Failed to process {filename}: {str(e)}")
+            return ""
+
+    def ingest_paper(self, filepath: str, progress_callback: Optional[Callable[[str, float], None]] = None,
+                     batch_size: int = 32) -> int:
+        """Extract, chunk and embed one paper and append it to the live index.
+        
+        The new index is built next to the current one, reusing the stored
+        vectors of the existing chunks, and swapped in atomically at the end.
+        Queries keep being answered from the current index until then.
+        
+        Args:
+            filepath: Path to the paper (PDF or text)
+            progress_callback: Optional callable receiving (stage, fraction done)
+            batch_size: Number of chunks embedded per request
+            
+        Returns:
+            int: Number of chunks added
+        """
+        report = progress_callback or (lambda stage, fraction: None)
+        filename = os.path.basename(filepath)
+        
+        report('extracting', 0.0)
+        text = self.extract_text(filepath)
+        if not text:
+            raise ValueError(f"No readable text found in {filename}")
+        
+        report('chunking', 0.05)
+        new_chunks = self.text_splitter.split_text(text)
+        
+        new_vectors = []
+        for start in range(0, len(new_chunks), batch_size):
+            new_vectors.extend(self.embeddings.embed_documents(new_chunks[start:start + batch_size]))
+            report('embedding', 0.1 + 0.8 * min(start + batch_size, len(new_chunks)) / len(new_chunks))
+        
+        report('indexing', 0.9)
+        new_vectors = np.asarray(new_vectors, dtype='float32')
+        with self._ingest_lock:
+            if self.shared_index is not None:
+                # Another worker may have published since we attached: append to the
+                # current version, under the cross-process lock, so no upload is lost.
+                # Other workers pick the new version up on their next query.
+                with publish_lock(self.shared_index.root):
+                    self._sync_shared_index(reattach=True)
+                    chunks = list(self.chunks) + new_chunks
+                    sources = list(self.chunk_sources) + [filename] * len(new_chunks)
+                    self.index_manifest = self._build_manifest(chunks, sources)
+                    publish_index(self.shared_index.root, self._with_stored_vectors(new_vectors),
+                                  chunks, sources, self.index_manifest, lock=False)
+                    self._sync_shared_index(reattach=True)
+                report('done', 1.0)
+                print(f"Ingested {filename}: {len(new_chunks)} chunks, index now holds {len(chunks)}")
+                return len(new_chunks)
+            chunks = list(self.chunks) + new_chunks
+            sources = list(self.chunk_sources) + [filename] * len(new_chunks)
+            vector_store = FAISS.from_embeddings(
+                list(zip(chunks, self._with_stored_vectors(new_vectors))),
+                self.embeddings,
+                metadatas=[{'source': source} for source in sources]
+            )
+            if self.entity_index is not None:
+                entity_index = self.entity_index.extended(new_chunks)
+            else:
+                entity_index = self._entity_index_for(chunks)
+            self._swap_index(vector_store, chunks, sources, entity_index)
+        
+        report('done', 1.0)
+        print(f"Ingested {filename}: {len(new_chunks)} chunks, index now holds {len(chunks)}")
+        return len(new_chunks)
+
+    def _stored_vectors(self) -> np.ndarray:
+        """Vectors of the chunks currently indexed, in chunk order."""
+        if self.shared_index is not None:
+            return np.asarray(self.shared_index.vectors)
+        if self.vector_store is not None:
+            return self.vector_store.index.reconstruct_n(0, self.vector_store.index.ntotal)
+        return np.empty((0, 0), dtype='float32')
+
+    def _with_stored_vectors(self, new_vectors: np.ndarray) -> np.ndarray:
+        """The stored vectors followed by new_vectors, as one float32 matrix."""
+        stored = self._stored_vectors()
+        if len(stored) == 0:
+            return new_vectors
+        return np.vstack([stored, new_vectors]).astype('float32', copy=False)
+
+    def attach_shared_index(self, root: Optional[str] = None) -> str:
+        """Serve paper queries from a published, memory-mapped index instead of a private copy.
+        
+        Args:
+            root: Shared index directory (default: SHARED_INDEX_DIR or /dev/shm)
+            
+        Returns:
+            str: The attached version
+        """
+        shared_index = SharedPaperIndex(root)
+        embedding = shared_index.manifest.get('index', {}).get('embedding')
+        if embedding != self.embeddings.describe():
+            raise ValueError(
+                f"Shared index was built with {embedding}, but this client uses {self.embeddings.describe()}"
+            )
+        self.shared_index = shared_index
+        self.vector_store = None
+        self._use_shared_views()
+        return shared_index.version
+
+    def _sync_shared_index(self, reattach: bool = False):
+        """Follow the shared index to its newest version."""
+        if reattach:
+            self.shared_index.attach()
+        elif not self.shared_index.maybe_refresh():
+            return
+        self._use_shared_views()
+
+    def _use_shared_views(self):
+        """Point the chunk lists at the mapped texts of the attached version."""
+        chunks = self.shared_index.chunks
+        entity_index = self._entity_index_for(chunks)
+        with self._swap_lock:
+            self.chunks = chunks
+            self.chunk_sources = self.shared_index.chunk_sources
+            self.index_manifest = self.shared_index.manifest.get('index')
+            self.entity_index = entity_index
+
+    def _swap_index(self, vector_store, chunks: List[str], sources: List[str], entity_index: EntityChunkIndex,
+                    manifest: Optional[Dict] = None):
+        """Publish a fully built index in one step.
+        
+        Readers hold references to the previous objects until they finish;
+        chunk lists only ever grow, so ids from the old entity index stay valid.
+        """
+        with self._swap_lock:
+            self.chunks = chunks
+            self.chunk_sources = sources
+            self.entity_index = entity_index
+            self.vector_store = vector_store
+            self.index_manifest = manifest or self._build_manifest()
+
+    def _build_manifest(self, chunks: Optional[List[str]] = None, sources: Optional[List[str]] = None) -> Dict:
+        """Describe the current index: embedding backend, chunking and contents."""
+        chunks = self.chunks if chunks is None else chunks
+        sources = self.chunk_sources if sources is None else sources
+        return {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'embedding': self.embeddings.describe(),
+            'chunk_size': self.chunk_size,
+            'chunk_overlap': self.chunk_overlap,
+            'num_chunks': len(chunks),
+            'papers': sorted(set(sources)),
+        }
+
+    def save_index(self, index_dir: str) -> str:
+        """Persist the FAISS index and its manifest to a directory."""
+        if not self.vector_store:
+            raise ValueError("No research papers loaded. Please call load_research_papers() first.")
+        os.makedirs(index_dir, exist_ok=True)
+        self.vector_store.save_local(index_dir)
+        with open(os.path.join(index_dir, 'manifest.json'), 'w') as f:
+            json.dump(self.index_manifest, f, indent=2)
+        return index_dir
+
+    def load_index(self, index_dir: str) -> Dict:
+        """Load an index saved with save_index().
+        
+        The manifest must name the same embedding backend this client was
+        configured with, otherwise queries would be embedded into a different
+        vector space than the stored chunks.
+        """
+        with open(os.path.join(index_dir, 'manifest.json')) as f:
+            manifest = json.load(f)
+        if manifest.get('embedding') != self.embeddings.describe():
+            raise ValueError(
+                f"Index at {index_dir} was built with {manifest.get('embedding')}, "
+                f"but this client uses {self.embeddings.describe()}"
+            )
+        vector_store = FAISS.load_local(
+            index_dir, self.embeddings, allow_dangerous_deserialization=True
+        )
+        docs = [
+            vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+            for i in range(len(vector_store.index_to_docstore_id))
+        ]
+        chunks = [doc.page_content for doc in docs]
+        sources = [doc.metadata.get('source') for doc in docs]
+        self._swap_index(vector_store, chunks, sources, self._entity_index_for(chunks), manifest)
+        return manifest
+
+    def _entity_index_for(self, chunks: List[str]) -> EntityChunkIndex:
+        """Link Microbe/Food/Disease names and synonyms from the graph to the given chunks.
+        
+        Runs at ingest time so later entity lookups are dictionary hits. If the
+        graph is unreachable the index is left empty and paper queries still work.
+        """
+        index = EntityChunkIndex()
+        try:
+            terms = self.query_named('entity_terms')
+            index.add_entities_from_records(terms.to_dict('records'))
+        except Exception as e:
+            print(f"Could not load entity terms for the chunk index: {e}")
+        index.build(chunks)
+        print(f"Entity chunk index: {index.stats()}")
+        return index
+
+    def build_entity_index(self) -> EntityChunkIndex:
+        """Rebuild the entity index for the loaded chunks, e.g. after the graph changed."""
+        self.entity_index = self._entity_index_for(self.chunks)
+        return self.entity_index
+
+    def passages_about(self, entity: str, label: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Return the paper passages that mention a graph entity.
+        
+        Args:
+            entity: CUI, name or synonym of a Microbe, Food or Disease
+            label: Optional node label to restrict name matches to
+            limit: Optional maximum number of passages
+            
+        Returns:
+            list: dicts with 'chunk_id', 'source' and 'text' keys, in paper order
+        """
+        if self.entity_index is None:
+            raise ValueError("No research papers loaded. Please call load_research_papers() first.")
+        chunk_ids = self.entity_index.lookup(entity, label)
+        if limit is not None:
+            chunk_ids = chunk_ids[:limit]
+        return [
+            {'chunk_id': i, 'source': self.chunk_sources[i], 'text': self.chunks[i]}
+            for i in chunk_ids
+        ]
+
     def query_papers(self, question: str) -> str:
         """Query research papers using semantic search."""
-        if not self.vector_store:
+        # Hold on to the current index; a background ingest may swap in a new one
+        vector_store = self.vector_store
+        if not vector_store and self.shared_index is None:
             raise ValueError("No research papers loaded. Please call load_research_papers() first.")
             
         # Get embeddings for query
         query_embedding = self.embeddings.embed_query(question)
         
-        # Get similar documents
-        docs = self.vector_store.similarity_search_by_vector(
-            query_embedding,
-            k=3  # Number of similar documents to retrieve
-        )
+        # Get similar documents (3 most similar chunks)
+        if self.shared_index is not None:
+            self._sync_shared_index()
+            texts = [text for _, _, text in self.shared_index.search(query_embedding, k=3)]
+        else:
+            docs = vector_store.similarity_search_by_vector(
+                query_embedding,
+                k=3  # Number of similar documents to retrieve
+            )
+            texts = [doc.page_content for doc in docs]
         
         # Format the documents for the LLM
-        context = "\n\n".join([doc.page_content for doc in docs])
+        context = "\n\n".join(texts)
         
         # Create prompt template
         template = """Answer the following question based on the research papers:
@@ -169,40 +432,56 @@ class MINERVA:
         return response.content
 
     def query_neo4j(self, query: str, parameters: dict = None) -> pd.DataFrame:
-        """Query Neo4j and return results as DataFrame."""
+        """Query the graph and return results as DataFrame."""
         try:
-            result = self.graph.run(query, parameters).to_data_frame()
-            return result
+            if self.query_cache is None:
+                return self.db.run_df(query, parameters)
+            # Read-only results are reused across turns and users until they expire or the graph changes
+            return pd.DataFrame(self.query_cache.run(self.db, query, parameters))
         except Exception as e:
             print(f"Error querying Neo4j: {e}")
             raise
 
+    def query_named(self, name: str, *variant: str, **parameters) -> pd.DataFrame:
+        """Run a query registered in query_registry and return results as DataFrame."""
+        query = get_query(name, *variant)
+        return self.query_neo4j(query.cypher, query.bind(**parameters))
+
+    async def aquery_neo4j(self, query: str, parameters: dict = None, timeout: float = None) -> pd.DataFrame:
+        """Awaitable query_neo4j on the running event loop's graph backend (for agent tools).
+
+        Args:
+            timeout: Optional server-side transaction timeout in seconds
+        """
+        try:
+            db = get_async_graph_backend()
+            statement = query if timeout is None else Query(query, timeout=timeout)
+            if self.query_cache is None:
+                return pd.DataFrame(await db.run(statement, parameters))
+            await asyncio.to_thread(self.query_cache.check_version)
+            rows = self.query_cache.get(query, parameters)
+            if rows is None:
+                rows = await db.run(statement, parameters)
+                self.query_cache.put(query, parameters, rows)
+            return pd.DataFrame(rows)
+        except Exception as e:
+            print(f"Error querying Neo4j: {e}")
+            raise
+
+    async def aquery_named(self, name: str, *variant: str, **parameters) -> pd.DataFrame:
+        """Awaitable query_named."""
+        query = get_query(name, *variant)
+        return await self.aquery_neo4j(query.cypher, query.bind(**parameters))
+
     def get_schema(self) -> tuple:
         """Get schema information from Neo4j."""
         try:
             # Get labels and relationships
-            labels_query = """
-            CALL db.labels()
-            YIELD label
-            RETURN DISTINCT label
-            ORDER BY label
-            """
-            labels = self.query_neo4j(labels_query)['label'].tolist()
-            
-            rels_query = """
-            CALL db.relationshipTypes()
-            YIELD relationshipType
-            RETURN DISTINCT relationshipType
-            ORDER BY relationshipType
-            """
-            rels = self.query_neo4j(rels_query)['relationshipType'].tolist()
+            labels = self.query_named('schema_labels')['label'].tolist()
+            rels = self.query_named('schema_relationship_types')['relationshipType'].tolist()
             
             # Get sample nodes for each label
-            samples_query = """
-            MATCH (n)
-            RETURN DISTINCT labels(n) AS label, COUNT(n) AS count
-            """
-            samples = self.query_neo4j(samples_query)
+            samples = self.query_named('schema_label_counts')
             
             return labels, rels, samples
             
@@ -213,98 +492,93 @@ class MINERVA:
     def get_sample_data(self, label: str, limit: int = 5) -> pd.DataFrame:
         """Get sample data for a specific label from Neo4j"""
         try:
-            query = f"""
-            MATCH (n:{label})
-            RETURN n
-            LIMIT {limit}
-            """
-            return self.query_neo4j(query)
+            return self.query_named('sample_nodes', label, limit=limit)
         except Exception as e:
             print(f"Error getting sample data: {e}")
             return pd.DataFrame()
 
     def get_all_diseases(self) -> pd.DataFrame:
         """Get all diseases with their CUIs"""
-        query = """
-        MATCH (d:Disease)
-        RETURN d.name as name, d.cui as cui
-        """
-        return self.query_neo4j(query)
+        return self.query_named('disease_names')
 
     def get_disease_food_relations(self, disease_cui: str) -> pd.DataFrame:
-        """Get food-disease relations through microbes"""
-        query = """
-        MATCH (f:Food)-[fm:STRENGTH]->(m:Microbe)-[md:STRENGTH]->(d:Disease)
-        WHERE d.cui = $disease_cui
-        RETURN 
-            f.name as food_name,
-            f.synonyms as food_synonyms,
-            m.name as microbe_name,
-            m.synonyms as microbe_synonyms,
-            d.name as disease_name,
-            fm.strength as food_microbe_strength,
-            md.strength as microbe_disease_strength,
-            CASE 
-                WHEN fm.strength > 0 AND md.strength > 0 THEN 'positive'
-                WHEN fm.strength < 0 AND md.strength < 0 THEN 'positive'
-                ELSE 'negative'
-            END as derived_relation
-        """
-        return self.query_neo4j(query, {"disease_cui": disease_cui})
+        """Get food-disease relations through microbes, scored by strength_scoring"""
+        return score_paths(self.query_named('disease_food_strength_paths', disease_cui=disease_cui))
+
+    def _parkinsons_cuis(self) -> Optional[List[str]]:
+        """CUIs of the diseases named Parkinson..., like d.name =~ '(?i)Parkinson.*' (None until the resolver is ready)."""
+        resolver = get_entity_resolver()
+        if resolver is None or not resolver.ready:
+            return None
+        return resolver.cuis('Parkinson', 'Disease', fields=('name',), whole_terms=True)
 
     def get_microbiome_info(self) -> pd.DataFrame:
         """
         Get information about microbiome-PD relationships
         """
-        query = """
-        MATCH (m:Microbe)-[r:STRENGTH]->(d:Disease)
-        WHERE d.name =~ '(?i)Parkinson.*'
-        RETURN m.name as microbe_name,
-               m.synonyms as microbe_synonyms,
-               r.strength as strength,
-               d.name as disease_name
-        ORDER BY strength DESC
-        LIMIT 10
-        """
-        result = self.query_neo4j(query)
+        cuis = self._parkinsons_cuis()
+        if cuis is None:
+            result = self.query_named('parkinsons_microbiome')
+        else:
+            result = self.query_named('disease_microbiome', cuis=cuis) if cuis else pd.DataFrame()
         return result if not result.empty else pd.DataFrame()
 
     def get_risk_factors(self) -> pd.DataFrame:
         """Get risk factors for Parkinson's Disease"""
-        query = """
-        MATCH (f:RiskFactor)-[:ASSOCIATED_WITH]->(d:Disease)
-        WHERE d.name =~ '(?i)Parkinson.*'
-        RETURN f.name as risk_factor,
-               f.type as factor_type,
-               f.description as description
-        ORDER BY f.name
-        """
-        result = self.query_neo4j(query)
+        cuis = self._parkinsons_cuis()
+        if cuis is None:
+            result = self.query_named('parkinsons_risk_factors')
+        else:
+            result = self.query_named('disease_risk_factors', cuis=cuis) if cuis else pd.DataFrame()
         return result if not result.empty else pd.DataFrame()
 
-    def combined_query(self, neo4j_query: str, paper_query: str, parameters: dict = None) -> dict:
+    def combined_query(self, neo4j_query: str, paper_query: str, parameters: dict = None,
+                       neo4j_timeout: float = None, papers_timeout: float = None) -> dict:
         """
-        Execute both Neo4j and paper queries and combine results.
+        Execute the Neo4j and paper queries concurrently and combine results.
+        
+        The two halves are independent, so the latency is that of the slower one
+        instead of their sum. A branch that fails or exceeds its timeout leaves
+        None in its key and its error in 'errors'; the other branch is still returned.
+        A timed-out branch keeps running in its worker thread and its result is dropped.
         
         Args:
             neo4j_query: Cypher query for Neo4j database
             paper_query: Question to ask about research papers
             parameters: Optional parameters for Neo4j query
+            neo4j_timeout: Seconds to wait for the graph (COMBINED_NEO4J_TIMEOUT, default 15)
+            papers_timeout: Seconds to wait for the papers (COMBINED_PAPERS_TIMEOUT, default 60)
             
         Returns:
-            dict: Combined results with 'neo4j' and 'papers' keys
+            dict: Combined results with 'neo4j', 'papers' and 'errors' ({branch: message}) keys
         """
-        # Execute Neo4j query
-        neo4j_result = self.query_neo4j(neo4j_query, parameters)
-        
-        # Execute paper query
-        paper_result = self.query_papers(paper_query)
-        
-        # Combine results
-        combined_result = {
-            'neo4j': neo4j_result,
-            'papers': paper_result
+        timeouts = {
+            'neo4j': neo4j_timeout if neo4j_timeout is not None else float(os.getenv('COMBINED_NEO4J_TIMEOUT', '15')),
+            'papers': papers_timeout if papers_timeout is not None else float(os.getenv('COMBINED_PAPERS_TIMEOUT', '60')),
+        }
+        branches = {
+            'neo4j': (self.query_neo4j, neo4j_query, parameters),
+            'papers': (self.query_papers, paper_query),
         }
+
+        def run_branch(branch, fn, *args):
+            with span(f"combined_query_{branch}"):
+                return fn(*args)
+
+        combined_result = {'neo4j': None, 'papers': None, 'errors': {}}
+        with span("combined_query_total"):
+            t0 = time.monotonic()
+            futures = {branch: _combined_executor.submit(run_branch, branch, *call) for branch, call in branches.items()}
+            for branch, future in futures.items():
+                try:
+                    combined_result[branch] = future.result(timeout=max(0.0, timeouts[branch] - (time.monotonic() - t0)))
+                except FutureTimeoutError:
+                    combined_result['errors'][branch] = f"timed out after {timeouts[branch]:g} s"
+                except Exception as e:
+                    combined_result['errors'][branch] = f"{type(e).__name__}: {e}"
+                if branch in combined_result['errors']:
+                    print(f"combined_query: {branch} branch failed, returning partial results: "
+                          f"{combined_result['errors'][branch]}")
         
         return combined_result
 
@@ -0,0 +1,263 @@
+"""Process-wide Neo4j connection manager built on the official neo4j driver.
+
+MINERVA and both GraphQueries classes share one driver, and therefore one
+connection pool, per process. Each thread reuses its own session. A session
+that has been idle longer than NEO4J_LIVENESS_CHECK_S is checked with a
+cheap round trip before it is used, so stale connections are dropped before
+a real query runs rather than on every instantiation.
+
+Configuration (environment):
+    NEO4J_URI                 bolt://NEO4J_HOST:NEO4J_PORT when unset
+    NEO4J_USER / NEO4J_PASSWORD
+    NEO4J_DATABASE            default database of the server when unset
+    NEO4J_MAX_POOL_SIZE       maximum open connections (default 20)
+    NEO4J_ACQUIRE_TIMEOUT_S   wait for a free pooled connection (default 30)
+    NEO4J_LIVENESS_CHECK_S    idle time before a reused session is checked (default 30)
+
+Coroutines use AsyncNeo4jConnectionManager (get_async_connection_manager),
+which has the same settings on the neo4j AsyncDriver. An async driver
+belongs to the event loop it was created on, so there is one manager per
+running loop rather than per process.
+"""
+import asyncio
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+from neo4j import AsyncGraphDatabase, GraphDatabase, Query
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
+
+
+def _default_uri() -> str:
+    uri = os.getenv('NEO4J_URI')
+    if uri:
+        return uri
+    return f"bolt://{os.getenv('NEO4J_HOST', 'localhost')}:{os.getenv('NEO4J_PORT', '7687')}"
+
+
+def _driver_settings(uri, user, password, max_pool_size, acquire_timeout) -> Dict:
+    return dict(
+        uri=uri or _default_uri(),
+        auth=(user or os.getenv('NEO4J_USER', 'neo4j'), password or os.getenv('NEO4J_PASSWORD', 'synhodo123')),
+        max_connection_pool_size=max_pool_size or int(os.getenv('NEO4J_MAX_POOL_SIZE', '20')),
+        connection_acquisition_timeout=acquire_timeout or float(os.getenv('NEO4J_ACQUIRE_TIMEOUT_S', '30')),
+        keep_alive=True,
+    )
+
+
+class Neo4jConnectionManager:
+    """Pooled driver plus per-thread session reuse.
+
+    Args:
+        uri: Bolt URI of the server
+        user: Neo4j user
+        password: Neo4j password
+        database: Database name (None for the server default)
+        max_pool_size: Maximum number of pooled connections
+        acquire_timeout: Seconds to wait for a free connection
+        liveness_check_interval: Idle seconds after which a session is checked before reuse
+    """
+
+    def __init__(self, uri: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None,
+                 database: Optional[str] = None, max_pool_size: Optional[int] = None,
+                 acquire_timeout: Optional[float] = None, liveness_check_interval: Optional[float] = None):
+        settings = _driver_settings(uri, user, password, max_pool_size, acquire_timeout)
+        self.uri = settings['uri']
+        self.database = database or os.getenv('NEO4J_DATABASE') or None
+        self.max_pool_size = settings['max_connection_pool_size']
+        self.liveness_check_interval = (liveness_check_interval if liveness_check_interval is not None
+                                        else float(os.getenv('NEO4J_LIVENESS_CHECK_S', '30')))
+
+        # The driver connects lazily; no round trip happens until the first query
+        self.driver = GraphDatabase.driver(settings.pop('uri'), **settings)
+        self._local = threading.local()
+        self._available: Optional[bool] = None
+        self._available_checked = 0.0
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        last_used = getattr(self._local, 'last_used', 0.0)
+        if session is not None and time.monotonic() - last_used > self.liveness_check_interval:
+            try:
+                session.run("RETURN 1").consume()
+            except Exception:
+                self._discard_session()
+                session = None
+        if session is None:
+            session = self.driver.session(database=self.database)
+            self._local.session = session
+        return session
+
+    def _discard_session(self):
+        session = getattr(self._local, 'session', None)
+        self._local.session = None
+        if session is not None:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+    def run(self, query: str, parameters: Optional[Dict] = None, **kwparameters) -> List[Dict]:
+        """Run a query on this thread's session and return the rows as dictionaries.
+
+        A session whose connection was lost is replaced and the query retried once.
+        """
+        params = dict(parameters or {}, **kwparameters)
+        for attempt in range(2):
+            session = self._session()
+            try:
+                data = session.run(query, params).data()
+                self._local.last_used = time.monotonic()
+                return data
+            except (ServiceUnavailable, SessionExpired):
+                self._discard_session()
+                if attempt:
+                    raise
+            except Exception:
+                # Leave the session usable for the next query (it may hold a failed result)
+                self._discard_session()
+                raise
+
+    def stream(self, query: str, parameters: Optional[Dict] = None, fetch_size: int = 1000,
+               **kwparameters) -> Iterator[Dict]:
+        """Run a query and yield its rows as dictionaries while the server sends them, fetch_size at a time.
+
+        The rows are pulled on a session of their own, so this thread's session stays free
+        for other queries while they are consumed.
+        """
+        params = dict(parameters or {}, **kwparameters)
+        with self.driver.session(database=self.database, fetch_size=fetch_size) as session:
+            for record in session.run(query, params):
+                yield record.data()
+
+    def run_df(self, query: str, parameters: Optional[Dict] = None, **kwparameters) -> pd.DataFrame:
+        """Run a query and return the rows as a DataFrame."""
+        return pd.DataFrame(self.run(query, parameters, **kwparameters))
+
+    def explain(self, query: str, parameters: Optional[Dict] = None) -> Dict:
+        """Plan a query without running it (EXPLAIN) and return the plan tree.
+
+        Returns:
+            dict: Root operator with 'operatorType', 'identifiers', 'args' and 'children'
+        """
+        with self.driver.session(database=self.database) as session:
+            summary = session.run(f"EXPLAIN {query}", dict(parameters or {})).consume()
+        return summary.plan
+
+    def is_available(self, max_age: float = 10.0) -> bool:
+        """Whether the server answers, re-checked at most every max_age seconds."""
+        now = time.monotonic()
+        if self._available is None or now - self._available_checked > max_age:
+            try:
+                self.driver.verify_connectivity()
+                self._available = True
+            except Exception as e:
+                print(f"Neo4j at {self.uri} is not reachable: {e}")
+                self._available = False
+            self._available_checked = now
+        return self._available
+
+    def close(self):
+        self._discard_session()
+        self.driver.close()
+
+
+_manager: Optional[Neo4jConnectionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_connection_manager() -> Neo4jConnectionManager:
+    """Return the connection manager shared by the whole process."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = Neo4jConnectionManager()
+    return _manager
+
+
+class AsyncNeo4jConnectionManager:
+    """Pooled neo4j AsyncDriver for coroutines (async pages and agent tools).
+
+    Every run() opens a short-lived async session on a pooled connection, so
+    queries awaited together with asyncio.gather run concurrently, up to the
+    pool size, and a slow query does not block other coroutines on the loop.
+    Takes the same arguments as Neo4jConnectionManager, except the liveness
+    interval: a lost connection is replaced and the query retried once.
+    """
+
+    def __init__(self, uri: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None,
+                 database: Optional[str] = None, max_pool_size: Optional[int] = None,
+                 acquire_timeout: Optional[float] = None):
+        settings = _driver_settings(uri, user, password, max_pool_size, acquire_timeout)
+        self.uri = settings['uri']
+        self.database = database or os.getenv('NEO4J_DATABASE') or None
+        self.max_pool_size = settings['max_connection_pool_size']
+        self.driver = AsyncGraphDatabase.driver(settings.pop('uri'), **settings)
+        self._available: Optional[bool] = None
+        self._available_checked = 0.0
+
+    async def run(self, query: Union[str, Query], parameters: Optional[Dict] = None, **kwparameters) -> List[Dict]:
+        """Run a query and return the rows as dictionaries.
+
+        Pass a neo4j.Query to set a server-side transaction timeout.
+        """
+        params = dict(parameters or {}, **kwparameters)
+        for attempt in range(2):
+            try:
+                async with self.driver.session(database=self.database) as session:
+                    result = await session.run(query, params)
+                    return await result.data()
+            except (ServiceUnavailable, SessionExpired):
+                if attempt:
+                    raise
+
+    async def run_df(self, query: str, parameters: Optional[Dict] = None, **kwparameters) -> pd.DataFrame:
+        """Run a query and return the rows as a DataFrame."""
+        return pd.DataFrame(await self.run(query, parameters, **kwparameters))
+
+    async def explain(self, query: str, parameters: Optional[Dict] = None) -> Dict:
+        """Plan a query without running it (EXPLAIN) and return the plan tree."""
+        async with self.driver.session(database=self.database) as session:
+            result = await session.run(f"EXPLAIN {query}", dict(parameters or {}))
+            summary = await result.consume()
+        return summary.plan
+
+    async def is_available(self, max_age: float = 10.0) -> bool:
+        """Whether the server answers, re-checked at most every max_age seconds."""
+        now = time.monotonic()
+        if self._available is None or now - self._available_checked > max_age:
+            try:
+                await self.driver.verify_connectivity()
+                self._available = True
+            except Exception as e:
+                print(f"Neo4j at {self.uri} is not reachable: {e}")
+                self._available = False
+            self._available_checked = now
+        return self._available
+
+    async def close(self):
+        await self.driver.close()
+
+
+_async_managers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncNeo4jConnectionManager]" = \
+    weakref.WeakKeyDictionary()
+
+
+def get_async_connection_manager() -> AsyncNeo4jConnectionManager:
+    """Return the async connection manager of the running event loop (call from a coroutine)."""
+    loop = asyncio.get_running_loop()
+    manager = _async_managers.get(loop)
+    if manager is None:
+        manager = _async_managers[loop] = AsyncNeo4jConnectionManager()
+    return manager
+
+
+async def close_async_connection_manager():
+    """Close the running loop's async driver, e.g. at the end of an asyncio.run() page render."""
+    manager = _async_managers.pop(asyncio.get_running_loop(), None)
+    if manager is not None:
+        await manager.close()
@@ -0,0 +1,221 @@
+"""Bounded, ranked disease-food path enumeration.
+
+get_relationship_paths used to ask for every ``[*1..3]`` path between a
+disease and a food and ``collect(DISTINCT nodes(p))`` them into one record.
+Around hub nodes that is an unbounded number of paths, each repeating the
+full properties of every node and relationship on it. PathEnumerator finds
+the same paths from both ends instead, with two bounded queries:
+
+  path_endpoint_neighbors  the disease and food nodes, each with its max_fanout
+                           strongest relationships (by abs(strength_raw))
+  path_links               the max_fanout strongest relationships from each disease-side
+                           neighbor into the food side's neighbors (the middle hop of
+                           3-hop paths; skipped when max_hops < 3)
+
+Paths of 1, 2 and 3 hops are joined from those in memory (simple paths only:
+no node repeats), scored with strength_scoring.score_chains and yielded
+lazily, strongest combined |strength| first, shorter paths first among
+equals, up to max_paths. Each path refers to its nodes and relationships by
+id; their labels, types and properties are stored once in a shared PathTable
+as paths are yielded.
+
+max_fanout bounds the work, so on dense neighborhoods paths through weaker
+relationships are left out by design; table.candidates counts the paths that
+were ranked.
+
+Configuration (environment):
+    PATH_ENUM_MAX_PATHS   paths yielded per disease-food pair (default 25)
+    PATH_ENUM_MAX_FANOUT  relationships kept per node (default 50)
+
+Usage (from ``src/``):
+    python path_enumerator.py --disease-cui C0040558 --food-name Garlic
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import log_csv, now_iso
+from query_registry import get_query
+from strength_scoring import NEGATIVE, POSITIVE, score_chains
+
+MAX_HOPS = 3  # the [*1..3] of the original query
+
+
+class PathTable:
+    """Nodes and relationships of the enumerated paths, each stored once by id."""
+
+    def __init__(self):
+        self.nodes: Dict[str, Dict] = {}
+        self.relationships: Dict[str, Dict] = {}
+        self.candidates = 0
+
+    def add_node(self, node_id: str, labels: List[str], properties: Dict):
+        if node_id not in self.nodes:
+            self.nodes[node_id] = {'labels': list(labels), 'properties': dict(properties or {})}
+
+    def add_relationship(self, rel: Dict):
+        if rel['id'] not in self.relationships:
+            self.relationships[rel['id']] = {'type': rel['type'], 'start': rel['start'], 'end': rel['end'],
+                                             'properties': dict(rel.get('properties') or {})}
+
+
+def _strength(rel: Dict) -> float:
+    value = (rel.get('properties') or {}).get('strength_raw')
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+
+class PathEnumerator:
+    """Streams the strongest disease-food paths within a path and fanout budget.
+
+    Args:
+        db: Graph backend (get_graph_backend() by default)
+        max_paths: Paths yielded per call (PATH_ENUM_MAX_PATHS, default 25)
+        max_fanout: Relationships kept per node (PATH_ENUM_MAX_FANOUT, default 50)
+        max_hops: Longest path, 1 to 3
+    """
+
+    def __init__(self, db=None, max_paths: Optional[int] = None, max_fanout: Optional[int] = None,
+                 max_hops: int = MAX_HOPS):
+        if not 1 <= max_hops <= MAX_HOPS:
+            raise ValueError(f"max_hops must be between 1 and {MAX_HOPS}, got {max_hops}")
+        self.db = db
+        self.max_paths = max_paths or int(os.getenv('PATH_ENUM_MAX_PATHS', '25'))
+        self.max_fanout = max_fanout or int(os.getenv('PATH_ENUM_MAX_FANOUT', '50'))
+        self.max_hops = max_hops
+
+    def _graph(self):
+        if self.db is None:
+            from graph_backend import get_graph_backend
+            self.db = get_graph_backend()
+        return self.db
+
+    def _run(self, name: str, **params) -> List[Dict]:
+        query = get_query(name)
+        return self._graph().run(query.cypher, query.bind(**params))
+
+    def candidates(self, disease_cui: str, food_name: str, table: PathTable) -> Tuple[List[tuple], Dict]:
+        """Every path within the fanout budget, unranked.
+
+        Returns:
+            tuple: (node ids, relationships) per path, and {node id: (labels, properties)}
+                of the endpoints' neighbors; the endpoints themselves go into the table
+        """
+        # Neighborhoods per endpoint: endpoint id -> other node id -> relationships to it
+        near = {'disease': {}, 'food': {}}
+        others = {}
+        for row in self._run('path_endpoint_neighbors', disease_cui=disease_cui, food_name=food_name,
+                             fanout=self.max_fanout):
+            table.add_node(row['id'], row['labels'], row['properties'])
+            by_other = near[row['side']].setdefault(row['id'], {})
+            for rel in row['rels']:
+                by_other.setdefault(rel['other'], []).append(rel)
+                others[rel['other']] = (rel['other_labels'], rel['other_properties'])
+        endpoints = set(near['disease']) | set(near['food'])
+
+        paths, seen = [], set()
+
+        def add(nodes, rels):
+            key = tuple(rel['id'] for rel in rels)
+            if key not in seen and len(set(nodes)) == len(nodes):
+                seen.add(key)
+                paths.append((nodes, rels))
+
+        for d, d_near in near['disease'].items():
+            for f, f_near in near['food'].items():
+                # 1 hop, from either side in case fanout dropped it on the other
+                for rel in d_near.get(f, []) + f_near.get(d, []):
+                    add((d, f), (rel,))
+                if self.max_hops < 2:
+                    continue
+                for middle in (d_near.keys() & f_near.keys()) - endpoints:
+                    for r1 in d_near[middle]:
+                        for r2 in f_near[middle]:
+                            add((d, middle, f), (r1, r2))
+
+        if self.max_hops >= 3:
+            left = sorted({m for d_near in near['disease'].values() for m in d_near} - endpoints)
+            right = sorted({m for f_near in near['food'].values() for m in f_near} - endpoints)
+            links = self._run('path_links', left=left, right=right, fanout=self.max_fanout) if left and right else []
+            for row in links:
+                a = row['id']
+                for link in row['rels']:
+                    b = link['other']
+                    for d, d_near in near['disease'].items():
+                        for f, f_near in near['food'].items():
+                            for r1 in d_near.get(a, []):
+                                for r3 in f_near.get(b, []):
+                                    add((d, a, b, f), (r1, link, r3))
+
+        return paths, others
+
+    def paths(self, disease_cui: str, food_name: str, table: Optional[PathTable] = None) -> Iterator[Dict]:
+        """Yield up to max_paths paths, strongest combined |strength| first.
+
+        Each path is {nodes, relationships, hops, strength, derived_relation};
+        nodes and relationships are ids into the table.
+
+        Args:
+            disease_cui: CUI of the Disease end
+            food_name: name of the Food end
+            table: Shared table to fill (a new one by default)
+        """
+        table = table if table is not None else PathTable()
+        t0 = time.perf_counter()
+        candidates, others = self.candidates(disease_cui, food_name, table)
+        table.candidates += len(candidates)
+
+        strengths = np.full((len(candidates), self.max_hops), np.nan)
+        for i, (_, rels) in enumerate(candidates):
+            strengths[i, :len(rels)] = [_strength(rel) for rel in rels]
+        scores = score_chains(strengths)
+        hops = np.array([len(rels) for _, rels in candidates], dtype='int64')
+        magnitude = np.abs(scores.strength)
+        # Strongest first, unscored (NaN) last, then fewer hops
+        order = np.lexsort((hops, -np.nan_to_num(magnitude, nan=-1.0)))[:self.max_paths]
+
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"[METRIC] path_enum_ms={ms:.2f} candidates={len(candidates)} yielded={len(order)}")
+        log_csv({
+            "ts": now_iso(),
+            "metric": "path_enum",
+            "ms": round(ms, 2),
+            "rows": len(candidates),
+        })
+
+        for i in order.tolist():
+            nodes, rels = candidates[i]
+            for node_id in nodes:
+                if node_id not in table.nodes:
+                    table.add_node(node_id, *others[node_id])
+            for rel in rels:
+                table.add_relationship(rel)
+            strength = scores.strength[i]
+            yield {
+                'nodes': list(nodes),
+                'relationships': [rel['id'] for rel in rels],
+                'hops': len(rels),
+                'strength': None if np.isnan(strength) else float(strength),
+                'derived_relation': POSITIVE if scores.positive[i] else NEGATIVE,
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strongest disease-food paths within a fanout budget")
+    parser.add_argument('--disease-cui', required=True)
+    parser.add_argument('--food-name', required=True)
+    parser.add_argument('--max-paths', type=int)
+    parser.add_argument('--max-fanout', type=int)
+    args = parser.parse_args()
+
+    table = PathTable()
+    enumerator = PathEnumerator(max_paths=args.max_paths, max_fanout=args.max_fanout)
+    for path in enumerator.paths(args.disease_cui, args.food_name, table):
+        names = [table.nodes[n]['properties'].get('name') for n in path['nodes']]
+        types = [table.relationships[r]['type'] for r in path['relationships']]
+        print(json.dumps({'strength': path['strength'], 'derived_relation': path['derived_relation'],
+                          'nodes': names, 'types': types}))
+    print(f"{len(table.nodes)} nodes, {len(table.relationships)} relationships, {table.candidates} candidate paths")
@@ -0,0 +1,311 @@
+"""In-process shortest paths between microbes and diseases.
+
+get_shortest_path_by_microbe_disease asks Neo4j for
+``shortestPath((m)-[*..15]-(d))``. Around hub nodes such as "Bacteria",
+which touch a large part of the graph, the server-side search fans out
+over most of the graph and can take seconds. PathService keeps an
+undirected CSR adjacency of every node and relationship, and answers the
+same query with a bidirectional BFS. Each step expands the side whose
+frontier has fewer incident edges, one whole level at a time, with NumPy.
+The search stops at the first level where the two sides meet, which gives
+a path of minimal length (one of them, when there are several, as with
+shortestPath).
+
+Optional landmarks, the highest-degree nodes, keep their BFS distance to
+every node. For any landmark L, |d(L, s) - d(L, t)| <= d(s, t). When that
+lower bound exceeds the hop limit, or a landmark reaches one endpoint but
+not the other, the answer is "no path" without any search.
+
+Rows have the shape the Cypher returns through Record.data():
+``[{'p': [node properties, relationship type, node properties, ...]}]``.
+
+Like the graph snapshot, the service does not follow graph changes on its
+own; call refresh() after the graph is updated.
+
+Usage (from ``src/``):
+    python path_service.py --microbe-cui C1008539 --disease-cui C0040558
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import log_csv, now_iso
+from query_registry import PROPERTY_KEYS, get_query
+
+MAX_HOPS = 15  # the hop limit of shortest_path_by_microbe_disease
+
+
+class _Graph:
+    """Immutable arrays of one loaded graph version."""
+
+    def __init__(self, nodes: List[Dict], edges: List[Dict]):
+        self.ids = [n['id'] for n in nodes]
+        self.props = [n.get('properties') or {} for n in nodes]
+        index = {node_id: i for i, node_id in enumerate(self.ids)}
+
+        # (label, property key) -> value -> node ids, for the endpoint lookups
+        self.by_property: Dict[Tuple[str, str], Dict[object, List[int]]] = {}
+        for i, n in enumerate(nodes):
+            for label in n.get('labels') or []:
+                for key in PROPERTY_KEYS.get(label, ()):
+                    value = self.props[i].get(key)
+                    if value is not None:
+                        self.by_property.setdefault((label, key), {}).setdefault(value, []).append(i)
+
+        edges = [e for e in edges if e['source'] in index and e['target'] in index]
+        self.types = sorted({e['type'] for e in edges})
+        type_code = {t: i for i, t in enumerate(self.types)}
+        source = np.array([index[e['source']] for e in edges], dtype='int32')
+        target = np.array([index[e['target']] for e in edges], dtype='int32')
+        self.edge_type = np.array([type_code[e['type']] for e in edges], dtype='int16')
+
+        # Undirected CSR: every relationship appears in the adjacency of both endpoints
+        n_nodes, n_edges = len(self.ids), len(edges)
+        owner = np.concatenate([source, target])
+        other = np.concatenate([target, source])
+        edge_id = np.concatenate([np.arange(n_edges, dtype='int32')] * 2)
+        order = np.lexsort((edge_id, owner))
+        self.neighbors = other[order]
+        self.neighbor_edge = edge_id[order]
+        self.indptr = np.zeros(n_nodes + 1, dtype='int64')
+        np.cumsum(np.bincount(owner, minlength=n_nodes), out=self.indptr[1:])
+        self.degree = np.diff(self.indptr)
+
+        self.landmarks = np.zeros(0, dtype='int32')
+        self.landmark_dist = np.zeros((0, n_nodes), dtype='int16')
+
+    def expand(self, frontier: np.ndarray):
+        """(owner, neighbor, edge) arrays over all relationships of the frontier nodes."""
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            empty = np.zeros(0, dtype='int32')
+            return empty, empty, empty
+        positions = np.arange(total) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return np.repeat(frontier, counts), self.neighbors[positions], self.neighbor_edge[positions]
+
+    def distances(self, source: int) -> np.ndarray:
+        """BFS hop count from source to every node (-1 when unreachable)."""
+        dist = np.full(len(self.ids), -1, dtype='int32')
+        dist[source] = 0
+        frontier, depth = np.array([source], dtype='int32'), 0
+        while len(frontier):
+            _, neighbors, _ = self.expand(frontier)
+            frontier = np.unique(neighbors[dist[neighbors] < 0])
+            depth += 1
+            dist[frontier] = depth
+        return dist
+
+    def nbytes(self) -> int:
+        arrays = [self.edge_type, self.neighbors, self.neighbor_edge, self.indptr, self.degree,
+                  self.landmarks, self.landmark_dist]
+        return int(sum(a.nbytes for a in arrays))
+
+
+class PathService:
+    """Bidirectional BFS shortest paths over an in-memory copy of the whole graph.
+
+    Args:
+        db: Graph backend to load from (get_graph_backend() by default)
+        landmarks: Number of landmark nodes (PATH_LANDMARKS, default 8; 0 disables the bounds)
+    """
+
+    def __init__(self, db=None, landmarks: Optional[int] = None):
+        self.db = db
+        self.landmark_count = landmarks if landmarks is not None else int(os.getenv('PATH_LANDMARKS', '8'))
+        self.loaded_at: Optional[float] = None
+        self.load_ms: Optional[float] = None
+        self._graph: Optional[_Graph] = None
+        self._lock = threading.Lock()
+        self.searches = self.pruned = 0
+
+    @classmethod
+    def from_records(cls, nodes: Iterable[Dict], edges: Iterable[Dict], landmarks: int = 0) -> "PathService":
+        """Build a service from rows shaped like the path_nodes / path_edges query results."""
+        service = cls(landmarks=landmarks)
+        service._set(_Graph(list(nodes), list(edges)))
+        return service
+
+    def _set(self, graph: _Graph):
+        if self.landmark_count:
+            self._build_landmarks(graph, self.landmark_count)
+        # A single reference swap, so searches never see a half-built graph
+        self._graph = graph
+        self.loaded_at = time.time()
+
+    def refresh(self) -> "PathService":
+        """(Re)load every node and relationship and swap the new arrays in."""
+        if self.db is None:
+            from graph_backend import get_graph_backend
+            self.db = get_graph_backend()
+        with self._lock:
+            t0 = time.perf_counter()
+            self._set(_Graph(self.db.run(get_query('path_nodes').cypher), self.db.run(get_query('path_edges').cypher)))
+            self.load_ms = (time.perf_counter() - t0) * 1000
+        graph = self._graph
+        print(f"[METRIC] path_service_load_ms={self.load_ms:.2f} nodes={len(graph.ids)} "
+              f"edges={len(graph.edge_type)} landmarks={len(graph.landmarks)}")
+        log_csv({
+            "ts": now_iso(),
+            "metric": "path_service_load",
+            "ms": round(self.load_ms, 2),
+            "rows": len(graph.edge_type),
+        })
+        return self
+
+    @property
+    def graph(self) -> _Graph:
+        if self._graph is None:
+            self.refresh()
+        return self._graph
+
+    @staticmethod
+    def _build_landmarks(graph: _Graph, count: int):
+        count = min(count, len(graph.ids))
+        landmarks = np.argsort(-graph.degree, kind='stable')[:count].astype('int32')
+        dist = np.stack([graph.distances(int(l)) for l in landmarks]) if count else np.zeros((0, len(graph.ids)))
+        graph.landmarks = landmarks
+        graph.landmark_dist = np.minimum(dist, np.iinfo('int16').max).astype('int16')
+
+    def stats(self) -> Dict:
+        g = self.graph
+        return {
+            'nodes': len(g.ids),
+            'edges': int(len(g.edge_type)),
+            'landmarks': int(len(g.landmarks)),
+            'bytes': g.nbytes(),
+            'loaded_at': self.loaded_at,
+            'load_ms': self.load_ms,
+            'searches': self.searches,
+            'pruned': self.pruned,
+        }
+
+    # --- bounds and search -------------------------------------------------------
+
+    def distance_bounds(self, source: int, target: int) -> Tuple[float, float]:
+        """Landmark (lower, upper) bounds on the hop distance; lower is inf when provably disconnected."""
+        d = self.graph.landmark_dist
+        if not len(d):
+            return 0.0, float('inf')
+        ds, dt = d[:, source].astype('int32'), d[:, target].astype('int32')
+        reach_s, reach_t = ds >= 0, dt >= 0
+        if np.any(reach_s != reach_t):
+            return float('inf'), float('inf')
+        both = reach_s & reach_t
+        if not both.any():
+            return 0.0, float('inf')
+        return float(np.abs(ds[both] - dt[both]).max()), float((ds[both] + dt[both]).min())
+
+    def shortest_path(self, source: int, target: int, max_hops: int = MAX_HOPS) -> Optional[Tuple[List[int], List[int]]]:
+        """Node ids and relationship ids of a shortest path of at most max_hops, or None."""
+        g = self.graph
+        self.searches += 1
+        if source == target:
+            return [source], []
+        if self.distance_bounds(source, target)[0] > max_hops:
+            self.pruned += 1
+            return None
+
+        n = len(g.ids)
+        dist = [np.full(n, -1, dtype='int32'), np.full(n, -1, dtype='int32')]
+        parent = [np.full(n, -1, dtype='int32'), np.full(n, -1, dtype='int32')]
+        parent_edge = [np.full(n, -1, dtype='int32'), np.full(n, -1, dtype='int32')]
+        dist[0][source], dist[1][target] = 0, 0
+        frontier = [np.array([source], dtype='int32'), np.array([target], dtype='int32')]
+        depth = [0, 0]
+
+        while len(frontier[0]) and len(frontier[1]) and depth[0] + depth[1] < max_hops:
+            # Expand the cheaper side: fewer incident relationships to scan
+            side = 0 if g.degree[frontier[0]].sum() <= g.degree[frontier[1]].sum() else 1
+            owners, neighbors, edges = g.expand(frontier[side])
+            new = dist[side][neighbors] < 0
+            owners, neighbors, edges = owners[new], neighbors[new], edges[new]
+            reached, first = np.unique(neighbors, return_index=True)
+            depth[side] += 1
+            dist[side][reached] = depth[side]
+            parent[side][reached] = owners[first]
+            parent_edge[side][reached] = edges[first]
+
+            met = reached[dist[1 - side][reached] >= 0]
+            if len(met):
+                # Every meeting node of the first level that meets gives the same, minimal length
+                middle = int(met[np.argmin(dist[1 - side][met])])
+                return self._join(parent, parent_edge, middle)
+            frontier[side] = reached
+        return None
+
+    @staticmethod
+    def _join(parent, parent_edge, middle: int) -> Tuple[List[int], List[int]]:
+        nodes, edges = [middle], []
+        node = middle
+        while parent[0][node] >= 0:
+            edges.append(int(parent_edge[0][node]))
+            node = int(parent[0][node])
+            nodes.append(node)
+        nodes.reverse()
+        edges.reverse()
+        node = middle
+        while parent[1][node] >= 0:
+            edges.append(int(parent_edge[1][node]))
+            node = int(parent[1][node])
+            nodes.append(node)
+        return nodes, edges
+
+    def path_value(self, nodes: List[int], edges: List[int]) -> list:
+        """A path as Record.data() renders it: node properties alternating with relationship types."""
+        g = self.graph
+        value = [dict(g.props[nodes[0]])]
+        for edge, node in zip(edges, nodes[1:]):
+            value.extend([g.types[g.edge_type[edge]], dict(g.props[node])])
+        return value
+
+    def nodes_by_property(self, label: str, key: str, value) -> List[int]:
+        if key not in PROPERTY_KEYS.get(label, ()):
+            raise ValueError(f"Unknown property key {key} for {label}; expected one of {PROPERTY_KEYS.get(label)}")
+        return self.graph.by_property.get((label, key), {}).get(value, [])
+
+    def shortest_path_by_microbe_disease(self, m_key: str, microbe, d_key: str, disease,
+                                         max_hops: int = MAX_HOPS) -> List[Dict]:
+        """Rows of the shortest_path_by_microbe_disease query: one per matching (microbe, disease) pair with a path."""
+        rows = []
+        for m in self.nodes_by_property('Microbe', m_key, microbe):
+            for d in self.nodes_by_property('Disease', d_key, disease):
+                found = self.shortest_path(m, d, max_hops)
+                if found is not None:
+                    rows.append({'p': self.path_value(*found)})
+        return rows
+
+
+_service: Optional[PathService] = None
+_service_lock = threading.Lock()
+
+
+def get_path_service() -> PathService:
+    """Return the process-wide path service, loading it on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PathService().refresh()
+    return _service
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shortest microbe-disease path from the in-memory path service")
+    parser.add_argument('--microbe-cui', required=True)
+    parser.add_argument('--disease-cui', required=True)
+    parser.add_argument('--max-hops', type=int, default=MAX_HOPS)
+    args = parser.parse_args()
+
+    service = get_path_service()
+    print(json.dumps(service.stats(), indent=2, default=str))
+    t0 = time.perf_counter()
+    rows = service.shortest_path_by_microbe_disease('cui', args.microbe_cui, 'cui', args.disease_cui, args.max_hops)
+    print(f"search: {(time.perf_counter() - t0) * 1000:.2f} ms")
+    print(json.dumps(rows, indent=2, default=str))
@@ -0,0 +1,250 @@
+"""Bounded LRU + TTL cache for the results of ad-hoc read-only Cypher.
+
+MINERVA.query_neo4j runs whatever Cypher the agent writes. The agent often
+sends the same query with the same parameters several times in one
+conversation, and different users ask the same questions. QueryResultCache
+keys results by the query text (whitespace outside string literals
+collapsed) and the canonical JSON of its parameters. Each entry expires
+after ttl seconds. Least recently used entries are evicted to stay within
+max_entries and max_bytes; the size of a result is the size of its pickled
+rows, which is also how it is stored, so every hit returns a fresh copy.
+
+Only read-only queries are cached: no write clauses (CREATE, MERGE, SET,
+DELETE, REMOVE, DROP, FOREACH, LOAD CSV), no procedure calls, and no
+non-deterministic functions (rand(), timestamp(), datetime(), ...).
+
+Entries are stamped with the graph version (node and relationship totals plus
+the change counter that writers bump, see query_registry.graph_version). A
+daemon thread re-reads it every version_check_interval seconds and drops
+everything when it changed, so requests never wait for the check.
+check_version() starts that thread on first use.
+
+Configuration (environment):
+    QUERY_CACHE                  0 disables caching (default 1)
+    QUERY_CACHE_MAX_BYTES        default 64 MiB
+    QUERY_CACHE_MAX_ENTRIES      default 1024
+    QUERY_CACHE_TTL_S            default 300
+    QUERY_CACHE_VERSION_CHECK_S  default 30
+"""
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+from query_registry import graph_version
+
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`")
+_COMMENT = re.compile(r"//[^\n]*")
+_WRITE = re.compile(r"\b(CREATE|MERGE|SET|DELETE|DETACH|REMOVE|DROP|FOREACH|LOAD\s+CSV|IN\s+TRANSACTIONS)\b",
+                    re.IGNORECASE)
+_PROCEDURE = re.compile(r"\bCALL\s+[A-Za-z_]", re.IGNORECASE)
+_NONDETERMINISTIC = re.compile(r"\b(rand|randomUUID|timestamp|datetime|date|time|localtime|localdatetime)\s*\(",
+                               re.IGNORECASE)
+
+
+def _code_parts(query: str) -> List[str]:
+    """The query split into alternating code and literal parts (even indexes are code)."""
+    parts, last = [], 0
+    for match in _LITERAL.finditer(query):
+        parts.extend([query[last:match.start()], match.group(0)])
+        last = match.end()
+    parts.append(query[last:])
+    return parts
+
+
+def normalize_query(query: str) -> str:
+    """Query text with comments removed and whitespace outside literals collapsed."""
+    parts = _code_parts(query.strip().rstrip(';'))
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", _COMMENT.sub(" ", parts[i]))
+    return ''.join(parts).strip()
+
+
+def code_text(query: str) -> str:
+    """The query without its string literals and quoted names, for keyword checks."""
+    return ' '.join(_code_parts(query)[::2])
+
+
+def is_read_only(query: str) -> bool:
+    """Whether the query has no write clauses and calls no procedures (string literals are ignored)."""
+    code = code_text(query)
+    return not (_WRITE.search(code) or _PROCEDURE.search(code))
+
+
+def is_cacheable(query: str) -> bool:
+    """Whether the query only reads and always returns the same rows for the same graph."""
+    return is_read_only(query) and not _NONDETERMINISTIC.search(code_text(query))
+
+
+def canonical_parameters(parameters: Optional[Dict]) -> str:
+    """Parameters as JSON with sorted keys; numpy scalars become plain numbers."""
+    def default(value):
+        return value.item() if hasattr(value, 'item') else str(value)
+    return json.dumps(parameters or {}, sort_keys=True, separators=(',', ':'), default=default)
+
+
+def cache_key(query: str, parameters: Optional[Dict] = None) -> str:
+    text = normalize_query(query) + '\x00' + canonical_parameters(parameters)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class _Entry(NamedTuple):
+    blob: bytes
+    expires: float
+    version: Optional[str]
+
+
+class QueryResultCache:
+    """Thread-safe LRU + TTL cache of query rows.
+
+    Args:
+        db: Graph backend whose version invalidates entries (get_graph_backend() by default)
+        max_bytes: Total size of the pickled results kept
+        max_entries: Number of results kept
+        ttl: Seconds a result stays valid
+        version_check_interval: Seconds between background graph version checks
+    """
+
+    def __init__(self, db=None, max_bytes: Optional[int] = None, max_entries: Optional[int] = None,
+                 ttl: Optional[float] = None, version_check_interval: Optional[float] = None):
+        self.db = db
+        self.max_bytes = max_bytes or int(os.getenv('QUERY_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+        self.max_entries = max_entries or int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '1024'))
+        self.ttl = ttl if ttl is not None else float(os.getenv('QUERY_CACHE_TTL_S', '300'))
+        self.version_check_interval = (version_check_interval if version_check_interval is not None
+                                       else float(os.getenv('QUERY_CACHE_VERSION_CHECK_S', '30')))
+        self.version: Optional[str] = None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._watcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.uncacheable = 0
+
+    def _graph(self):
+        if self.db is None:
+            from graph_backend import get_graph_backend
+            self.db = get_graph_backend()
+        return self.db
+
+    def check_version(self) -> Optional[str]:
+        """The graph version the entries are stamped with; starts the background check on first use."""
+        if self._watcher is None:
+            with self._lock:
+                if self._watcher is None:
+                    self._watcher = threading.Thread(target=self._watch_version, name='query-cache-version',
+                                                     daemon=True)
+                    self._watcher.start()
+        return self.version
+
+    def _watch_version(self):
+        while True:
+            self.refresh_version()
+            time.sleep(self.version_check_interval)
+
+    def refresh_version(self) -> Optional[str]:
+        """Re-read the graph version now and clear the cache if it changed.
+
+        When the graph is unreachable, cached results keep being served until they expire.
+        """
+        try:
+            version = graph_version(self._graph())
+        except Exception as e:
+            print(f"Could not check the graph version, keeping cached query results: {e}")
+            return self.version
+        self.invalidate(version)
+        return self.version
+
+    def invalidate(self, version: Optional[str] = None):
+        """Drop every entry, or only when version differs from the one the entries were stamped with."""
+        with self._lock:
+            if version is not None and version == self.version:
+                return
+            self._entries.clear()
+            self._bytes = 0
+            self.version = version
+
+    def get(self, query: str, parameters: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """Cached rows (a fresh copy), or None on a miss or for queries that are not cached."""
+        if not is_cacheable(query):
+            with self._lock:
+                self.uncacheable += 1
+            return None
+        key = cache_key(query, parameters)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.expires < time.monotonic() or entry.version != self.version):
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return pickle.loads(entry.blob)
+
+    def put(self, query: str, parameters: Optional[Dict], rows: List[Dict]):
+        """Store rows of a cacheable query; results larger than max_bytes are not kept."""
+        if not is_cacheable(query):
+            return
+        try:
+            blob = pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        if len(blob) > self.max_bytes:
+            return
+        key = cache_key(query, parameters)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(blob, time.monotonic() + self.ttl, self.version)
+            self._bytes += len(blob)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: str):
+        self._bytes -= len(self._entries.pop(key).blob)
+
+    def run(self, db, query: str, parameters: Optional[Dict] = None) -> List[Dict]:
+        """Rows of a query from the cache, or from db (and then cached)."""
+        self.check_version()
+        rows = self.get(query, parameters)
+        if rows is None:
+            rows = db.run(query, parameters)
+            self.put(query, parameters, rows)
+        return rows
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'uncacheable': self.uncacheable,
+                'version': self.version,
+            }
+
+
+_cache: Optional[QueryResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> Optional[QueryResultCache]:
+    """Return the process-wide cache, or None when QUERY_CACHE=0."""
+    global _cache
+    if os.getenv('QUERY_CACHE', '1') == '0':
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QueryResultCache()
+    return _cache
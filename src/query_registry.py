@@ -0,0 +1,814 @@
+"""Named, fully parameterized Cypher templates used by components/graph_queries.GraphQueries.
+
+Entity values (CUIs, names) and limits are always passed as query parameters,
+so Neo4j sees one query text per template and reuses its cached plan across
+entities. Parts of a query that Cypher cannot parameterize without losing
+index use (labels, property keys, relationship types, ORDER BY direction)
+are registered as separate variants, named ``<template>:<variant>``, and
+selected from a fixed whitelist. No caller-supplied text is ever spliced into
+a query.
+
+Usage:
+    query = get_query('food_by_property', 'cui')
+    rows = db.run(query.cypher, query.bind(value='C0000000'))
+"""
+import base64
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+LABELS = ('Microbe', 'Disease', 'Food')
+PROPERTY_KEYS = {
+    'Microbe': ('name', 'cui', 'official_name'),
+    'Disease': ('name', 'cui', 'official_name'),
+    'Food': ('name', 'cui', 'official_name'),
+}
+STRENGTH_TYPES = ('strength_raw', 'strength_IF', 'strength_IFQ')
+SIGNS = {'positive': '>= 0', 'negative': '< 0'}
+
+
+@dataclass(frozen=True)
+class NamedQuery:
+    """A Cypher template plus the parameters it declares."""
+    name: str
+    cypher: str
+    params: Dict[str, type]
+
+    def bind(self, **values) -> Dict:
+        """Check the given parameters against the declared names and types.
+
+        Ints are accepted where floats are declared; numpy scalars are converted
+        to their Python equivalents so the driver can send them.
+
+        Raises:
+            ValueError: If a parameter is missing or not declared
+            TypeError: If a parameter has the wrong type
+        """
+        missing = set(self.params) - set(values)
+        unknown = set(values) - set(self.params)
+        if missing or unknown:
+            raise ValueError(f"Query {self.name}: missing parameters {sorted(missing)}, "
+                             f"unexpected parameters {sorted(unknown)}")
+        bound = {}
+        for key, expected in self.params.items():
+            value = values[key]
+            if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+                value = value.item()
+            if expected is float and isinstance(value, int) and not isinstance(value, bool):
+                value = float(value)
+            if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                raise TypeError(f"Query {self.name}: parameter {key} must be {expected.__name__}, "
+                                f"got {type(value).__name__}")
+            bound[key] = value
+        return bound
+
+
+QUERIES: Dict[str, NamedQuery] = {}
+
+
+def register(name: str, cypher: str, **param_types: type) -> NamedQuery:
+    """Add a template to the registry.
+
+    Args:
+        name: Registry key (``template`` or ``template:variant``)
+        cypher: Query text referring to its parameters as ``$name``
+        **param_types: Declared type of every parameter
+
+    Returns:
+        NamedQuery: The registered query
+    """
+    if name in QUERIES:
+        raise ValueError(f"Query {name} is already registered")
+    for key in param_types:
+        if f"${key}" not in cypher:
+            raise ValueError(f"Query {name} declares ${key} but does not use it")
+    query = NamedQuery(name=name, cypher=cypher, params=dict(param_types))
+    QUERIES[name] = query
+    return query
+
+
+def get_query(name: str, *variant: str) -> NamedQuery:
+    """Look up a template, optionally a variant of it (e.g. ``get_query('count_nodes', 'Food')``)."""
+    key = ':'.join((name,) + tuple(str(v) for v in variant))
+    try:
+        return QUERIES[key]
+    except KeyError:
+        raise ValueError(f"Unknown query {key}") from None
+
+
+def names(prefix: Optional[str] = None) -> Iterable[str]:
+    return sorted(n for n in QUERIES if prefix is None or n.split(':')[0] == prefix)
+
+
+# --- Counts and overview ----------------------------------------------------
+
+for _label in LABELS:
+    register(f'count_nodes:{_label}', f"""
+        MATCH (m:`{_label}`)-[:STRENGTH]-(d)
+        RETURN COUNT(DISTINCT m) as count
+        """)
+
+register('count_papers', """
+        MATCH (:Microbe)-[r:NEGATIVE|POSITIVE]->(:Disease)
+        RETURN count(DISTINCT r.pmid) AS total_papers
+        """)
+
+for _rel in ('POSITIVE', 'NEGATIVE'):
+    register(f'count_relationships:{_rel}', f"""
+        MATCH ()-[r:{_rel}]->()
+        RETURN count(r) AS count
+        """)
+
+# The overview numbers (graph_stats) come from two queries: the node counts, and the
+# POSITIVE/NEGATIVE relationships grouped by (type, year, paper, journal, start entity,
+# end entity), returned as ordinary rows so the driver streams them rather than
+# building one collected record. The entities (label, cui) feed the per-entity
+# publication rollup. Titles are not part of the grouping; 'paper_titles' looks them
+# up for the few papers that are shown.
+register('graph_node_counts', """
+        CALL { MATCH (n:Microbe)-[:STRENGTH]-() RETURN count(DISTINCT n) AS microbes }
+        CALL { MATCH (n:Disease)-[:STRENGTH]-() RETURN count(DISTINCT n) AS diseases }
+        CALL { MATCH (n:`Food`)-[:STRENGTH]-() RETURN count(DISTINCT n) AS foods }
+        RETURN microbes, diseases, foods
+        """)
+
+register('graph_statistics', """
+        MATCH (a)-[r:POSITIVE|NEGATIVE]->(b)
+        RETURN type(r) AS rel, r.publication_year AS year, r.pmid AS pmid, r.journal AS journal,
+               (a:Microbe AND b:Disease) AS microbe_disease,
+               head([l IN labels(a) WHERE l IN ['Microbe', 'Disease', 'Food']]) AS start_label, a.cui AS start_cui,
+               head([l IN labels(b) WHERE l IN ['Microbe', 'Disease', 'Food']]) AS end_label, b.cui AS end_cui,
+               count(*) AS edges
+        """)
+
+register('paper_titles', """
+        MATCH ()-[r:POSITIVE|NEGATIVE]->()
+        WHERE r.pmid IN $pmids
+        RETURN r.pmid AS pmid, min(r.title) AS title
+        """, pmids=list)
+
+# Version stamp for caches of derived results (graph_stats, query_cache): node and
+# relationship totals (answered from Neo4j's count store) plus the counter on the
+# (:GraphVersion) node. Totals catch added and deleted elements; whatever writes to
+# the graph runs 'bump_graph_version' afterwards so in-place SETs are caught too.
+register('graph_version', """
+        MATCH (n)
+        WITH count(n) AS nodes
+        MATCH ()-[r]->()
+        WITH nodes, count(r) AS relationships
+        OPTIONAL MATCH (v:GraphVersion)
+        RETURN nodes, relationships, max(v.version) AS version
+        """)
+
+register('bump_graph_version', """
+        MERGE (v:GraphVersion {name: 'graph'})
+        SET v.version = coalesce(v.version, 0) + 1
+        RETURN v.version AS version
+        """)
+
+
+def graph_version(db) -> str:
+    """The 'graph_version' stamp as a string ("nodes:relationships:counter")."""
+    row = db.run(get_query('graph_version').cypher)[0]
+    return f"{row['nodes']}:{row['relationships']}:{row['version'] or 0}"
+
+
+def bump_graph_version(db) -> int:
+    """Mark the graph as changed; call after writing to it so that caches drop their derived results."""
+    return db.run(get_query('bump_graph_version').cypher)[0]['version']
+
+
+register('all_diseases', """
+        MATCH (m:Disease)-[:STRENGTH]-(:Microbe)
+        RETURN DISTINCT m.cui AS cui, m.name AS name, m.official_name AS official_name
+        """)
+
+register('all_microbes', """
+        MATCH (m:Microbe)-[:STRENGTH]-(:Disease)
+        RETURN DISTINCT m.cui AS cui, m.tax_id as tax_id, m.name AS name
+        """)
+
+register('all_food', """
+        MATCH (f:`Food`)
+        RETURN DISTINCT f.cui AS cui, f.name AS name, f.official_name AS official_name
+        ORDER BY f.official_name ASC
+        """)
+
+# --- Entity lookups -----------------------------------------------------------
+
+for _key in PROPERTY_KEYS['Microbe']:
+    register(f'microbe_by_property:{_key}', f"""
+        MATCH (m:Microbe) WHERE m.{_key} = $value
+        RETURN m.name as name, m.official_name as official_name, m.cui as cui, m.rank as rank, m.tax_id as tax_id,
+               m.definition as definition, m.synonyms as synonyms
+        """, value=str)
+
+for _key in PROPERTY_KEYS['Disease']:
+    register(f'disease_by_property:{_key}', f"""
+        MATCH (d:Disease)
+        WHERE d.{_key} = $value
+        RETURN d.name as name,
+               d.official_name as official_name,
+               d.cui as cui,
+               d.tui as tui,
+               d.snomedct_concept as snomedct_concept,
+               d.definition as definition,
+               d.synonyms as synonyms
+        """, value=str)
+
+for _key in PROPERTY_KEYS['Food']:
+    register(f'food_by_property:{_key}', f"""
+        MATCH (f:`Food`)
+        WHERE f.{_key} = $value
+        RETURN f.official_name as official_name, f.tui as tui, f.snomedct_concept as snomedct_concept,
+               f.definition as definition, f.synonyms as synonyms, f.cui as cui, f.name as name
+        """, value=str)
+
+# --- Microbe-disease relationships -------------------------------------------
+
+for _rel in ('POSITIVE', 'NEGATIVE'):
+    for _dkey in PROPERTY_KEYS['Disease']:
+        for _mkey in PROPERTY_KEYS['Microbe']:
+            register(f'relationship_by_microbe_disease:{_rel}:{_dkey}:{_mkey}', f"""
+        MATCH (d:Disease)-[r:{_rel}]-(m:Microbe)
+        WHERE d.{_dkey} = $disease AND m.{_mkey} = $microbe
+        RETURN r.rel_type as Type, r.title as Title, r.pmid as PMID, r.pmcid as PMCID, r.publication_year as Year,
+               r.impact_factor as ImpactFactor, r.evidence as Evidence
+        """, disease=str, microbe=str)
+
+for _dkey in PROPERTY_KEYS['Disease']:
+    for _mkey in PROPERTY_KEYS['Microbe']:
+        register(f'strength_by_microbe_disease:{_dkey}:{_mkey}', f"""
+        MATCH (d:Disease)-[r:STRENGTH]-(m:Microbe)
+        WHERE d.{_dkey} = $disease AND m.{_mkey} = $microbe
+        RETURN r.strength_raw as Strength, r.strength_IF as Strength_IF, r.strength_IFQ as Strength_IFQ
+        """, disease=str, microbe=str)
+        register(f'shortest_path_by_microbe_disease:{_mkey}:{_dkey}', f"""
+        MATCH (m:Microbe),(d:Disease),
+        p = shortestPath((m)-[*..15]-(d))
+        WHERE m.{_mkey} = $microbe AND d.{_dkey} = $disease
+        RETURN p
+        """, microbe=str, disease=str)
+
+# --- Batched lookups (graph_loader) ---------------------------------------------
+# One UNWIND query per entity type for all keys collected during a render or
+# agent turn. Every row carries the key it answers so the loader can fan out.
+
+for _key in PROPERTY_KEYS['Microbe']:
+    register(f'microbes_by_property:{_key}', f"""
+        UNWIND $keys AS key
+        MATCH (m:Microbe) WHERE m.{_key} = key
+        RETURN key, m.name as name, m.official_name as official_name, m.cui as cui, m.rank as rank,
+               m.tax_id as tax_id, m.definition as definition, m.synonyms as synonyms
+        """, keys=list)
+
+for _key in PROPERTY_KEYS['Disease']:
+    register(f'diseases_by_property:{_key}', f"""
+        UNWIND $keys AS key
+        MATCH (d:Disease) WHERE d.{_key} = key
+        RETURN key, d.name as name, d.official_name as official_name, d.cui as cui, d.tui as tui,
+               d.snomedct_concept as snomedct_concept, d.definition as definition, d.synonyms as synonyms
+        """, keys=list)
+
+for _key in PROPERTY_KEYS['Food']:
+    register(f'foods_by_property:{_key}', f"""
+        UNWIND $keys AS key
+        MATCH (f:`Food`) WHERE f.{_key} = key
+        RETURN key, f.official_name as official_name, f.tui as tui, f.snomedct_concept as snomedct_concept,
+               f.definition as definition, f.synonyms as synonyms, f.cui as cui, f.name as name
+        """, keys=list)
+
+for _dkey in PROPERTY_KEYS['Disease']:
+    for _mkey in PROPERTY_KEYS['Microbe']:
+        register(f'relationships_by_microbe_disease:{_dkey}:{_mkey}', f"""
+        UNWIND $pairs AS pair
+        MATCH (d:Disease)-[r:POSITIVE|NEGATIVE]-(m:Microbe)
+        WHERE d.{_dkey} = pair.disease AND m.{_mkey} = pair.microbe
+        RETURN pair.disease AS disease_key, pair.microbe AS microbe_key, type(r) AS relationship,
+               r.rel_type as Type, r.title as Title, r.pmid as PMID, r.pmcid as PMCID, r.publication_year as Year,
+               r.impact_factor as ImpactFactor, r.evidence as Evidence
+        """, pairs=list)
+        register(f'strengths_by_microbe_disease:{_dkey}:{_mkey}', f"""
+        UNWIND $pairs AS pair
+        MATCH (d:Disease)-[r:STRENGTH]-(m:Microbe)
+        WHERE d.{_dkey} = pair.disease AND m.{_mkey} = pair.microbe
+        RETURN pair.disease AS disease_key, pair.microbe AS microbe_key,
+               r.strength_raw as Strength, r.strength_IF as Strength_IF, r.strength_IFQ as Strength_IFQ
+        """, pairs=list)
+
+for _sign, _cond in SIGNS.items():
+    register(f'microbe_relations:{_sign}', f"""
+        MATCH (m:Microbe)-[r:STRENGTH]-(d:Disease)
+        WHERE m.cui = $cui AND r.strength_raw {_cond}
+        RETURN m.name as microbe_name, d.name as disease_name, r.strength_raw as strength, d.cui as cui
+        """, cui=str)
+    register(f'disease_relations:{_sign}', f"""
+        MATCH (m:Microbe)-[r:STRENGTH]-(d:Disease)
+        WHERE d.cui = $cui AND r.strength_raw {_cond}
+        RETURN d.name as disease_name, m.name as microbe_name, r.strength_raw as strength, m.cui as cui
+        """, cui=str)
+    register(f'food_relations:{_sign}', f"""
+        MATCH (f:`Food`)-[r:STRENGTH]-(m:Microbe)
+        WHERE f.cui = $cui AND r.strength_raw {_cond}
+        RETURN m.name as microbe_name, f.official_name as food_name, r.strength_raw as strength, f.cui as cui
+        """, cui=str)
+
+# --- Food-microbe-disease paths ----------------------------------------------
+# Raw strengths only: derived_relation is scored by strength_scoring.
+
+register('disease_food_relations', """
+        MATCH (f:`Food`)-[r1:STRENGTH]-(m:Microbe)-[r2:STRENGTH]-(d:Disease)
+        WHERE d.cui = $cui
+        RETURN f.official_name AS food_name,
+               m.name AS microbe_name,
+               r1.strength_raw AS food_microbe_strength,
+               r2.strength_raw AS microbe_disease_strength
+        """, cui=str)
+
+register('food_disease_relations', """
+        MATCH (f:`Food`)-[r1:STRENGTH]-(m:Microbe)-[r2:STRENGTH]-(d:Disease)
+        WHERE f.cui = $cui
+        RETURN d.official_name AS disease_name,
+               m.name AS microbe_name,
+               f.official_name AS food_name,
+               r1.strength_raw AS food_microbe_strength,
+               r2.strength_raw AS microbe_disease_strength
+        """, cui=str)
+
+register('food_microbiomes', """
+        MATCH (f:Food)
+        WHERE toLower(f.official_name) CONTAINS toLower($food_name)
+           OR toLower(f.name) CONTAINS toLower($food_name)
+        MATCH (f)-[r]-(m:Microbe)
+        RETURN
+            f.name as food_name,
+            f.official_name as food_official_name,
+            collect(DISTINCT {
+                microbe: m.name,
+                microbe_id: m.id,
+                relationship: type(r),
+                strength: r.strength_raw
+            }) as microbiomes
+        """, food_name=str)
+
+# --- Neighbourhoods -------------------------------------------------------------
+
+for _label in ('Disease', 'Food'):
+    register(f'two_hop_neighbourhood:{_label}', f"""
+        MATCH (s:`{_label}`)
+        WHERE s.cui = $cui
+        WITH s
+        MATCH p = (s)-[r:STRENGTH|PARENT*..2]-(n)
+        WITH p LIMIT 50
+        UNWIND relationships(p) AS rel
+        WITH startNode(rel) AS source, endNode(rel) AS target, rel as edge
+        RETURN
+          source.official_name as source,
+          labels(source)[0] AS source_type,
+          CASE WHEN type(edge) = "PARENT" THEN 'PARENT' ELSE toString(edge.strength_raw) END AS relation,
+          target.official_name as target,
+          labels(target)[0] AS target_type
+        """, cui=str)
+
+for _label in ('Microbe', 'Disease'):
+    register(f'one_hop_neighbourhood:{_label}', f"""
+        MATCH (s:`{_label}`)
+        WHERE s.cui = $cui
+        WITH s
+        MATCH p = (s)-[r:STRENGTH|PARENT*..1]-(n)
+        WITH p LIMIT 50
+        UNWIND relationships(p) AS rel
+        WITH startNode(rel) AS source, endNode(rel) AS target, rel as edge
+        RETURN
+          source.name AS source,
+          labels(source)[0] AS source_type,
+          CASE WHEN type(edge) = "PARENT" THEN 'PARENT' ELSE edge.strength_raw END AS relation,
+          target.name AS target,
+          labels(target)[0] AS target_type
+        """, cui=str)
+
+# --- Rankings -------------------------------------------------------------------
+
+register('microbes_with_more_connections', """
+        MATCH (m:Microbe)-[r:STRENGTH]->(:Disease)
+        WITH m, count(r) AS strength_count,
+             count(CASE WHEN r.strength_raw >= 0 THEN 1 END) AS strength_positive,
+             count(CASE WHEN r.strength_raw < 0 THEN 1 END) AS strength_negative
+        ORDER BY strength_count DESC
+        RETURN m.name AS microbe_name, strength_count, strength_positive, strength_negative
+        LIMIT $n
+        """, n=int)
+
+register('diseases_with_more_connections', """
+        MATCH (:Microbe)-[r:STRENGTH]->(m:Disease)
+        WITH m, count(r) AS strength_count,
+             count(CASE WHEN r.strength_raw >= 0 THEN 1 END) AS strength_positive,
+             count(CASE WHEN r.strength_raw < 0 THEN 1 END) AS strength_negative
+        ORDER BY strength_count DESC
+        RETURN m.name AS disease_name, strength_count, strength_positive, strength_negative
+        LIMIT $n
+        """, n=int)
+
+register('microbes_with_more_references', """
+        MATCH (m:Microbe)-[r:NEGATIVE|POSITIVE]->(:Disease)
+        WITH m, count(r) AS total_relations,
+             count(CASE WHEN type(r) = 'NEGATIVE' THEN 1 END) AS negative_count,
+             count(CASE WHEN type(r) = 'POSITIVE' THEN 1 END) AS positive_count
+        ORDER BY total_relations DESC
+        RETURN m.name AS microbe_name, total_relations, negative_count, positive_count
+        LIMIT $n
+        """, n=int)
+
+register('diseases_with_more_references', """
+        MATCH (:Microbe)-[r:NEGATIVE|POSITIVE]->(m:Disease)
+        WITH m, count(r) AS total_relations,
+             count(CASE WHEN type(r) = 'NEGATIVE' THEN 1 END) AS negative_count,
+             count(CASE WHEN type(r) = 'POSITIVE' THEN 1 END) AS positive_count
+        ORDER BY total_relations DESC
+        RETURN m.name AS disease_name, total_relations, negative_count, positive_count
+        LIMIT $n
+        """, n=int)
+
+for _strength in STRENGTH_TYPES:
+    for _order in ('DESC', 'ASC'):
+        register(f'rank_by_strength:{_strength}:{_order}', f"""
+        MATCH (n1:Microbe)-[r:STRENGTH]-(n2:Disease)
+        RETURN n1.name AS Microbe, n2.name AS Disease, r.{_strength} AS Strength
+        ORDER BY Strength {_order}
+        LIMIT $n
+        """, n=int)
+        for _label, _var in (('Microbe', 'n1'), ('Disease', 'n2')):
+            register(f'rank_by_strength_for:{_strength}:{_order}:{_label}', f"""
+            MATCH (n1:Microbe)-[r:STRENGTH]-(n2:Disease)
+            WHERE {_var}.cui = $cui
+            RETURN n1.name AS Microbe, n2.name AS Disease, r.{_strength} AS Strength
+            ORDER BY Strength {_order}
+            LIMIT $n
+            """, cui=str, n=int)
+
+# Every Microbe-Disease STRENGTH edge for the in-memory rankings (strength_rankings),
+# and a per-disease fingerprint of them to find the diseases whose edges changed
+_RANKING_EDGE_COLUMNS = """
+        RETURN elementId(r) AS id, elementId(m) AS microbe_id, m.cui AS microbe_cui, m.name AS microbe_name,
+               elementId(d) AS disease_id, d.cui AS disease_cui, d.name AS disease_name,
+               startNode(r) = m AS microbe_to_disease,
+               r.strength_raw AS strength_raw, r.strength_IF AS strength_IF, r.strength_IFQ AS strength_IFQ
+        """
+
+register('strength_ranking_edges', """
+        MATCH (m:Microbe)-[r:STRENGTH]-(d:Disease)""" + _RANKING_EDGE_COLUMNS)
+
+register('strength_ranking_edges_for_diseases', """
+        MATCH (m:Microbe)-[r:STRENGTH]-(d:Disease)
+        WHERE elementId(d) IN $disease_ids""" + _RANKING_EDGE_COLUMNS, disease_ids=list)
+
+register('strength_disease_fingerprints', """
+        MATCH (:Microbe)-[r:STRENGTH]-(d:Disease)
+        RETURN elementId(d) AS disease_id, count(r) AS edges,
+               sum(coalesce(r.strength_raw, 0.0)) AS strength_raw,
+               sum(coalesce(r.strength_IF, 0.0)) AS strength_IF,
+               sum(coalesce(r.strength_IFQ, 0.0)) AS strength_IFQ
+        """)
+
+# --- Publications -----------------------------------------------------------------
+
+register('relationships_by_year', """
+        MATCH ()-[r:POSITIVE|NEGATIVE]->()
+        RETURN r.publication_year as publication_year, count(r) AS relationship_count
+        ORDER BY r.publication_year
+        """)
+
+register('publications_by_year', """
+        MATCH ()-[r:POSITIVE|NEGATIVE]->()
+        RETURN r.publication_year as publication_year, count(DISTINCT r.pmid) as publications
+        ORDER BY r.publication_year
+        """)
+
+register('more_relevant_papers', """
+        MATCH ()-[r:POSITIVE|NEGATIVE]->()
+        WITH r.pmid AS PMID, count(*) AS Frequency, r.title as Title
+        ORDER BY Frequency DESC, PMID
+        LIMIT $n
+        RETURN Title, PMID, Frequency
+        """, n=int)
+
+register('publication_journals', """
+        MATCH (m:Microbe)-[r:NEGATIVE|POSITIVE]->(d:Disease)
+        RETURN r.pmid AS PMID, r.journal as Journal
+        """)
+
+for _label in LABELS:
+    register(f'popularity_in_time:{_label}', f"""
+        MATCH (m:`{_label}`)-[r:POSITIVE|NEGATIVE]-()
+        WHERE m.cui = $cui
+        RETURN r.publication_year as publication_year, count(DISTINCT r.pmid) as publications
+        ORDER BY r.publication_year
+        """, cui=str)
+
+register('related_publications:Microbe', """
+        MATCH (m:Microbe)-[r:POSITIVE|NEGATIVE]-()
+        WHERE m.cui = $cui
+        RETURN r.pmid as pmid, m.name as microbe, r.cui_disease as disease, r.rel_type as rel_type,
+               r.publication_year as year, r.journal as journal, r.title as title, r.evidence as evidence
+        ORDER BY r.publication_year
+        """, cui=str)
+
+register('related_publications:Disease', """
+        MATCH (m:Disease)-[r:POSITIVE|NEGATIVE]-()
+        WHERE m.cui = $cui
+        RETURN r.pmid as pmid, m.name as disease, r.cui_microbe as microbe, r.rel_type as rel_type,
+               r.publication_year as year, r.journal as journal, r.title as title, r.evidence as evidence
+        ORDER BY r.publication_year
+        """, cui=str)
+
+register('related_publications:Food', """
+        MATCH (f:`Food`)-[r:POSITIVE|NEGATIVE]-(m:Microbe)
+        WHERE f.cui = $cui
+        RETURN r.pmid as pmid, f.official_name as food, r.cui_microbe as microbe, r.rel_type as rel_type,
+               r.publication_year as year, r.journal as journal, r.title as title, r.evidence as evidence
+        ORDER BY r.publication_year
+        """, cui=str)
+
+# Keyset pages of the same listings, ordered by (year, pmid, relationship id) with
+# nulls last. The ':after' variant resumes strictly after the cursor row, so a
+# page is a top-k sort of the entity's edges instead of the whole listing
+# shipped to the client, and deep pages cost no more than the first.
+PAGE_YEAR_NULL = 9999
+_PUBLICATION_PAGE = {
+    'Microbe': ("(m:Microbe)-[r:POSITIVE|NEGATIVE]-()", "m", "m",
+                "r.pmid as pmid, m.name as microbe, r.cui_disease as disease"),
+    'Disease': ("(m:Disease)-[r:POSITIVE|NEGATIVE]-()", "m", "m",
+                "r.pmid as pmid, m.name as disease, r.cui_microbe as microbe"),
+    'Food': ("(f:`Food`)-[r:POSITIVE|NEGATIVE]-(m:Microbe)", "f", "f, m",
+             "r.pmid as pmid, f.official_name as food, r.cui_microbe as microbe"),
+}
+_AFTER = """
+        WHERE year_key > $after_year
+           OR (year_key = $after_year AND (pmid_key > $after_pmid OR (pmid_key = $after_pmid AND rel_key > $after_rel)))"""
+for _label, (_pattern, _var, _with, _columns) in _PUBLICATION_PAGE.items():
+    for _mode, _where, _params in (('first', '', {}),
+                                   ('after', _AFTER, {'after_year': int, 'after_pmid': str, 'after_rel': str})):
+        register(f'related_publications_page:{_label}:{_mode}', f"""
+        MATCH {_pattern}
+        WHERE {_var}.cui = $cui
+        WITH {_with}, r, coalesce(r.publication_year, {PAGE_YEAR_NULL}) AS year_key,
+             coalesce(toString(r.pmid), '') AS pmid_key, elementId(r) AS rel_key{_where}
+        RETURN {_columns}, r.rel_type as rel_type,
+               r.publication_year as year, r.journal as journal, r.title as title, r.evidence as evidence,
+               year_key, pmid_key, rel_key
+        ORDER BY year_key, pmid_key, rel_key
+        LIMIT $limit
+        """, cui=str, limit=int, **_params)
+
+PAGE_KEYS = ('year_key', 'pmid_key', 'rel_key')
+PUBLICATION_PAGE_SIZE = int(os.getenv('PUBLICATION_PAGE_SIZE', '50'))
+PUBLICATION_PAGE_MAX = int(os.getenv('PUBLICATION_PAGE_MAX', '500'))
+
+
+def encode_cursor(row: Dict) -> str:
+    """Opaque cursor resuming after the given related_publications_page row."""
+    return base64.urlsafe_b64encode(json.dumps([row[k] for k in PAGE_KEYS]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Dict:
+    """Parameters of the ':after' page variant for a cursor from encode_cursor."""
+    try:
+        after_year, after_pmid, after_rel = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {'after_year': int(after_year), 'after_pmid': str(after_pmid), 'after_rel': str(after_rel)}
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid publication cursor: {cursor!r}") from e
+
+# --- MINERVA client ---------------------------------------------------------------
+
+register('schema_labels', """
+            CALL db.labels()
+            YIELD label
+            RETURN DISTINCT label
+            ORDER BY label
+            """)
+
+register('schema_relationship_types', """
+            CALL db.relationshipTypes()
+            YIELD relationshipType
+            RETURN DISTINCT relationshipType
+            ORDER BY relationshipType
+            """)
+
+register('schema_label_counts', """
+            MATCH (n)
+            RETURN DISTINCT labels(n) AS label, COUNT(n) AS count
+            """)
+
+for _label in LABELS + ('RiskFactor',):
+    register(f'sample_nodes:{_label}', f"""
+            MATCH (n:`{_label}`)
+            RETURN n
+            LIMIT $limit
+            """, limit=int)
+
+register('food_microbiomes_by_cui', """
+        MATCH (f:Food)
+        WHERE f.cui IN $cuis
+        MATCH (f)-[r]-(m:Microbe)
+        RETURN
+            f.name as food_name,
+            f.official_name as food_official_name,
+            collect(DISTINCT {
+                microbe: m.name,
+                microbe_id: m.id,
+                relationship: type(r),
+                strength: r.strength_raw
+            }) as microbiomes
+        """, cuis=list)
+
+register('disease_names', """
+        MATCH (d:Disease)
+        RETURN d.name as name, d.cui as cui
+        """)
+
+register('disease_by_name_contains', """
+        MATCH (d:Disease)
+        WHERE toLower(d.name) CONTAINS toLower($disease_name)
+        RETURN d.cui as cui, d.name as name
+        LIMIT 1
+        """, disease_name=str)
+
+register('disease_food_strength_paths', """
+        MATCH (f:Food)-[fm:STRENGTH]->(m:Microbe)-[md:STRENGTH]->(d:Disease)
+        WHERE d.cui = $disease_cui
+        RETURN
+            f.name as food_name,
+            f.synonyms as food_synonyms,
+            m.name as microbe_name,
+            m.synonyms as microbe_synonyms,
+            d.name as disease_name,
+            fm.strength as food_microbe_strength,
+            md.strength as microbe_disease_strength
+        """, disease_cui=str)
+
+register('parkinsons_microbiome', """
+        MATCH (m:Microbe)-[r:STRENGTH]->(d:Disease)
+        WHERE d.name =~ '(?i)Parkinson.*'
+        RETURN m.name as microbe_name,
+               m.synonyms as microbe_synonyms,
+               r.strength as strength,
+               d.name as disease_name
+        ORDER BY strength DESC
+        LIMIT 10
+        """)
+
+register('parkinsons_risk_factors', """
+        MATCH (f:RiskFactor)-[:ASSOCIATED_WITH]->(d:Disease)
+        WHERE d.name =~ '(?i)Parkinson.*'
+        RETURN f.name as risk_factor,
+               f.type as factor_type,
+               f.description as description
+        ORDER BY f.name
+        """)
+
+# The same two, for diseases already resolved to CUIs (entity_resolver)
+register('disease_microbiome', """
+        MATCH (m:Microbe)-[r:STRENGTH]->(d:Disease)
+        WHERE d.cui IN $cuis
+        RETURN m.name as microbe_name,
+               m.synonyms as microbe_synonyms,
+               r.strength as strength,
+               d.name as disease_name
+        ORDER BY strength DESC
+        LIMIT 10
+        """, cuis=list)
+
+register('disease_risk_factors', """
+        MATCH (f:RiskFactor)-[:ASSOCIATED_WITH]->(d:Disease)
+        WHERE d.cui IN $cuis
+        RETURN f.name as risk_factor,
+               f.type as factor_type,
+               f.description as description
+        ORDER BY f.name
+        """, cuis=list)
+
+# Every name, official name and synonym of the graph entities (entity_resolver)
+register('resolver_terms', """
+MATCH (n:Microbe)
+RETURN 'Microbe' AS label, n.cui AS cui, n.name AS name, n.official_name AS official_name, n.synonyms AS synonyms
+UNION ALL
+MATCH (n:`Food`)
+RETURN 'Food' AS label, n.cui AS cui, n.name AS name, n.official_name AS official_name, n.synonyms AS synonyms
+UNION ALL
+MATCH (n:Disease)
+RETURN 'Disease' AS label, n.cui AS cui, n.name AS name, n.official_name AS official_name, n.synonyms AS synonyms
+""")
+
+# Names and synonyms of the graph entities linked to paper passages (entity_index).
+# Diseases only contribute their canonical name; their synonym lists are
+# long and noisy (abbreviations like "PD" collide with ordinary text).
+register('entity_terms', """
+MATCH (m:Microbe)
+RETURN 'Microbe' AS label, m.cui AS cui, m.name AS name, m.synonyms AS synonyms
+UNION ALL
+MATCH (f:Food)
+RETURN 'Food' AS label, f.cui AS cui, f.name AS name, f.synonyms AS synonyms
+UNION ALL
+MATCH (d:Disease)
+RETURN 'Disease' AS label, d.cui AS cui, d.name AS name, [] AS synonyms
+""")
+
+# --- Graph snapshot loaders (graph_snapshot) ----------------------------------------
+
+register('snapshot_nodes', """
+MATCH (n)
+WHERE n:Microbe OR n:Disease OR n:Food
+RETURN elementId(n) AS id, labels(n)[0] AS label, n.cui AS cui, n.name AS name, n.official_name AS official_name
+""")
+
+register('snapshot_edges', """
+MATCH (a)-[r:STRENGTH|PARENT]->(b)
+WHERE (a:Microbe OR a:Disease OR a:Food) AND (b:Microbe OR b:Disease OR b:Food)
+RETURN elementId(a) AS source, elementId(b) AS target, type(r) AS type,
+       r.strength_raw AS strength_raw, r.strength_IF AS strength_IF, r.strength_IFQ AS strength_IFQ
+""")
+
+# --- Path service (path_service) -----------------------------------------------------
+# Every node and relationship, for shortest paths over any relationship type as
+# shortest_path_by_microbe_disease computes them.
+
+register('path_nodes', """
+MATCH (n)
+RETURN elementId(n) AS id, labels(n) AS labels, properties(n) AS properties
+""")
+
+register('path_edges', """
+MATCH (a)-[r]->(b)
+RETURN elementId(a) AS source, elementId(b) AS target, type(r) AS type
+""")
+
+# --- Disease-food path enumeration (path_enumerator) ---------------------------------
+# The endpoints with their $fanout strongest relationships, then the strongest
+# relationships linking the two neighborhoods (the middle hop of 3-hop paths).
+
+register('path_endpoint_neighbors', """
+CALL {
+    MATCH (n:Disease) WHERE n.cui = $disease_cui RETURN n, 'disease' AS side
+    UNION
+    MATCH (n:`Food`) WHERE n.name = $food_name RETURN n, 'food' AS side
+}
+CALL {
+    WITH n
+    MATCH (n)-[r]-(m)
+    WITH r, m ORDER BY abs(coalesce(r.strength_raw, 0.0)) DESC, elementId(r)
+    LIMIT $fanout
+    RETURN collect({id: elementId(r), type: type(r), start: elementId(startNode(r)), end: elementId(endNode(r)),
+                    properties: properties(r), other: elementId(m), other_labels: labels(m),
+                    other_properties: properties(m)}) AS rels
+}
+RETURN side, elementId(n) AS id, labels(n) AS labels, properties(n) AS properties, rels
+""", disease_cui=str, food_name=str, fanout=int)
+
+register('path_links', """
+UNWIND $left AS left_id
+MATCH (a)-[r]-(b)
+WHERE elementId(a) = left_id AND elementId(b) IN $right
+WITH a, r, b ORDER BY abs(coalesce(r.strength_raw, 0.0)) DESC, elementId(r)
+WITH a, collect({id: elementId(r), type: type(r), start: elementId(startNode(r)), end: elementId(endNode(r)),
+                 properties: properties(r), other: elementId(b)})[..$fanout] AS rels
+RETURN elementId(a) AS id, rels
+""", left=list, right=list, fanout=int)
+
+# --- Food-disease table (food_disease_table) ------------------------------------------
+
+register('food_disease_paths', """
+MATCH (f:`Food`)-[r1:STRENGTH]-(m:Microbe)-[r2:STRENGTH]-(d:Disease)
+RETURN d.cui AS disease_cui, d.name AS disease_name, f.official_name AS food_name, f.cui AS food_cui,
+       m.name AS microbe_name, r1.strength_raw AS food_microbe_strength, r2.strength_raw AS microbe_disease_strength
+""")
+
+register('strength_fingerprint', """
+MATCH ()-[r:STRENGTH]->()
+RETURN count(r) AS edges, sum(coalesce(r.strength_raw, 0.0)) AS strength_sum
+""")
+
+# --- Bulk export (graph_export) ----------------------------------------------------------
+# Every node of a label and every relationship of a type, ordered by element id. One
+# query per part: graph_export streams the rows (the driver's fetch_size) and writes a
+# file every page_size rows, so the sort runs once per part and run rather than once
+# per page. The ':after' variant resumes strictly after the last exported id, so an
+# interrupted export picks up where it stopped.
+EXPORT_LABELS = LABELS + ('RiskFactor',)
+EXPORT_TYPES = ('STRENGTH', 'POSITIVE', 'NEGATIVE', 'PARENT', 'ASSOCIATED_WITH')
+for _mode, _where, _params in (('first', '', {}), ('after', "\n        WHERE key > $after", {'after': str})):
+    for _label in EXPORT_LABELS:
+        register(f'export_nodes:{_label}:{_mode}', f"""
+        MATCH (n:`{_label}`)
+        WITH n, elementId(n) AS key{_where}
+        RETURN key AS id, labels(n) AS labels, properties(n) AS properties
+        ORDER BY key
+        """, **_params)
+    for _type in EXPORT_TYPES:
+        register(f'export_relationships:{_type}:{_mode}', f"""
+        MATCH (a)-[r:{_type}]->(b)
+        WITH a, r, b, elementId(r) AS key{_where}
+        RETURN key AS id, elementId(a) AS start, elementId(b) AS end, a.cui AS start_cui, b.cui AS end_cui,
+               properties(r) AS properties
+        ORDER BY key
+        """, **_params)
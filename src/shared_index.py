@@ -0,0 +1,281 @@
+"""Versioned, memory-mapped paper index shared read-only by several processes.
+
+One process (or a build step) publishes the chunk vectors and texts as flat
+files under ``<root>/v<N>/`` and then atomically points ``<root>/CURRENT`` at
+the new version. Streamlit workers attach with ``numpy.load(mmap_mode='r')``,
+so every worker reads the same page-cache (or ``/dev/shm``) pages instead of
+holding its own copy. Workers notice a new CURRENT on their next query and
+re-attach; the old mapping stays valid until the last reader drops it.
+
+Publishing holds an exclusive lock on ``<root>/.publish.lock`` while it
+allocates and writes a version, so concurrent publishers (workers starting up,
+uploads handled by different workers) take turns. ensure_published() lets only
+the first process build the initial version; the others wait for it and attach.
+
+Usage (from ``src/``):
+    python shared_index.py publish            # load research_papers/ and publish
+    python shared_index.py info               # show the current version
+"""
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".publish.lock"
+KEEP_VERSIONS = 3
+
+
+def default_shared_index_dir() -> str:
+    """SHARED_INDEX_DIR, else a RAM-backed directory in /dev/shm when available."""
+    configured = os.getenv('SHARED_INDEX_DIR')
+    if configured:
+        return configured
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm/neurobiome_paper_index'
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'index_store')
+
+
+def current_version(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def publish_lock(root: str):
+    """Hold the cross-process publish lock of a shared index directory (blocks until it is free)."""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def ensure_published(root: str, publish: Callable[[], object]) -> str:
+    """Run publish() to create the first version unless one exists.
+
+    Only one process builds; concurrent callers block on the publish lock and
+    find the version it published. publish() runs with the lock held, so it
+    must publish with ``publish_index(..., lock=False)``.
+
+    Returns:
+        str: The current version
+    """
+    with publish_lock(root):
+        if current_version(root) is None:
+            publish()
+        version = current_version(root)
+    if version is None:
+        raise ValueError(f"No paper index was published to {root}")
+    return version
+
+
+def publish_index(root: str, vectors: np.ndarray, chunks: Sequence[str], sources: Sequence[str],
+                  manifest: Optional[Dict] = None, lock: bool = True) -> str:
+    """Write a new index version and make it current.
+
+    Args:
+        root: Shared index directory
+        vectors: (n, dim) chunk embeddings, in chunk order
+        chunks: Chunk texts
+        sources: Source file name of every chunk
+        manifest: Index manifest (embedding backend, chunking) to publish alongside
+        lock: Take the publish lock; pass False when the caller already holds it
+
+    Returns:
+        str: The published version name
+    """
+    if lock:
+        with publish_lock(root):
+            return publish_index(root, vectors, chunks, sources, manifest, lock=False)
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    if len(vectors) != len(chunks) or len(chunks) != len(sources):
+        raise ValueError("vectors, chunks and sources must have the same length")
+    os.makedirs(root, exist_ok=True)
+
+    existing = [int(name[1:]) for name in os.listdir(root) if name.startswith('v') and name[1:].isdigit()]
+    version = f"v{max(existing, default=0) + 1}"
+    # Private build directory: an interrupted publisher never collides with the next one
+    tmp_dir = os.path.join(root, f".{version}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    os.makedirs(tmp_dir)
+
+    encoded = [text.encode('utf-8') for text in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype='int64')
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    source_names = sorted(set(sources))
+    source_ids = np.array([source_names.index(s) for s in sources], dtype='int32')
+
+    np.save(os.path.join(tmp_dir, 'vectors.npy'), vectors)
+    np.save(os.path.join(tmp_dir, 'norms.npy'), np.einsum('ij,ij->i', vectors, vectors))
+    np.save(os.path.join(tmp_dir, 'offsets.npy'), offsets)
+    np.save(os.path.join(tmp_dir, 'source_ids.npy'), source_ids)
+    with open(os.path.join(tmp_dir, 'texts.bin'), 'wb') as f:
+        f.write(b''.join(encoded) or b'\0')
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+        json.dump({
+            'version': version,
+            'published_at': time.time(),
+            'num_chunks': len(chunks),
+            'dim': int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            'sources': source_names,
+            'index': manifest or {},
+        }, f, indent=2)
+    os.replace(tmp_dir, os.path.join(root, version))
+
+    # Flip CURRENT atomically; readers see either the old or the new version
+    tmp_current = os.path.join(root, f".{CURRENT_FILE}.{os.getpid()}.{uuid.uuid4().hex}")
+    with open(tmp_current, 'w') as f:
+        f.write(version)
+    os.replace(tmp_current, os.path.join(root, CURRENT_FILE))
+
+    # Attached workers keep their mappings of removed files alive, so pruning is safe
+    stale = sorted(existing)[:max(0, len(existing) - (KEEP_VERSIONS - 1))]
+    for old in stale:
+        shutil.rmtree(os.path.join(root, f"v{old}"), ignore_errors=True)
+    print(f"Published paper index {version} ({len(chunks)} chunks) to {root}")
+    return version
+
+
+class _MappedTexts(Sequence):
+    """Read-only list-like view of chunk texts stored in a memory-mapped blob."""
+
+    def __init__(self, blob: np.memmap, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._blob[start:end].tobytes().decode('utf-8')
+
+
+class _MappedSources(Sequence):
+    def __init__(self, source_ids: np.ndarray, names: List[str]):
+        self._ids = source_ids
+        self._names = names
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self._names[int(self._ids[i])]
+
+
+class SharedPaperIndex:
+    """Read-only attachment to the current version of a published paper index.
+
+    Search is exact L2 (the same ranking as the FAISS flat index MINERVA builds),
+    computed directly over the mapped vectors without copying them.
+    """
+
+    def __init__(self, root: Optional[str] = None, check_interval: float = 2.0):
+        self.root = root or default_shared_index_dir()
+        self.check_interval = check_interval
+        self.version = None
+        self.manifest: Dict = {}
+        self._last_check = 0.0
+        self.attach()
+
+    def attach(self) -> str:
+        """Map the version CURRENT points at."""
+        version = current_version(self.root)
+        if version is None:
+            raise ValueError(f"No published paper index in {self.root}")
+        path = os.path.join(self.root, version)
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        vectors = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r')
+        norms = np.load(os.path.join(path, 'norms.npy'), mmap_mode='r')
+        offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        source_ids = np.load(os.path.join(path, 'source_ids.npy'), mmap_mode='r')
+        blob = np.memmap(os.path.join(path, 'texts.bin'), dtype='uint8', mode='r')
+
+        # Publish all views together so a concurrent search never mixes versions
+        self._state = (vectors, norms, _MappedTexts(blob, offsets), _MappedSources(source_ids, manifest['sources']))
+        self.version = version
+        self.manifest = manifest
+        self._last_check = time.monotonic()
+        print(f"Attached shared paper index {version} ({manifest['num_chunks']} chunks)")
+        return version
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._state[0]
+
+    @property
+    def chunks(self) -> Sequence[str]:
+        return self._state[2]
+
+    @property
+    def chunk_sources(self) -> Sequence[str]:
+        return self._state[3]
+
+    def maybe_refresh(self) -> bool:
+        """Re-attach if a newer version was published; checks at most every check_interval seconds."""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        if current_version(self.root) not in (None, self.version):
+            self.attach()
+            return True
+        return False
+
+    def search(self, query_vector, k: int = 3) -> List[Tuple[int, float, str]]:
+        """Return (chunk id, squared L2 distance, text) for the k nearest chunks."""
+        vectors, norms, chunks, _ = self._state
+        if len(chunks) == 0:
+            return []
+        q = np.asarray(query_vector, dtype='float32')
+        distances = norms - 2.0 * (vectors @ q) + float(q @ q)
+        k = min(k, len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(int(i), float(distances[i]), chunks[int(i)]) for i in top]
+
+
+def publish_from_minerva(minerva, root: Optional[str] = None, lock: bool = True) -> str:
+    """Publish the index currently loaded in a MINERVA client."""
+    if minerva.vector_store is None:
+        raise ValueError("No research papers loaded. Please call load_research_papers() first.")
+    index = minerva.vector_store.index
+    vectors = index.reconstruct_n(0, index.ntotal)
+    return publish_index(root or default_shared_index_dir(), vectors, minerva.chunks,
+                         minerva.chunk_sources, minerva.index_manifest, lock=lock)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish or inspect the shared paper index")
+    parser.add_argument('command', choices=['publish', 'info'])
+    parser.add_argument('--root', default=None, help="Shared index directory (default: SHARED_INDEX_DIR or /dev/shm)")
+    parser.add_argument('--papers', default='research_papers', help="Papers directory to load when publishing")
+    args = parser.parse_args()
+
+    root = args.root or default_shared_index_dir()
+    if args.command == 'publish':
+        from minerva import MINERVA
+        client = MINERVA()
+        client.load_research_papers(args.papers)
+        publish_from_minerva(client, root)
+    else:
+        print(json.dumps(SharedPaperIndex(root).manifest, indent=2))
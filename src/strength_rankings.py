@@ -0,0 +1,302 @@
+"""Presorted in-memory rankings of the Microbe-Disease STRENGTH edges.
+
+rank_by_positive_strength / rank_by_negative_strength sort every
+Microbe-Disease STRENGTH edge by strength_raw, strength_IF or strength_IFQ
+on each call, and the "more connections" tables re-aggregate every edge.
+StrengthRankings loads the edges once and keeps, per strength column, one
+ascending argsort over all edges plus one per grouping (by microbe and by
+disease: edges grouped, ascending within each group, with CSR offsets). A
+top-n or bottom-n request, overall or for one microbe or disease, is then a
+slice of a precomputed permutation. Connection counts per microbe and per
+disease are kept presorted as well.
+
+Orders follow the Cypher they replace: a missing strength sorts as the
+largest value (first in DESC, last in ASC); the connection counts only
+count Microbe->Disease edges.
+
+refresh_if_stale() checks the graph at most every check_interval seconds
+with one aggregate query: per-disease edge counts and strength sums. Only
+the edges of the diseases whose fingerprint changed (or that appeared or
+disappeared) are fetched again and spliced in; the permutations are then
+rebuilt with NumPy, which takes milliseconds, without transferring the
+unchanged edges. Renaming a microbe or disease is not detected; call
+refresh() for a full reload.
+
+Configuration (environment):
+    STRENGTH_RANKINGS   0 sorts in Neo4j on every call instead (default 1)
+
+Usage (from ``src/``):
+    python strength_rankings.py [--strength strength_IF] [--n 10] [--disease-cui C0030567]
+"""
+import argparse
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from metrics import log_csv, now_iso
+from query_registry import STRENGTH_TYPES, get_query
+
+GROUPS = ('Microbe', 'Disease')
+EDGE_COLUMNS = ['id', 'microbe_id', 'microbe_cui', 'microbe_name', 'disease_id', 'disease_cui', 'disease_name',
+                'microbe_to_disease'] + list(STRENGTH_TYPES)
+
+
+class _Rankings:
+    """Immutable edge columns and permutations of one loaded version."""
+
+    def __init__(self, edges: pd.DataFrame):
+        self.edges = edges.reset_index(drop=True)
+        self.values = {s: pd.to_numeric(self.edges[s], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+                       for s in STRENGTH_TYPES}
+        # Missing strengths sort as the largest value, as null does in Cypher's ORDER BY
+        keys = {s: np.where(np.isnan(v), np.inf, v) for s, v in self.values.items()}
+        self.order = {s: np.argsort(k, kind='stable') for s, k in keys.items()}
+
+        # Per grouping: node codes per CUI (a CUI can sit on more than one node), CSR offsets
+        # and the edges ordered by (node, strength)
+        self.nodes, self.by_cui, self.indptr, self.group_order = {}, {}, {}, {}
+        for group in GROUPS:
+            prefix = group.lower()
+            codes, uniques = pd.factorize(self.edges[f'{prefix}_id'])
+            self.nodes[group] = len(uniques)
+            self.by_cui[group] = {}
+            first = np.unique(codes, return_index=True)[1] if len(codes) else np.zeros(0, dtype='int64')
+            for code, cui in enumerate(self.edges[f'{prefix}_cui'].to_numpy()[first].tolist()):
+                self.by_cui[group].setdefault(cui, []).append(code)
+            counts = np.bincount(codes, minlength=len(uniques))
+            self.indptr[group] = np.concatenate([[0], np.cumsum(counts)])
+            # A stable sort of the global order by node keeps each node's edges in strength order
+            self.group_order[group] = {s: o[np.argsort(codes[o], kind='stable')] for s, o in self.order.items()}
+
+        # Connection counts over Microbe->Disease edges, presorted by count (descending, stable)
+        forward = self.edges[self.edges['microbe_to_disease'].astype(bool)]
+        strength = self.values['strength_raw'][forward.index.to_numpy()]
+        self.connections = {}
+        for group in GROUPS:
+            prefix = group.lower()
+            frame = pd.DataFrame({'node': forward[f'{prefix}_id'].to_numpy(),
+                                  'name': forward[f'{prefix}_name'].to_numpy(),
+                                  'positive': strength >= 0, 'negative': strength < 0})
+            counts = frame.groupby('node', sort=False).agg(
+                name=('name', 'first'), strength_count=('node', 'size'),
+                strength_positive=('positive', 'sum'), strength_negative=('negative', 'sum'))
+            counts = counts.sort_values('strength_count', ascending=False, kind='stable')
+            self.connections[group] = counts.rename(columns={'name': f'{prefix}_name'}).reset_index(drop=True)
+
+        # Fingerprint per disease id, for incremental refreshes
+        self.fingerprints = _fingerprints(self.edges, self.values)
+
+    def nbytes(self) -> int:
+        arrays = list(self.values.values()) + list(self.order.values()) + list(self.indptr.values()) \
+            + [a for orders in self.group_order.values() for a in orders.values()]
+        return int(sum(a.nbytes for a in arrays) + self.edges.memory_usage(deep=True).sum())
+
+
+def _fingerprint(edges: int, sums) -> Tuple[float, ...]:
+    return (float(edges),) + tuple(float(s or 0.0) for s in sums)
+
+
+def _same(a: Optional[tuple], b: Optional[tuple]) -> bool:
+    # Sums are compared with a tolerance: the server may add them up in another order
+    return a is not None and b is not None and np.allclose(a, b, rtol=1e-9, atol=1e-6)
+
+
+def _fingerprints(edges: pd.DataFrame, values: Dict[str, np.ndarray]) -> Dict[str, tuple]:
+    if edges.empty:
+        return {}
+    frame = pd.DataFrame({'disease_id': edges['disease_id'].to_numpy(),
+                          **{s: np.nan_to_num(values[s]) for s in STRENGTH_TYPES}})
+    grouped = frame.groupby('disease_id', sort=False)
+    sums, sizes = grouped[list(STRENGTH_TYPES)].sum(), grouped.size()
+    return {disease_id: _fingerprint(sizes[disease_id], sums.loc[disease_id].tolist()) for disease_id in sizes.index}
+
+
+class StrengthRankings:
+    """Top-n / bottom-n STRENGTH edges and connection counts, answered from presorted arrays.
+
+    Args:
+        db: Graph backend to load from (get_graph_backend() by default)
+        check_interval: Minimum seconds between change checks in refresh_if_stale
+    """
+
+    def __init__(self, db=None, check_interval: float = 60.0):
+        self.db = db
+        self.check_interval = check_interval
+        self.loaded_at: Optional[float] = None
+        self.load_ms: Optional[float] = None
+        self.updated_diseases = 0
+        self._rankings: Optional[_Rankings] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_records(cls, rows: List[Dict]) -> "StrengthRankings":
+        """Build rankings from rows shaped like the strength_ranking_edges query results."""
+        rankings = cls()
+        rankings._set(_Rankings(pd.DataFrame(rows, columns=EDGE_COLUMNS)))
+        return rankings
+
+    def _graph(self):
+        if self.db is None:
+            from graph_backend import get_graph_backend
+            self.db = get_graph_backend()
+        return self.db
+
+    def _set(self, rankings: _Rankings):
+        # A single reference swap, so readers never see half-built arrays
+        self._rankings = rankings
+        self.loaded_at = time.time()
+        self._last_check = time.monotonic()
+
+    def _log(self, metric: str, t0: float, rows: int):
+        self.load_ms = (time.perf_counter() - t0) * 1000
+        print(f"[METRIC] {metric}_ms={self.load_ms:.2f} edges={len(self._rankings.edges)} rows={rows}")
+        log_csv({
+            "ts": now_iso(),
+            "metric": metric,
+            "ms": round(self.load_ms, 2),
+            "rows": rows,
+        })
+
+    def refresh(self) -> "StrengthRankings":
+        """(Re)load every Microbe-Disease STRENGTH edge and rebuild the rankings."""
+        with self._lock:
+            t0 = time.perf_counter()
+            rows = self._graph().run(get_query('strength_ranking_edges').cypher)
+            self._set(_Rankings(pd.DataFrame(rows, columns=EDGE_COLUMNS)))
+            self._log('strength_rankings_load', t0, len(rows))
+        return self
+
+    def refresh_if_stale(self) -> bool:
+        """Reload the edges of the diseases whose STRENGTH edges changed since the last load.
+
+        The graph is checked at most every check_interval seconds. When it is
+        unreachable, the current rankings keep being served.
+
+        Returns:
+            bool: Whether anything was reloaded
+        """
+        if self._rankings is None:
+            self.refresh()
+            return True
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        try:
+            current = {row['disease_id']: _fingerprint(row['edges'], [row[s] for s in STRENGTH_TYPES])
+                       for row in self._graph().run(get_query('strength_disease_fingerprints').cypher)}
+        except Exception as e:
+            print(f"Could not check the graph for changes, serving the existing strength rankings: {e}")
+            return False
+        with self._lock:
+            rankings = self._rankings
+            changed = sorted(d for d in current.keys() | rankings.fingerprints.keys()
+                             if not _same(current.get(d), rankings.fingerprints.get(d)))
+            if not changed:
+                return False
+            t0 = time.perf_counter()
+            query = get_query('strength_ranking_edges_for_diseases')
+            rows = self._graph().run(query.cypher, query.bind(disease_ids=changed))
+            kept = rankings.edges[~rankings.edges['disease_id'].isin(changed)]
+            self._set(_Rankings(pd.concat([kept, pd.DataFrame(rows, columns=EDGE_COLUMNS)], ignore_index=True)))
+            self.updated_diseases += len(changed)
+            self._log('strength_rankings_update', t0, len(rows))
+        return True
+
+    @property
+    def rankings(self) -> _Rankings:
+        if self._rankings is None:
+            self.refresh()
+        return self._rankings
+
+    # --- reads -------------------------------------------------------------------
+
+    def top(self, strength_type: str = 'strength_raw', n: int = 10, order: str = 'DESC',
+            microbe_cui: Optional[str] = None, disease_cui: Optional[str] = None) -> List[Dict]:
+        """The n edges with the highest (DESC) or lowest (ASC) strength, overall or for one microbe or one disease.
+
+        Returns:
+            list: {Microbe, Disease, Strength} rows, as the rank_by_strength query returns them
+        """
+        if strength_type not in STRENGTH_TYPES:
+            raise ValueError(f"strength_type must be one of {STRENGTH_TYPES}")
+        if order not in ('DESC', 'ASC'):
+            raise ValueError("order must be 'DESC' or 'ASC'")
+        if microbe_cui is not None and disease_cui is not None:
+            raise ValueError("Filter by microbe_cui or by disease_cui, not both")
+        r = self.rankings
+        if microbe_cui is None and disease_cui is None:
+            ranked = r.order[strength_type]
+        else:
+            group, cui = ('Microbe', microbe_cui) if microbe_cui is not None else ('Disease', disease_cui)
+            blocks = [r.group_order[group][strength_type][r.indptr[group][code]:r.indptr[group][code + 1]]
+                      for code in r.by_cui[group].get(cui, ())]
+            ranked = np.concatenate(blocks) if blocks else np.zeros(0, dtype='int64')
+            if len(blocks) > 1:
+                keys = np.nan_to_num(r.values[strength_type][ranked], nan=np.inf)
+                ranked = ranked[np.argsort(keys, kind='stable')]
+        ranked = ranked[::-1][:n] if order == 'DESC' else ranked[:n]
+        values = r.values[strength_type]
+        microbes, diseases = r.edges['microbe_name'].to_numpy(), r.edges['disease_name'].to_numpy()
+        return [{'Microbe': microbes[i], 'Disease': diseases[i],
+                 'Strength': None if np.isnan(values[i]) else float(values[i])} for i in ranked.tolist()]
+
+    def connections(self, group: str = 'Microbe', n: int = 10) -> List[Dict]:
+        """Microbes (or diseases) with the most Microbe->Disease STRENGTH edges, with signed counts."""
+        if group not in GROUPS:
+            raise ValueError(f"group must be one of {GROUPS}")
+        counts = self.rankings.connections[group].head(n)
+        return [{key: (int(value) if key != f'{group.lower()}_name' else value) for key, value in row.items()}
+                for row in counts.to_dict('records')]
+
+    def stats(self) -> Dict:
+        r = self.rankings
+        return {
+            'edges': len(r.edges),
+            'microbes': r.nodes['Microbe'],
+            'diseases': r.nodes['Disease'],
+            'bytes': r.nbytes(),
+            'loaded_at': self.loaded_at,
+            'load_ms': self.load_ms,
+            'updated_diseases': self.updated_diseases,
+        }
+
+
+_rankings: Optional[StrengthRankings] = None
+_rankings_lock = threading.Lock()
+
+
+def get_strength_rankings() -> Optional[StrengthRankings]:
+    """Return the process-wide rankings, loaded on first use and kept current; None when STRENGTH_RANKINGS=0."""
+    global _rankings
+    if os.getenv('STRENGTH_RANKINGS', '1') == '0':
+        return None
+    if _rankings is None:
+        with _rankings_lock:
+            if _rankings is None:
+                _rankings = StrengthRankings().refresh()
+    _rankings.refresh_if_stale()
+    return _rankings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Top STRENGTH edges from the in-memory rankings")
+    parser.add_argument('--strength', choices=STRENGTH_TYPES, default='strength_raw')
+    parser.add_argument('--n', type=int, default=10)
+    parser.add_argument('--microbe-cui')
+    parser.add_argument('--disease-cui')
+    args = parser.parse_args()
+
+    rankings = StrengthRankings().refresh()
+    print(rankings.stats())
+    for order in ('DESC', 'ASC'):
+        t0 = time.perf_counter()
+        rows = rankings.top(args.strength, args.n, order, args.microbe_cui, args.disease_cui)
+        print(f"{order}: {(time.perf_counter() - t0) * 1000:.3f} ms")
+        print(pd.DataFrame(rows))
+    print(pd.DataFrame(rankings.connections('Microbe', args.n)))
@@ -0,0 +1,141 @@
+"""Vectorized scoring of Food-Microbe-Disease paths.
+
+The one place the derived-relation rule lives. For each path with a
+Food-Microbe strength s1 and a Microbe-Disease strength s2:
+
+    derived_relation       "positive" when s1 and s2 have the same sign (both >= 0 or both < 0),
+                           "negative" otherwise, including when either strength is missing
+    food_disease_strength  (|s1| + |s2|) * (+1 if positive else -1), NaN when either is missing
+
+Longer paths of any relationship types (score_chains) follow the same rule:
+the combined strength is the sum of |s| over the relationships that carry a
+strength, and it is positive when an even number of them are negative.
+Relationships without a strength (PARENT, publication links) are neutral;
+a path with none at all scores NaN.
+
+Per-food (or per any key) aggregates sum food_disease_strength over paths,
+skipping missing values as pandas does, and count paths by derived sign.
+Everything works on whole arrays; there are no per-row Python calls.
+
+The registered path queries return raw strengths only; GraphQueries, MINERVA,
+the graph snapshot callers and the food-disease table score them here.
+"""
+from typing import Dict, List, NamedTuple, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+POSITIVE = 'positive'
+NEGATIVE = 'negative'
+
+FOOD_MICROBE = 'food_microbe_strength'
+MICROBE_DISEASE = 'microbe_disease_strength'
+
+
+class Scores(NamedTuple):
+    positive: np.ndarray   # bool, derived relation is positive
+    strength: np.ndarray   # float64, signed combined food-disease strength
+
+    @property
+    def derived_relation(self) -> np.ndarray:
+        return np.where(self.positive, POSITIVE, NEGATIVE)
+
+
+def _as_float(values) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        return pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return np.asarray(values, dtype='float64')
+
+
+def score(food_microbe, microbe_disease) -> Scores:
+    """Derived sign and combined strength for arrays of path strengths.
+
+    Args:
+        food_microbe: Food-Microbe strengths (array-like, None/NaN for missing)
+        microbe_disease: Microbe-Disease strengths, same length
+
+    Returns:
+        Scores: positive mask and signed food_disease_strength
+    """
+    s1, s2 = _as_float(food_microbe), _as_float(microbe_disease)
+    with np.errstate(invalid='ignore'):
+        positive = ((s1 >= 0) & (s2 >= 0)) | ((s1 < 0) & (s2 < 0))
+    strength = (np.abs(s1) + np.abs(s2)) * np.where(positive, 1.0, -1.0)
+    return Scores(positive, strength)
+
+
+def score_chains(strengths) -> Scores:
+    """Derived sign and combined strength for paths of any length.
+
+    Args:
+        strengths: (paths, hops) array of relationship strengths, NaN for
+            relationships without one and for padding past a shorter path's end
+
+    Returns:
+        Scores: positive mask and signed combined strength (NaN without any strength)
+    """
+    s = np.atleast_2d(_as_float(strengths))
+    present = ~np.isnan(s)
+    scored = present.any(axis=1)
+    with np.errstate(invalid='ignore'):
+        negatives = (s < 0).sum(axis=1)
+    positive = scored & (negatives % 2 == 0)
+    magnitude = np.where(present, np.abs(s), 0.0).sum(axis=1)
+    strength = np.where(scored, magnitude * np.where(positive, 1.0, -1.0), np.nan)
+    return Scores(positive, strength)
+
+
+def score_paths(paths: pd.DataFrame) -> pd.DataFrame:
+    """Return a copy of path rows with derived_relation and food_disease_strength columns."""
+    if paths.empty:
+        return paths.assign(derived_relation=pd.Series(dtype=object), food_disease_strength=pd.Series(dtype='float64'))
+    scores = score(paths[FOOD_MICROBE], paths[MICROBE_DISEASE])
+    paths = paths.copy()
+    paths['derived_relation'] = scores.derived_relation
+    paths['food_disease_strength'] = scores.strength
+    return paths
+
+
+def score_records(rows: List[Dict]) -> List[Dict]:
+    """Add derived_relation and food_disease_strength to path rows in place (list-of-dicts results)."""
+    if not rows:
+        return rows
+    scores = score([row.get(FOOD_MICROBE) for row in rows], [row.get(MICROBE_DISEASE) for row in rows])
+    for row, positive, strength in zip(rows, scores.positive.tolist(), scores.strength.tolist()):
+        row['derived_relation'] = POSITIVE if positive else NEGATIVE
+        row['food_disease_strength'] = strength
+    return rows
+
+
+def aggregate(paths: pd.DataFrame, by: Union[str, Sequence[str]] = 'food_name') -> pd.DataFrame:
+    """Score path rows and aggregate them per key in one pass.
+
+    Args:
+        paths: Path rows with food_microbe_strength and microbe_disease_strength
+        by: Key column(s), e.g. 'food_name' or ['disease_cui', 'food_name']
+
+    Returns:
+        pd.DataFrame: key columns, food_disease_strength (sum), path_count,
+            positive_paths, negative_paths; keys in first-seen order
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    columns = by + ['food_disease_strength', 'path_count', 'positive_paths', 'negative_paths']
+    paths = paths.dropna(subset=by)
+    if paths.empty:
+        return pd.DataFrame(columns=columns)
+    if len(by) == 1:
+        codes, keys = pd.factorize(paths[by[0]])
+        result = pd.DataFrame({by[0]: keys})
+    else:
+        codes, keys = pd.MultiIndex.from_frame(paths[by]).factorize()
+        result = keys.to_frame(index=False, name=by)
+    scores = score(paths[FOOD_MICROBE], paths[MICROBE_DISEASE])
+    groups = len(keys)
+    path_count = np.bincount(codes, minlength=groups)
+    positive_paths = np.bincount(codes, weights=scores.positive.astype('float64'), minlength=groups).astype('int64')
+    result['food_disease_strength'] = np.bincount(codes, weights=np.nan_to_num(scores.strength), minlength=groups)
+    result['path_count'] = path_count
+    result['positive_paths'] = positive_paths
+    result['negative_paths'] = path_count - positive_paths
+    return result[columns]
+